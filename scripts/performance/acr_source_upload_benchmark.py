@@ -0,0 +1,98 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Local benchmark of the `az acr build` / `az acr run` source context upload.
+
+Compares the previous two-phase path (pack into a temporary tar.gz with single threaded gzip, then upload the
+file) with the streaming upload that compresses and uploads blocks in parallel while packing. Uploads go to an
+in-process fake that sleeps to simulate the given bandwidth. Reports wall time and peak extra disk use.
+Usage: python acr_source_upload_benchmark.py [number_of_files] [file_kib] [bandwidth_mib_per_second]
+"""
+
+import gzip
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from azure.cli.command_modules.acr._archive_utils import (
+    _pack_source_code, _GzipBlockUploader, SOURCE_UPLOAD_CHUNK_SIZE, DEFAULT_SOURCE_UPLOAD_WORKERS)
+
+
+class FakeBlobService(object):
+
+    def __init__(self, bandwidth):
+        self.bandwidth = bandwidth
+        self.uploaded = 0
+
+    def put_block(self, block, block_id):  # pylint: disable=unused-argument
+        time.sleep(len(block) / self.bandwidth)
+        self.uploaded += len(block)
+
+
+def build_tree(root, count, file_size):
+    # half random (incompressible) and half text content, spread over nested directories
+    text = (b'def handler(event, context):\n    return {"status": 200}\n' * (file_size // 56 + 1))[:file_size]
+    for i in range(count):
+        directory = os.path.join(root, 'pkg{}'.format(i % 20), 'mod{}'.format(i % 7))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'file{}.dat'.format(i)), 'wb') as f:
+            f.write(os.urandom(file_size // 2) + text[:file_size // 2])
+    with open(os.path.join(root, 'Dockerfile'), 'w') as f:
+        f.write('FROM scratch\nCOPY . .\n')
+
+
+def two_phase_upload(source, service):
+    tar_file_path = os.path.join(tempfile.gettempdir(), 'benchmark_archive.tar.gz')
+    try:
+        with gzip.open(tar_file_path, 'wb') as f:
+            _pack_source_code(source, f, os.path.join(source, 'Dockerfile'), 'Dockerfile')
+        peak_disk = os.path.getsize(tar_file_path)
+
+        # create_blob_from_path uploads 4 MiB blocks with 2 connections by default
+        def _read_blocks():
+            with open(tar_file_path, 'rb') as f:
+                for index, block in enumerate(iter(lambda: f.read(SOURCE_UPLOAD_CHUNK_SIZE), b'')):
+                    yield block, index
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda b: service.put_block(*b), _read_blocks()))
+    finally:
+        os.remove(tar_file_path)
+    return peak_disk
+
+
+def streaming_upload(source, service):
+    with _GzipBlockUploader(service.put_block, max_workers=DEFAULT_SOURCE_UPLOAD_WORKERS) as uploader:
+        _pack_source_code(source, uploader, os.path.join(source, 'Dockerfile'), 'Dockerfile')
+    return 0
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    file_size = int(sys.argv[2]) * 1024 if len(sys.argv) > 2 else 64 * 1024
+    bandwidth = float(sys.argv[3]) * 1024 * 1024 if len(sys.argv) > 3 else 50 * 1024 * 1024
+
+    source = tempfile.mkdtemp()
+    try:
+        build_tree(source, count, file_size)
+        print('{} files, {:.1f} MiB of source, simulated bandwidth {:.0f} MiB/s'.format(
+            count, count * file_size / 1024.0 / 1024, bandwidth / 1024 / 1024))
+        for name, func in [('two-phase (legacy)', two_phase_upload), ('streaming', streaming_upload)]:
+            service = FakeBlobService(bandwidth)
+            start = timeit.default_timer()
+            peak_disk = func(source, service)
+            elapsed = timeit.default_timer() - start
+            print('{:<20} {:.3f}s  uploaded {:.1f} MiB  peak extra disk {:.1f} MiB'.format(
+                name, elapsed, service.uploaded / 1024.0 / 1024, peak_disk / 1024.0 / 1024))
+    finally:
+        shutil.rmtree(source, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Micro-benchmark of packing an `az acr build` context filtered by .dockerignore.
+
+Builds a synthetic tree (default 200k files, most of them under node_modules and .git like a typical web app)
+and packs it with the compiled, pruning matcher and with the previous rule by rule evaluation, which walked
+every excluded directory file by file. Both must produce the same archive members.
+Usage: python dockerignore_benchmark.py [number_of_files] [root_dir]
+"""
+
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import timeit
+
+from azure.cli.command_modules.acr._archive_utils import _pack_source_code, _load_dockerignore_file
+
+DOCKERIGNORE = """# dependencies
+node_modules
+**/*.log
+dist
+coverage
+!dist/index.html
+*.md
+!README.md
+"""
+
+
+class NullWriter(object):
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, data):
+        self.size += len(data)
+        return len(data)
+
+
+def build_tree(root, count):
+    layout = [('node_modules', 0.75), ('.git/objects', 0.15), ('dist', 0.03), ('src', 0.07)]
+    created = 0
+    for top, share in layout:
+        n = int(count * share)
+        for i in range(n):
+            directory = os.path.join(root, top, 'd{}'.format(i // 500), 'e{}'.format(i % 10))
+            os.makedirs(directory, exist_ok=True)
+            name = 'f{}.{}'.format(i, 'log' if i % 50 == 0 else 'js')
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write('x')
+        created += n
+    with open(os.path.join(root, '.dockerignore'), 'w') as f:
+        f.write(DOCKERIGNORE)
+    with open(os.path.join(root, 'Dockerfile'), 'w') as f:
+        f.write('FROM node\nCOPY . .\n')
+    with open(os.path.join(root, 'dist', 'index.html'), 'w') as f:
+        f.write('<html></html>')
+    return created
+
+
+def legacy_pack(source_location, fileobj):
+    ignore_list, ignore_list_size = _load_dockerignore_file(source_location, 'Dockerfile')
+    common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
+
+    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+        if tarinfo.name in common_vcs_ignore_list:
+            return True, parent_matching_rule_index
+        if ignore_list is None:
+            return parent_ignored, parent_matching_rule_index
+        for index, item in enumerate(ignore_list):
+            if index >= parent_matching_rule_index:
+                break
+            if re.match(item.pattern, tarinfo.name):
+                return item.ignore, index
+        return parent_ignored, parent_matching_rule_index
+
+    def _archive(tar, name, arcname, parent_ignored, parent_matching_rule_index):
+        tarinfo = tar.gettarinfo(name, arcname)
+        ignored, matching_rule_index = _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index)
+        if not ignored:
+            if tarinfo.isreg():
+                with open(name, 'rb') as f:
+                    tar.addfile(tarinfo, f)
+            else:
+                tar.addfile(tarinfo)
+        if tarinfo.isdir():
+            for f in os.listdir(name):
+                _archive(tar, os.path.join(name, f), os.path.join(arcname, f), ignored, matching_rule_index)
+
+    with tarfile.open(fileobj=fileobj, mode='w|') as tar:
+        _archive(tar, source_location, '', False, ignore_list_size)
+        docker_file_path = os.path.join(source_location, 'Dockerfile')
+        with open(docker_file_path, 'rb') as f:
+            tar.addfile(tar.gettarinfo(docker_file_path, 'Dockerfile'), f)
+
+
+def members(func, root):
+    names = []
+    original_addfile = tarfile.TarFile.addfile
+
+    def _addfile(tar, tarinfo, fileobj=None):
+        names.append(tarinfo.name)
+        return original_addfile(tar, tarinfo, fileobj)
+
+    tarfile.TarFile.addfile = _addfile
+    try:
+        func(root, NullWriter())
+    finally:
+        tarfile.TarFile.addfile = original_addfile
+    return sorted(names)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    root = sys.argv[2] if len(sys.argv) > 2 else None
+    created_root = root is None
+    root = root or tempfile.mkdtemp()
+    try:
+        if created_root:
+            print('Creating {} files under {}...'.format(build_tree(root, count), root))
+
+        def compiled_pack(source_location, fileobj):
+            _pack_source_code(source_location, fileobj, os.path.join(source_location, 'Dockerfile'), 'Dockerfile')
+
+        expected = members(legacy_pack, root)
+        assert expected == members(compiled_pack, root), 'archive members differ from the rule by rule evaluation'
+        print('{} archive members'.format(len(expected)))
+
+        for name, func in [('rule by rule (legacy)', legacy_pack), ('compiled + pruning', compiled_pack)]:
+            elapsed = timeit.timeit(lambda: func(root, NullWriter()), number=1)  # pylint: disable=cell-var-from-loop
+            print('{:<24} {:.3f}s'.format(name, elapsed))
+    finally:
+        if created_root:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Benchmark of `az keyvault backup-objects` and `az keyvault restore-objects` against a local fake vault.
+
+Starts a fake Key Vault data plane endpoint, with the authentication challenge, paged listings, backup, restore,
+recover and delete operations and a latency per request, holding keys, secrets and certificates (default 300 of
+each, a few of them deleted). The vault is backed up with the data plane client, once one object after the other
+with the `az keyvault <type> backup` functions, the lower bound of what a process per object used to cost, and
+once with `backup_vault_objects`. The backup is then interrupted by failing the requests after half of the objects
+and resumed, and restored into a second fake vault, interrupted and resumed the same way. The restored vault must
+hold the objects of the first one.
+Usage: python keyvault_backup_benchmark.py [objects_per_type] [--latency MS] [--concurrency N]
+"""
+
+import argparse
+import base64
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import mock
+
+from azure.cli.core.mock import DummyCli
+from azure.cli.core.profiles import get_sdk
+from azure.cli.command_modules.keyvault import custom
+from azure.cli.command_modules.keyvault._client_factory import keyvault_data_plane_factory
+
+OBJECT_TYPES = ['key', 'secret', 'certificate']
+PAGE_SIZE = 25
+
+
+def _encode(data):
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def _decode(value):
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
+
+
+class FakeVault(object):
+    """A local Key Vault endpoint holding {type: {name: blob}} objects, active or deleted."""
+
+    def __init__(self, latency):
+        self.objects = {t: {} for t in OBJECT_TYPES}
+        self.deleted = {t: {} for t in OBJECT_TYPES}
+        self.requests = {}
+        self.fail_after = None
+        self._lock = threading.Lock()
+        vault = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _handle(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if not self.headers.get('Authorization'):
+                    self.send_response(401)
+                    self.send_header('WWW-Authenticate', 'Bearer authorization="https://login.microsoftonline.com/'
+                                                         'tenant", resource="https://vault.azure.net"')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                time.sleep(latency)
+                url = urlparse(self.path)
+                status, result = vault.handle(self.command, [p for p in url.path.split('/') if p],
+                                              parse_qs(url.query), json.loads(body) if body else None,
+                                              'http://{}'.format(self.headers['Host']))
+                data = json.dumps(result).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = _handle
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _bundle(self, base_url, object_type, name):
+        url = '{}/{}s/{}'.format(base_url, object_type, name)
+        if object_type == 'key':
+            return {'key': {'kid': url, 'kty': 'RSA'}, 'attributes': {}}
+        return {'id': url, 'attributes': {}}
+
+    def _item(self, base_url, object_type, name, deleted):
+        # the objects never change, a backup run again skips them
+        item = {'kid' if object_type == 'key' else 'id': '{}/{}s/{}'.format(base_url, object_type, name),
+                'attributes': {'updated': 1600000000}}
+        if deleted:
+            item['recoveryId'] = '{}/deleted{}s/{}'.format(base_url, object_type, name)
+        return item
+
+    def handle(self, method, path, query, body, base_url):  # pylint: disable=too-many-return-statements
+        with self._lock:
+            operation = path[-1] if method == 'POST' else method
+            self.requests[operation] = self.requests.get(operation, 0) + 1
+            if operation in ('backup', 'restore') and self.fail_after is not None:
+                if self.fail_after == 0:
+                    return 403, {'error': {'code': 'Forbidden', 'message': 'Interrupted'}}
+                self.fail_after -= 1
+
+            deleted = path[0].startswith('deleted')
+            object_type = path[0][len('deleted') if deleted else 0:-1]
+            objects = self.deleted[object_type] if deleted else self.objects[object_type]
+            if method == 'GET' and len(path) == 1:
+                names = sorted(objects)
+                skip = int(query.get('$skiptoken', ['0'])[0])
+                page = names[skip:skip + PAGE_SIZE]
+                result = {'value': [self._item(base_url, object_type, n, deleted) for n in page]}
+                if skip + PAGE_SIZE < len(names):
+                    result['nextLink'] = '{}/{}?api-version={}&$skiptoken={}'.format(
+                        base_url, path[0], query['api-version'][0], skip + PAGE_SIZE)
+                return 200, result
+            if method == 'POST' and path[1] == 'restore':
+                blob = _decode(body['value'])
+                restored_type, name = (part.decode() for part in blob.split(b'/', 2)[:2])
+                if restored_type != object_type or name in objects:
+                    return 409, {'error': {'code': 'Conflict', 'message': 'Conflict'}}
+                objects[name] = blob
+                return 200, self._bundle(base_url, object_type, name)
+
+            name = path[1]
+            if name not in objects:
+                return 404, {'error': {'code': 'NotFound', 'message': '{} not found'.format(name)}}
+            if method == 'POST' and path[2] == 'backup':
+                return 200, {'value': _encode(objects[name])}
+            if method == 'POST' and path[2] == 'recover':
+                self.objects[object_type][name] = objects.pop(name)
+            elif method == 'DELETE':
+                self.deleted[object_type][name] = objects.pop(name)
+            return 200, self._bundle(base_url, object_type, name)
+
+
+def build_vault(latency, count):
+    vault = FakeVault(latency)
+    for object_type in OBJECT_TYPES:
+        for i in range(count):
+            name = '{}{}'.format(object_type, i)
+            blob = '{}/{}/'.format(object_type, name).encode() + os.urandom(2048)
+            (vault.deleted if i % 50 == 0 else vault.objects)[object_type][name] = blob
+    return vault
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count', nargs='?', type=int, default=300)
+    parser.add_argument('--latency', type=int, default=20, help='Latency of a request in ms.')
+    parser.add_argument('--concurrency', type=int, default=custom.DEFAULT_VAULT_BACKUP_CONCURRENCY)
+    ns = parser.parse_args()
+
+    cli_ctx = DummyCli()
+    cmd = mock.Mock(cli_ctx=cli_ctx)
+    cmd.get_models.side_effect = lambda name, resource_type: get_sdk(cli_ctx, resource_type, name, mod='models')
+    source = build_vault(ns.latency / 1000.0, ns.count)
+    target = build_vault(ns.latency / 1000.0, 0)
+    folder = tempfile.mkdtemp()
+    objects = sum(len(o) for o in source.objects.values())
+    deleted = sum(len(o) for o in source.deleted.values())
+    with mock.patch('azure.cli.command_modules.keyvault._client_factory.Profile') as profile:
+        profile.return_value.get_raw_token.return_value = (('Bearer', 'token', {}), None, None)
+        client = keyvault_data_plane_factory(cli_ctx, None)
+
+        def run(name, func, count=objects + deleted):
+            start = timeit.default_timer()
+            result = func()
+            elapsed = timeit.default_timer() - start
+            summary = {k: len(v) if isinstance(v, list) else v for k, v in result.items() if k != 'manifest'} \
+                if result else {}
+            print('{:<36} {:>8.2f} {:>10.1f}  {}'.format(name, elapsed, count / elapsed, summary))
+            return result
+
+        def backup_one_by_one():
+            for object_type in OBJECT_TYPES:
+                for name in source.objects[object_type]:
+                    getattr(custom, 'backup_' + object_type)(client, os.path.join(folder, 'single.blob'), source.url,
+                                                             name)
+
+        def interrupted(vault, func):
+            vault.fail_after = (objects + deleted) // 2
+            result = func()
+            assert len(result['failed']) == (objects + deleted) - (objects + deleted) // 2, result
+            vault.fail_after = None
+            return result
+
+        def backup():
+            return custom.backup_vault_objects(cmd, client, source.url, os.path.join(folder, 'vault'),
+                                               include_deleted=True, concurrency=ns.concurrency)
+
+        def restore():
+            return custom.restore_vault_objects(cmd, client, target.url, os.path.join(folder, 'vault'),
+                                                concurrency=ns.concurrency)
+
+        print('{} objects and {} deleted objects, {} ms per request, concurrency {}'.format(
+            objects, deleted, ns.latency, ns.concurrency))
+        print('{:<36} {:>8} {:>10}'.format('Run', 'Time (s)', 'Objects/s'))
+        run('one by one, active objects', backup_one_by_one, objects)
+        shutil.rmtree(os.path.join(folder, 'vault'), ignore_errors=True)
+        run('backup-objects, with deleted', backup)
+        shutil.rmtree(os.path.join(folder, 'vault'))
+
+        run('backup-objects, interrupted', lambda: interrupted(source, backup))
+        requests = source.requests.get('backup', 0)
+        result = run('backup-objects, resumed', backup)
+        assert result['failed'] == [] and source.requests['backup'] - requests == result['backedUp'], result
+
+        run('restore-objects, interrupted', lambda: interrupted(target, restore))
+        requests = target.requests.get('restore', 0)
+        result = run('restore-objects, resumed', restore)
+        assert result['failed'] == [] and target.requests['restore'] - requests == result['restored'], result
+        assert target.objects == source.objects and target.deleted == source.deleted
+
+    source.stop()
+    target.stop()
+    shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
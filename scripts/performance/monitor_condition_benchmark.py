@@ -0,0 +1,91 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Micro-benchmark of parsing the --condition of metric alerts and autoscale rules.
+
+Parses a list of conditions (default 1000, of which 100 distinct, like a script creating the same rules for many
+resources) in a fresh process, once with a new ANTLR lexer, parser and walker per condition as before, and once
+with the memoized parser. The first parse, which pays for loading the grammars, is reported separately. Both must
+return the same conditions.
+Usage: python monitor_condition_benchmark.py [number_of_conditions] [number_of_distinct_conditions]
+"""
+
+import subprocess
+import sys
+import timeit
+
+CONDITIONS = {
+    'metric alert': 'avg Microsoft.Storage/storageAccounts.Metric{0} > {1} where ApiName includes GetBlob or Put{0}',
+    'autoscale': '"Microsoft.Compute/virtualMachineScaleSets" Metric{0} > {1} avg 5m where VMName == vm{0} or vm{1}',
+}
+
+
+def legacy_parse(name, text):
+    """ The parsing of MetricAlertConditionAction and AutoscaleConditionAction before the memoized parser. """
+    import antlr4
+    if name == 'metric alert':
+        from azure.cli.command_modules.monitor.grammar.metric_alert import (
+            MetricAlertConditionLexer as Lexer, MetricAlertConditionParser as Parser,
+            MetricAlertConditionValidator as Validator)
+    else:
+        from azure.cli.command_modules.monitor.grammar.autoscale import (
+            AutoscaleConditionLexer as Lexer, AutoscaleConditionParser as Parser,
+            AutoscaleConditionValidator as Validator)
+
+    lexer = Lexer(antlr4.InputStream(text))
+    stream = antlr4.CommonTokenStream(lexer)
+    parser = Parser(stream)
+    tree = parser.expression()
+    validator = Validator()
+    walker = antlr4.ParseTreeWalker()
+    walker.walk(validator, tree)
+    return validator.result()
+
+
+def memoized_parse(name, text):
+    from azure.cli.command_modules.monitor.grammar import parse_metric_alert_condition, parse_autoscale_condition
+    if name == 'metric alert':
+        return parse_metric_alert_condition(text)
+    return parse_autoscale_condition(text)
+
+
+def run(implementation, name, count, distinct):
+    """ Parse the conditions in this process and print the first parse time, the total time and the results. """
+    parse = legacy_parse if implementation == 'legacy' else memoized_parse
+    conditions = [CONDITIONS[name].format(i % distinct, 10 + i % distinct) for i in range(count)]
+    results = []
+    start = timeit.default_timer()
+    results.append(parse(name, conditions[0]).serialize())
+    first = timeit.default_timer() - start
+    for condition in conditions[1:]:
+        results.append(parse(name, condition).serialize())
+    total = timeit.default_timer() - start
+    print('{} {} {!r}'.format(first, total, results))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--run':
+        run(sys.argv[2], sys.argv[3], int(sys.argv[4]), int(sys.argv[5]))
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print('{} conditions, {} distinct'.format(count, distinct))
+    print('{:<14} {:<10} {:>12} {:>12}'.format('Grammar', 'Parser', 'First (s)', 'Total (s)'))
+    for name in CONDITIONS:
+        expected = None
+        for implementation in ('legacy', 'memoized'):
+            # a new process per run, so that the grammars are loaded and the DFA built from scratch
+            output = subprocess.check_output([sys.executable, __file__, '--run', implementation, name, str(count),
+                                              str(distinct)]).decode('utf-8')
+            first, total, results = output.split(' ', 2)
+            if expected is None:
+                expected = results
+            assert results == expected, implementation
+            print('{:<14} {:<10} {:>12.3f} {:>12.3f}'.format(name, implementation, float(first), float(total)))
+
+
+if __name__ == '__main__':
+    main()
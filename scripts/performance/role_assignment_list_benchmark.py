@@ -0,0 +1,110 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Micro-benchmark of filtering the role assignments of a large tenant.
+
+Builds a synthetic listing (default 100000 assignments over management groups, subscriptions, resource groups
+and resources) and filters it by scope, with and without inherited assignments, by role and by principal, once
+with the previous regular expression per assignment and once with the assignment index used by
+`az role assignment list`. Both must return the same assignments.
+Usage: python role_assignment_list_benchmark.py [number_of_assignments]
+"""
+
+import random
+import re
+import sys
+import timeit
+import uuid
+
+import mock
+
+from azure.cli.core.mock import DummyCli
+from azure.cli.core.profiles import ResourceType, get_sdk
+from azure.cli.command_modules.role.custom import _search_role_assignments
+from azure.cli.command_modules.role._multi_api_adaptor import MultiAPIAdaptor
+
+ROLE_ID = '/subscriptions/{}/providers/Microsoft.Authorization/roleDefinitions/{}'
+
+
+def build_assignments(cli_ctx, count):
+    RoleAssignment = get_sdk(cli_ctx, ResourceType.MGMT_AUTHORIZATION, 'RoleAssignment', mod='models',
+                             operation_group='role_assignments')
+    rnd = random.Random(0)
+    subscriptions = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(50)]
+    roles = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(40)]
+    principals = [str(uuid.UUID(int=rnd.getrandbits(128))) for _ in range(5000)]
+    assignments = []
+    for i in range(count):
+        sub = rnd.choice(subscriptions)
+        depth = rnd.random()
+        if depth < 0.02:
+            scope = '/providers/Microsoft.Management/managementGroups/mg{}'.format(rnd.randint(0, 9))
+        elif depth < 0.1:
+            scope = '/subscriptions/' + sub
+        elif depth < 0.4:
+            scope = '/subscriptions/{}/resourceGroups/rg{}'.format(sub, rnd.randint(0, 199))
+        else:
+            scope = '/subscriptions/{}/resourceGroups/rg{}/providers/Microsoft.Web/sites/app{}'.format(
+                sub, rnd.randint(0, 199), i)
+        assignment = RoleAssignment()
+        assignment.scope = scope
+        assignment.role_definition_id = ROLE_ID.format(sub, rnd.choice(roles))
+        assignment.principal_id = rnd.choice(principals)
+        assignments.append(assignment)
+    return assignments
+
+
+def legacy_search(worker, assignments, scope, include_inherited, role_id=None, principal_id=None):
+    """ The filters of _search_role_assignments before the assignment index. """
+    assignments = [a for a in assignments if (
+        not scope or
+        include_inherited and re.match(worker.get_role_property(a, 'scope'), scope, re.I) or
+        worker.get_role_property(a, 'scope').lower() == scope.lower()
+    )]
+    if role_id:
+        assignments = [i for i in assignments if worker.get_role_property(i, 'role_definition_id') == role_id]
+    if principal_id:
+        assignments = [i for i in assignments if worker.get_role_property(i, 'principal_id') == principal_id]
+    return assignments
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    cli_ctx = DummyCli()
+    assignments = build_assignments(cli_ctx, count)
+    sample = assignments[count // 2]
+    group_scope = sample.scope.split('/providers/')[0]
+    queries = [
+        ('resource group', group_scope, False, None, None),
+        ('resource group, inherited', group_scope, True, None, None),
+        ('resource, inherited', sample.scope, True, None, None),
+        ('role', None, False, sample.role_definition_id, None),
+        ('principal and role, inherited', sample.scope, True, sample.role_definition_id, sample.principal_id),
+    ]
+    worker = MultiAPIAdaptor(cli_ctx)
+    client = mock.Mock()
+    client.list_for_scope.return_value = assignments
+    client.list.return_value = assignments
+
+    print('{} assignments'.format(count))
+    print('{:<32} {:>8} {:>12} {:>12}'.format('Filter', 'Matches', 'Regex (s)', 'Index (s)'))
+    for name, scope, include_inherited, role_id, principal_id in queries:
+        start = timeit.default_timer()
+        expected = legacy_search(worker, assignments, scope, include_inherited, role_id, principal_id)
+        legacy_time = timeit.default_timer() - start
+
+        start = timeit.default_timer()
+        with mock.patch('azure.cli.command_modules.role.custom._resolve_object_id',
+                        side_effect=lambda _, assignee, **kwargs: assignee):
+            result = _search_role_assignments(cli_ctx, client, mock.Mock(), scope, principal_id, role_id,
+                                              include_inherited, include_groups=False)
+        index_time = timeit.default_timer() - start
+
+        assert result == expected, name
+        print('{:<32} {:>8} {:>12.3f} {:>12.3f}'.format(name, len(result), legacy_time, index_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Micro-benchmark of the global result transforms over a large synthetic `az resource list` result.
+
+Compares the single-pass ResultTransformer with the previous implementation, which walked the whole
+result once per transform. Usage: python transform_benchmark.py [number_of_resources] [loops]
+"""
+
+import copy
+import re
+import sys
+import timeit
+
+from azure.cli.core.commands.transform import ResultTransformer, _add_resource_group_field, _add_x509_hex_field
+from azure.cli.core.util import b64_to_hex
+
+
+def _legacy_parse_id(strid):
+    parts = re.split('/', strid)
+    if parts[3].lower() != 'resourcegroups':
+        raise KeyError()
+    return {'resource-group': parts[4], 'name': parts[8]}
+
+
+def _legacy_add_resource_group(obj):
+    if isinstance(obj, list):
+        for array_item in obj:
+            _legacy_add_resource_group(array_item)
+    elif isinstance(obj, dict):
+        try:
+            if 'resourcegroup' not in [x.lower() for x in obj.keys()]:
+                if obj['id']:
+                    obj['resourceGroup'] = _legacy_parse_id(obj['id'])['resource-group']
+        except (KeyError, IndexError, TypeError):
+            pass
+        for item_key in obj:
+            if item_key != 'sourceVault':
+                _legacy_add_resource_group(obj[item_key])
+
+
+def _legacy_add_x509_hex(obj):
+    if isinstance(obj, list):
+        for array_item in obj:
+            _legacy_add_x509_hex(array_item)
+    elif isinstance(obj, dict):
+        try:
+            if 'x509ThumbprintHex' not in obj:
+                if obj['x509Thumbprint']:
+                    obj['x509ThumbprintHex'] = b64_to_hex(obj['x509Thumbprint'])
+        except (KeyError, IndexError, TypeError):
+            pass
+        for item_key in obj:
+            _legacy_add_x509_hex(obj[item_key])
+
+
+def legacy_transform(result):
+    _legacy_add_resource_group(result)
+    _legacy_add_x509_hex(result)
+
+
+def build_result(count):
+    result = []
+    for i in range(count):
+        rid = '/subscriptions/00000000-0000-0000-0000-000000000000/resourceGroups/rg{}/providers/' \
+              'Microsoft.Compute/virtualMachines/vm{}'.format(i % 50, i)
+        result.append({
+            'id': rid,
+            'name': 'vm{}'.format(i),
+            'type': 'Microsoft.Compute/virtualMachines',
+            'location': 'westus',
+            'kind': None,
+            'managedBy': None,
+            'identity': None,
+            'plan': None,
+            'sku': {'name': 'Standard_DS2_v2', 'tier': 'Standard', 'capacity': None},
+            'tags': {'env': 'test', 'owner': 'perf', 'index': str(i)},
+            'properties': {
+                'provisioningState': 'Succeeded',
+                'osProfile': {'secrets': [{'sourceVault': {'id': rid}, 'x509Thumbprint': 'AQIDBA=='}]},
+                'networkProfile': {'networkInterfaces': [{'id': rid + '/nic', 'primary': True}]}
+            }
+        })
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    loops = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    template = build_result(count)
+
+    transformer = ResultTransformer()
+    transformer.register(_add_resource_group_field, skip_keys=('sourceVault',))
+    transformer.register(_add_x509_hex_field)
+
+    expected, actual = copy.deepcopy(template), copy.deepcopy(template)
+    legacy_transform(expected)
+    transformer.transform(actual)
+    assert expected == actual, 'single-pass transform output differs from the two-pass transform'
+
+    for name, func in [('two-pass (legacy)', legacy_transform), ('single-pass', transformer.transform)]:
+        timings = []
+        for _ in range(loops):
+            data = copy.deepcopy(template)
+            timings.append(timeit.timeit(lambda: func(data), number=1))  # pylint: disable=cell-var-from-loop
+        print('{:<20} {} objects: best {:.3f}s  mean {:.3f}s'.format(
+            name, count, min(timings), sum(timings) / len(timings)))
+
+
+if __name__ == '__main__':
+    main()
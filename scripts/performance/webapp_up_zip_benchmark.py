@@ -0,0 +1,95 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Micro-benchmark of zipping an `az webapp up` project.
+
+Builds a synthetic Node or Python project (default 5000 source files plus a few larger assets) and zips it
+with the previous single threaded zipfile.write loop, then with the parallel, incremental packaging: a cold run
+with an empty package cache, a run after one file changed, and a run with nothing changed. All archives must
+have the same contents.
+Usage: python webapp_up_zip_benchmark.py [node|python] [number_of_files]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+import zipfile
+
+from azure.cli.command_modules.appservice._create_util import zip_contents_from_dir, _get_files_to_zip
+
+
+def build_project(root, lang, count):
+    rnd = random.Random(0)
+    words = ['const', 'function', 'return', 'import', 'value', 'request', 'response', 'self', 'data', 'await']
+    ext = 'js' if lang == 'node' else 'py'
+    for i in range(count):
+        directory = os.path.join(root, 'src', 'pkg{}'.format(i // 200))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'module{}.{}'.format(i, ext)), 'w') as f:
+            f.write(' '.join(rnd.choice(words) for _ in range(rnd.randint(200, 2000))))
+    os.makedirs(os.path.join(root, 'static'))
+    for i in range(8):
+        with open(os.path.join(root, 'static', 'asset{}.bin'.format(i)), 'wb') as f:
+            f.write(os.urandom(2 * 1024 * 1024) + b'\0' * 2 * 1024 * 1024)
+    # excluded from the package
+    excluded = os.path.join(root, 'node_modules' if lang == 'node' else 'env', 'lib')
+    os.makedirs(excluded)
+    with open(os.path.join(excluded, 'index.{}'.format(ext)), 'w') as f:
+        f.write('excluded')
+
+
+def legacy_zip(root, lang):
+    zip_file_path = os.path.join(tempfile.gettempdir(), 'legacy-{}.zip'.format(os.getpid()))
+    with zipfile.ZipFile(zip_file_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for absname, arcname in _get_files_to_zip(root, lang, os.path.abspath(root)):
+            zf.write(absname, arcname)
+    return zip_file_path
+
+
+def contents(zip_file_path):
+    with zipfile.ZipFile(zip_file_path) as zf:
+        assert zf.testzip() is None
+        return {info.filename: info.CRC for info in zf.infolist()}
+
+
+def main():
+    lang = sys.argv[1] if len(sys.argv) > 1 else 'node'
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    root = tempfile.mkdtemp()
+    cache_dir = tempfile.mkdtemp()
+    zips = []
+    try:
+        build_project(root, lang, count)
+        print('{} project with {} source files under {}'.format(lang, count, root))
+
+        def _run(name, func):
+            result = []
+            elapsed = timeit.timeit(lambda: result.append(func()), number=1)
+            zips.append(result[0])
+            print('{:<32} {:.3f}s {:>10} bytes'.format(name, elapsed, os.path.getsize(result[0])))
+            return contents(result[0])
+
+        def incremental():
+            return zip_contents_from_dir(root, lang, cache_dir=cache_dir)
+
+        expected = _run('zipfile.write loop (legacy)', lambda: legacy_zip(root, lang))
+        assert expected == _run('parallel, cold cache', incremental)
+        with open(os.path.join(root, 'src', 'pkg0', 'module0.{}'.format('js' if lang == 'node' else 'py')), 'a') as f:
+            f.write('\n// changed')
+        changed = _run('incremental, one file changed', incremental)
+        assert set(changed) == set(expected)
+        assert changed == _run('incremental, unchanged', incremental)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        for path in zips:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
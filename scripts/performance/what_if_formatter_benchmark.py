@@ -0,0 +1,155 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Micro-benchmark of the what-if formatter over a large synthetic WhatIfOperationResult.
+
+Builds a result with many resource changes (default 5000) of every change type, with nested objects, arrays and
+property changes, and formats it with the formatter of the revision before the streaming formatter, loaded from
+git, and with the current one, both into a string and streamed. All the outputs must be identical. The best time
+of a few runs and the peak memory allocated while formatting are reported.
+Usage: python what_if_formatter_benchmark.py [number_of_changes] [--repeat N] [--legacy-revision REV]
+"""
+
+import argparse
+import importlib
+import io
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+from azure.mgmt.resource.resources.models import (WhatIfOperationResult, WhatIfChange, WhatIfPropertyChange,
+                                                  ChangeType, PropertyChangeType)
+from azure.cli.command_modules.resource import _formatters
+
+RESOURCE_MODULE = 'src/azure-cli/azure/cli/command_modules/resource'
+LEGACY_MODULES = ['_color.py', '_formatters.py', '_symbol.py', '_utils.py']
+
+
+def load_legacy_formatter(revision):
+    """ Import the formatter of `revision`, by default the parent of the commit that added the streaming one. """
+    repo = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    def git(*args):
+        return subprocess.check_output(['git'] + list(args), cwd=repo).decode('utf-8')
+
+    if not revision:
+        revision = git('log', '--format=%H', '--reverse', '-S', 'def write_what_if_operation_result', '--',
+                       RESOURCE_MODULE + '/_formatters.py').split()[0] + '^'
+    package_dir = tempfile.mkdtemp()
+    os.makedirs(os.path.join(package_dir, 'legacy_what_if'))
+    with open(os.path.join(package_dir, 'legacy_what_if', '__init__.py'), 'w'):
+        pass
+    for name in LEGACY_MODULES:
+        with open(os.path.join(package_dir, 'legacy_what_if', name), 'w', encoding='utf-8') as f:
+            f.write(git('show', '{}:{}/{}'.format(revision, RESOURCE_MODULE, name)))
+    sys.path.insert(0, package_dir)
+    try:
+        return revision, importlib.import_module('legacy_what_if._formatters')
+    finally:
+        sys.path.remove(package_dir)
+        shutil.rmtree(package_dir)
+
+
+def build_value(rnd, depth):
+    choice = rnd.random()
+    if depth > 3 or choice < 0.5:
+        return rnd.choice([None, True, 42, 3.5, 'value{}'.format(rnd.randint(0, 999)), [], {}])
+    if choice < 0.7:
+        return [build_value(rnd, depth + 1) for _ in range(rnd.randint(1, 12))]
+    return {'prop{}'.format(i): build_value(rnd, depth + 1) for i in range(rnd.randint(1, 8))}
+
+
+def build_resource(rnd, index):
+    return {'apiVersion': '2020-06-01', 'name': 'site{}'.format(index), 'location': 'westus',
+            'properties': {'property{}'.format(i): build_value(rnd, 1) for i in range(8)}, 'tags': {'env': 'test'}}
+
+
+def build_property_changes(rnd, depth=0, is_array=False):
+    changes = []
+    for index in range(rnd.randint(1, 6)):
+        path = str(index) if is_array else 'properties.path{}.property{}'.format(index, rnd.randint(0, 99))
+        change_type = rnd.choice([PropertyChangeType.create, PropertyChangeType.delete, PropertyChangeType.modify,
+                                  PropertyChangeType.array])
+        change = WhatIfPropertyChange(path=path, property_change_type=change_type)
+        if change_type == PropertyChangeType.create:
+            change.after = build_value(rnd, 1)
+        elif change_type == PropertyChangeType.delete:
+            change.before = build_value(rnd, 1)
+        elif change_type == PropertyChangeType.modify and depth < 2 and rnd.random() < 0.3:
+            change.children = build_property_changes(rnd, depth + 1)
+        elif change_type == PropertyChangeType.modify:
+            change.before = rnd.choice(['before', 1, None, [1, 2]])
+            change.after = rnd.choice(['after', 2, {'after': False}])
+        elif depth < 2:
+            change.children = build_property_changes(rnd, depth + 1, is_array=True)
+        changes.append(change)
+    return changes
+
+
+def build_result(count):
+    rnd = random.Random(0)
+    changes = []
+    for index in range(count):
+        resource_id = '/subscriptions/00000000-0000-0000-0000-000000000000/resourceGroups/rg{}/providers/' \
+                      'Microsoft.Web/sites/site{}'.format(rnd.randint(0, 19), index)
+        change_type = rnd.choice([ChangeType.create, ChangeType.delete, ChangeType.modify, ChangeType.modify,
+                                  ChangeType.deploy, ChangeType.no_change, ChangeType.ignore])
+        changes.append(WhatIfChange(
+            resource_id=resource_id, change_type=change_type,
+            before=build_resource(rnd, index) if change_type != ChangeType.create else None,
+            after=build_resource(rnd, index) if change_type != ChangeType.delete else None,
+            delta=build_property_changes(rnd) if change_type == ChangeType.modify else None))
+    return WhatIfOperationResult(status='Succeeded', changes=changes)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('count', nargs='?', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--legacy-revision', help='Git revision of the formatter to compare with.')
+    ns = parser.parse_args()
+
+    revision, legacy_formatters = load_legacy_formatter(ns.legacy_revision)
+    result = build_result(ns.count)
+    formatters = [
+        ('string builder (legacy)', lambda stream: stream.write(legacy_formatters.format_what_if_operation_result(result))),
+        ('string builder', lambda stream: stream.write(_formatters.format_what_if_operation_result(result))),
+        ('streaming', lambda stream: _formatters.write_what_if_operation_result(result, stream)),
+    ]
+
+    print('{} resource changes, legacy formatter from {}'.format(ns.count, revision))
+    print('{:<28} {:>10} {:>10} {:>12}'.format('Formatter', 'Time (s)', 'Peak (MB)', 'Output (MB)'))
+    expected = None
+    for name, func in formatters:
+        stream = io.StringIO()
+        func(stream)
+        output = stream.getvalue()
+        if expected is None:
+            expected = output
+        assert output == expected, name
+        del stream, output
+
+        with open(os.devnull, 'w') as devnull:
+            elapsed = float('inf')
+            for _ in range(ns.repeat):
+                start = timeit.default_timer()
+                func(devnull)
+                elapsed = min(elapsed, timeit.default_timer() - start)
+
+            tracemalloc.start()
+            func(devnull)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        print('{:<28} {:>10.2f} {:>10.1f} {:>12.1f}'.format(
+            name, elapsed, peak / 1024 / 1024, len(expected) / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
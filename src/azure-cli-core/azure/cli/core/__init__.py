@@ -24,6 +24,7 @@ from knack.experimental import ExperimentalItem
 from knack.util import CLIError
 from knack.arguments import ArgumentsContext, CaseInsensitiveList  # pylint: disable=unused-import
 from .local_context import AzCLILocalContext, LocalContextAction
+from . import tracing
 
 logger = get_logger(__name__)
 
@@ -51,6 +52,7 @@ class AzCli(CLI):
         from azure.cli.core._session import ACCOUNT, CONFIG, SESSION, INDEX, VERSIONS
         from azure.cli.core.util import handle_version_update
         from azure.cli.core.commands.query_examples import register_global_query_examples_argument
+        from azure.cli.core.startup_profiler import startup_phase
 
         from knack.util import ensure_dir
 
@@ -62,21 +64,33 @@ class AzCli(CLI):
 
         azure_folder = self.config.config_dir
         ensure_dir(azure_folder)
-        ACCOUNT.load(os.path.join(azure_folder, 'azureProfile.json'))
-        CONFIG.load(os.path.join(azure_folder, 'az.json'))
-        SESSION.load(os.path.join(azure_folder, 'az.sess'), max_age=3600)
-        INDEX.load(os.path.join(azure_folder, 'commandIndex.json'))
-        VERSIONS.load(os.path.join(azure_folder, 'versionCheck.json'))
-        handle_version_update()
-
-        self.cloud = get_active_cloud(self)
+        # session files are only read when first used, so commands that don't need them don't pay for them
+        ACCOUNT.lazy_load(os.path.join(azure_folder, 'azureProfile.json'))
+        CONFIG.lazy_load(os.path.join(azure_folder, 'az.json'))
+        SESSION.lazy_load(os.path.join(azure_folder, 'az.sess'), max_age=3600)
+        INDEX.lazy_load(os.path.join(azure_folder, 'commandIndex.json'))
+        if self.data['completer_active']:
+            VERSIONS.lazy_load(os.path.join(azure_folder, 'versionCheck.json'))
+        elif 'ARM_CLOUD_METADATA_URL' in os.environ:
+            # cloud endpoints cached from the metadata url have to be refreshed after an update before the cloud
+            # is loaded, so versionCheck.json is read on every start in that case
+            VERSIONS.lazy_load(os.path.join(azure_folder, 'versionCheck.json'))
+            with startup_phase('handle version update'):
+                handle_version_update()
+        else:
+            # otherwise an update only invalidates versionCheck.json itself, so check it when it is first read
+            VERSIONS.lazy_load(os.path.join(azure_folder, 'versionCheck.json'), on_load=handle_version_update)
+
+        with startup_phase('load cloud'):
+            self.cloud = get_active_cloud(self)
         logger.debug('Current cloud config:\n%s', str(self.cloud.name))
-        self.local_context = AzCLILocalContext(self)
-        register_global_transforms(self)
-        register_global_subscription_argument(self)
-        register_global_query_examples_argument(self)
-        register_ids_argument(self)  # global subscription must be registered first!
-        register_cache_arguments(self)
+        with startup_phase('register global arguments'):
+            self.local_context = AzCLILocalContext(self)
+            register_global_transforms(self)
+            register_global_subscription_argument(self)
+            register_global_query_examples_argument(self)
+            register_ids_argument(self)  # global subscription must be registered first!
+            register_cache_arguments(self)
 
         self.progress_controller = None
 
@@ -231,6 +245,8 @@ class MainCommandsLoader(CLICommandsLoader):
                     self.command_group_table.update(module_group_table)
 
                     elapsed_time = timeit.default_timer() - start_time
+                    tracing.add_span('load command table: {}'.format(mod), 'command_table', start_time, elapsed_time,
+                                     groups=len(module_group_table), commands=len(module_command_table))
                     logger.debug(self.item_format_string, mod, elapsed_time,
                                  len(module_group_table), len(module_command_table))
                     count += 1
@@ -332,6 +348,9 @@ class MainCommandsLoader(CLICommandsLoader):
                         self.command_group_table.update(extension_group_table)
 
                         elapsed_time = timeit.default_timer() - start_time
+                        tracing.add_span('load command table: {}'.format(ext_name), 'command_table', start_time,
+                                         elapsed_time, groups=len(extension_group_table),
+                                         commands=len(extension_command_table))
                         logger.debug(self.item_ext_format_string, ext_name, elapsed_time,
                                      len(extension_group_table), len(extension_command_table),
                                      ext_dir)
@@ -584,6 +603,10 @@ class CommandIndex:
         self.INDEX[self._COMMAND_INDEX_VERSION] = ""
         self.INDEX[self._COMMAND_INDEX_CLOUD_PROFILE] = ""
         self.INDEX[self._COMMAND_INDEX] = {}
+        # the help of the new commands may differ too
+        from azure.cli.core._environment import get_config_dir
+        from azure.cli.core._help_index import HelpIndex
+        HelpIndex(config_dir=get_config_dir()).invalidate()
         logger.debug("Command index has been invalidated.")
 
 
@@ -162,6 +162,8 @@ class AzCliHelp(CLIPrintMixin, CLIHelp):
 
         self._register_help_loaders()
         self._name_to_content = {}
+        from azure.cli.core._help_index import HelpIndex
+        self.help_index = HelpIndex(cli_ctx)
 
     def show_help(self, cli_name, nouns, parser, is_group):
         self.update_loaders_with_help_file_contents(nouns)
@@ -175,6 +177,7 @@ class AzCliHelp(CLIPrintMixin, CLIHelp):
         else:
             AzCliHelp.update_examples(help_file)
         self._print_detailed_help(cli_name, help_file)
+        self.help_index.save()
         from azure.cli.core.util import show_updates_available
         show_updates_available(new_line_after=True)
         show_link = self.cli_ctx.config.getboolean('output', 'show_survey_link', True)
@@ -293,6 +296,21 @@ class CliHelpFile(KnackHelpFile):
                 if self._should_include_example(d):
                     self.examples.append(HelpExample(**d))
 
+    # Needs to override base implementation to read the parsed help from the help index.
+    def _load_from_file(self):
+        from knack.help_files import helps
+        text = helps.get(self.delimiters)
+        if not text:
+            return
+        help_index = getattr(self.help_ctx, 'help_index', None)
+        if help_index and isinstance(text, str):
+            file_data = help_index.get(self.delimiters, text)
+        else:
+            import yaml
+            file_data = yaml.safe_load(text)
+        if file_data:
+            self._load_from_data(file_data)
+
     def load(self, options):
         ordered_loaders = sorted(self.help_ctx.versioned_loaders.values(), key=lambda ldr: ldr.version)
         for loader in ordered_loaders:
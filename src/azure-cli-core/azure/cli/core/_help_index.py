@@ -0,0 +1,129 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+HELP_INDEX_FILE = 'helpIndex.jsonl'
+
+
+class HelpIndex(object):
+    """Parsed help entries, keyed by command path, so that help is shown without parsing YAML.
+
+    The index is a file in the config directory. Its first line is a JSON header with the CLI version the index
+    was built with, a different version discards the index, and the offset and length of the entry of each command
+    path. Each other line is the entry of one command path: the JSON of the hash of the YAML help text and its
+    parsed data. Only the header and the entries of the requested command paths are read, and an entry whose YAML
+    text changed is parsed again, so the index never serves stale help. Entries are added the first time a command
+    or group help is shown. Installing, updating or removing an extension discards the index together with the
+    command index.
+    """
+
+    def __init__(self, cli_ctx=None, config_dir=None):
+        from azure.cli.core import __version__
+        if cli_ctx:
+            config_dir = cli_ctx.config.config_dir
+            self.enabled = cli_ctx.config.getboolean('core', 'help_index', fallback=True)
+        else:
+            self.enabled = True
+        self.path = os.path.join(config_dir, HELP_INDEX_FILE)
+        self.version = __version__
+        self._offsets = None
+        self._start = 0
+        self._updates = {}
+
+    def _load_offsets(self):
+        self._offsets = {}
+        try:
+            with open(self.path, 'rb') as f:
+                header = json.loads(f.readline().decode('utf-8'))
+                if header.get('version') != self.version:
+                    logger.debug("Help index was built by another version and is discarded.")
+                    return
+                self._start = f.tell()
+                self._offsets = header.get('offsets') or {}
+        except (OSError, IOError, ValueError, AttributeError):
+            pass
+
+    def _read_entries(self, commands):
+        """ Return {command: entry json} of the indexed `commands`. """
+        entries = {}
+        try:
+            with open(self.path, 'rb') as f:
+                for command in commands:
+                    offset, length = self._offsets[command]
+                    f.seek(self._start + offset)
+                    entries[command] = f.read(length).decode('utf-8')
+        except (OSError, IOError, ValueError, TypeError, KeyError):
+            pass
+        return entries
+
+    def get(self, command, text):
+        """ Return the parsed YAML help `text` of `command`. """
+        import yaml
+        if not self.enabled:
+            return yaml.safe_load(text)
+        if self._offsets is None:
+            self._load_offsets()
+
+        text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+        if command in self._offsets:
+            try:
+                # another process may have rewritten the index since the header was read, the hash tells
+                entry = json.loads(self._read_entries([command])[command])
+                if entry[0] == text_hash:
+                    return entry[1]
+            except (ValueError, IndexError, TypeError, KeyError):
+                pass
+
+        data = yaml.safe_load(text)
+        try:
+            # YAML types without a JSON equivalent, like dates, are not indexed
+            if json.loads(json.dumps(data)) == data:
+                self._updates[command] = json.dumps([text_hash, data])
+        except (TypeError, ValueError):
+            pass
+        return data
+
+    def save(self):
+        """ Write the entries added since the index was loaded. """
+        if not self._updates:
+            return
+        if self._offsets is None:
+            self._load_offsets()
+        entries = self._read_entries(sorted(set(self._offsets) - set(self._updates)))
+        entries.update(self._updates)
+        self._updates = {}
+        try:
+            from knack.util import ensure_dir
+            ensure_dir(os.path.dirname(self.path))
+            offsets, body, offset = {}, [], 0
+            for command, value in sorted(entries.items()):
+                value = value.rstrip('\n').encode('utf-8')
+                offsets[command] = [offset, len(value)]
+                body.append(value + b'\n')
+                offset += len(value) + 1
+            header = json.dumps({'version': self.version, 'offsets': offsets}).encode('utf-8') + b'\n'
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+            with open(tmp_path, 'wb') as f:
+                f.write(header)
+                f.writelines(body)
+            os.replace(tmp_path, self.path)
+            self._offsets, self._start = offsets, len(header)
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save the help index: %s", ex)
+
+    def invalidate(self):
+        self._offsets = {}
+        self._updates = {}
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -5,12 +5,18 @@
 
 import knack.output
 
+from azure.cli.core.tracing import trace_span
+
 
 class AzOutputProducer(knack.output.OutputProducer):
 
     def check_valid_format_type(self, format_type):
         return format_type in self._FORMAT_DICT
 
+    def out(self, obj, formatter=None, out_file=None):
+        with trace_span('format output', 'output'):
+            return super(AzOutputProducer, self).out(obj, formatter=formatter, out_file=out_file)
+
 
 def get_output_format(cli_ctx):
     return cli_ctx.invocation.data.get("output", None)
@@ -6,6 +6,7 @@
 import json
 import logging
 import os
+import threading
 import time
 
 try:
@@ -34,16 +35,53 @@ class Session(collections.MutableMapping):
     def __init__(self, encoding=None):
         super(Session, self).__init__()
         self.filename = None
-        self.data = {}
+        self._data = {}
+        self._pending_load = None
+        self._on_load = None
+        self._load_lock = threading.Lock()
         self._encoding = encoding if encoding else 'utf-8-sig'
 
+    @property
+    def data(self):
+        if self._pending_load is not None:
+            on_load = None
+            with self._load_lock:
+                # another thread may have loaded the file while this one was waiting
+                if self._pending_load is not None:
+                    on_load, self._on_load = self._on_load, None
+                    self._load_pending()
+            # outside the lock, the callback is free to read and write the session
+            if on_load:
+                on_load()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        # publish the data before clearing the pending load, readers check the latter without the lock
+        self._data = value
+        self._pending_load = None
+
+    def lazy_load(self, filename, max_age=0, on_load=None):
+        """ Like `load`, but the file is only read on first access to the session data.
+        `on_load` is called once, right after that read. """
+        self.filename = filename
+        self._data = {}
+        self._on_load = on_load
+        self._pending_load = (filename, max_age)
+
+    def _load_pending(self):
+        from azure.cli.core.startup_profiler import startup_phase
+        filename, max_age = self._pending_load
+        with startup_phase('load {}'.format(os.path.basename(filename))):
+            self.load(filename, max_age)
+
     def load(self, filename, max_age=0):
         self.filename = filename
-        self.data = {}
         try:
             if max_age > 0:
                 st = os.stat(self.filename)
                 if st.st_mtime + max_age < time.time():
+                    self.data = {}
                     self.save()
             with codecs_open(self.filename, 'r', encoding=self._encoding) as f:
                 self.data = json.load(f)
@@ -58,6 +96,7 @@ class Session(collections.MutableMapping):
             get_logger(__name__).log(log_level,
                                      "Failed to load or parse file %s. It will be overridden by default settings.",
                                      self.filename)
+            self.data = {}
             self.save()
 
     def save(self):
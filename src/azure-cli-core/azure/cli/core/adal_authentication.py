@@ -11,6 +11,7 @@ import adal
 from msrest.authentication import Authentication
 from msrestazure.azure_active_directory import MSIAuthentication
 from azure.core.credentials import AccessToken
+from azure.cli.core.tracing import trace_span
 from azure.cli.core.util import in_cloud_console, scopes_to_resource
 
 from knack.util import CLIError
@@ -37,9 +38,10 @@ class AdalAuthentication(Authentication):  # pylint: disable=too-few-public-meth
         """
         external_tenant_tokens = None
         try:
-            scheme, token, full_token = self._token_retriever(sdk_resource)
-            if self._external_tenant_token_retriever:
-                external_tenant_tokens = self._external_tenant_token_retriever(sdk_resource)
+            with trace_span('acquire token', 'auth', resource=sdk_resource):
+                scheme, token, full_token = self._token_retriever(sdk_resource)
+                if self._external_tenant_token_retriever:
+                    external_tenant_tokens = self._external_tenant_token_retriever(sdk_resource)
         except CLIError as err:
             if in_cloud_console():
                 AdalAuthentication._log_hostname()
@@ -124,7 +126,8 @@ class MSIAuthenticationWrapper(MSIAuthentication):
         import traceback
         from azure.cli.core.azclierror import AzureConnectionError, AzureResponseError
         try:
-            super(MSIAuthenticationWrapper, self).set_token()
+            with trace_span('acquire token', 'auth', resource=self.resource):
+                super(MSIAuthenticationWrapper, self).set_token()
         except requests.exceptions.ConnectionError as err:
             logger.debug('throw requests.exceptions.ConnectionError when doing MSIAuthentication: \n%s',
                          traceback.format_exc())
@@ -28,6 +28,7 @@ from azure.cli.core.commands.parameters import (
 from azure.cli.core.extension import get_extension
 from azure.cli.core.util import get_command_type_kwarg, read_file_content, get_arg_list, poller_classes
 from azure.cli.core.local_context import LocalContextAction
+from azure.cli.core.tracing import trace_span
 import azure.cli.core.telemetry as telemetry
 
 
@@ -506,7 +507,8 @@ class AzCliCommandInvoker(CommandInvoker):
         args = _pre_command_table_create(self.cli_ctx, args)
 
         self.cli_ctx.raise_event(EVENT_INVOKER_PRE_CMD_TBL_CREATE, args=args)
-        self.commands_loader.load_command_table(args)
+        with trace_span('load command table', 'command_table'):
+            self.commands_loader.load_command_table(args)
         self.cli_ctx.raise_event(EVENT_INVOKER_PRE_CMD_TBL_TRUNCATE,
                                  load_cmd_tbl_func=self.commands_loader.load_command_table, args=args)
         command = self._rudimentary_get_command(args)
@@ -550,7 +552,8 @@ class AzCliCommandInvoker(CommandInvoker):
         self.commands_loader.command_table = self.commands_loader.command_table  # update with the truncated table
         self.commands_loader.command_name = command
         self.cli_ctx.raise_event(EVENT_INVOKER_PRE_LOAD_ARGUMENTS, commands_loader=self.commands_loader)
-        self.commands_loader.load_arguments(command)
+        with trace_span('load arguments', 'arguments', command=command):
+            self.commands_loader.load_arguments(command)
         self.cli_ctx.raise_event(EVENT_INVOKER_POST_LOAD_ARGUMENTS, commands_loader=self.commands_loader)
         self.cli_ctx.raise_event(EVENT_INVOKER_POST_CMD_TBL_CREATE, commands_loader=self.commands_loader)
         self.parser.cli_ctx = self.cli_ctx
@@ -576,7 +579,8 @@ class AzCliCommandInvoker(CommandInvoker):
         self.parser.enable_autocomplete()
 
         self.cli_ctx.raise_event(EVENT_INVOKER_PRE_PARSE_ARGS, args=args)
-        parsed_args = self.parser.parse_args(args)
+        with trace_span('parse arguments', 'parse'):
+            parsed_args = self.parser.parse_args(args)
         self.cli_ctx.raise_event(EVENT_INVOKER_POST_PARSE_ARGS, command=parsed_args.command, args=parsed_args)
 
         # print local context warning
@@ -639,7 +643,8 @@ class AzCliCommandInvoker(CommandInvoker):
             if hasattr(expanded_arg, '_subscription'):
                 cmd_copy.cli_ctx.data['subscription_id'] = expanded_arg._subscription  # pylint: disable=protected-access
 
-            self._validation(expanded_arg)
+            with trace_span('validate arguments', 'validation'):
+                self._validation(expanded_arg)
             jobs.append((expanded_arg, cmd_copy))
 
         ids = getattr(parsed_args, '_ids', None) or [None] * len(jobs)
@@ -685,7 +690,8 @@ class AzCliCommandInvoker(CommandInvoker):
     def _run_job(self, expanded_arg, cmd_copy):
         params = self._filter_params(expanded_arg)
         try:
-            result = cmd_copy(params)
+            with trace_span('execute {}'.format(cmd_copy.name), 'execute'):
+                result = cmd_copy(params)
             if cmd_copy.supports_no_wait and getattr(expanded_arg, 'no_wait', False):
                 result = None
             elif cmd_copy.no_wait_param and getattr(expanded_arg, cmd_copy.no_wait_param, False):
@@ -700,9 +706,10 @@ class AzCliCommandInvoker(CommandInvoker):
             elif _is_paged(result):
                 result = list(result)
 
-            result = todict(result, AzCliCommandInvoker.remove_additional_prop_layer)
-            event_data = {'result': result}
-            cmd_copy.cli_ctx.raise_event(EVENT_INVOKER_TRANSFORM_RESULT, event_data=event_data)
+            with trace_span('transform result', 'transform'):
+                result = todict(result, AzCliCommandInvoker.remove_additional_prop_layer)
+                event_data = {'result': result}
+                cmd_copy.cli_ctx.raise_event(EVENT_INVOKER_TRANSFORM_RESULT, event_data=event_data)
             return event_data['result']
         except Exception as ex:  # pylint: disable=broad-except
             if cmd_copy.exception_handler:
@@ -939,6 +946,10 @@ class LongRunningOperation:  # pylint: disable=too-few-public-methods
                                 logger.info(result)
 
     def __call__(self, poller):
+        with trace_span('long running operation', 'lro', message=self.start_msg):
+            return self._wait(poller)
+
+    def _wait(self, poller):
         from msrest.exceptions import ClientException
 
         correlation_message = ''
@@ -11,8 +11,67 @@ import knack.events as events
 
 
 def register_global_transforms(cli_ctx):
-    cli_ctx.register_event(events.EVENT_INVOKER_TRANSFORM_RESULT, _resource_group_transform)
-    cli_ctx.register_event(events.EVENT_INVOKER_TRANSFORM_RESULT, _x509_from_base64_to_hex_transform)
+    transformer = get_result_transformer(cli_ctx)
+    transformer.register(_add_resource_group_field, skip_keys=('sourceVault',))
+    transformer.register(_add_x509_hex_field)
+
+
+def get_result_transformer(cli_ctx):
+    """ Return the ResultTransformer of the CLI, registering it for EVENT_INVOKER_TRANSFORM_RESULT on first use.
+
+    Transforms that need to look at every object of a command result should register a field handler with it
+    instead of registering their own EVENT_INVOKER_TRANSFORM_RESULT handler, so the result is only walked once.
+    """
+    transformer = getattr(cli_ctx, '_result_transformer', None)
+    if transformer is None:
+        transformer = ResultTransformer()
+        cli_ctx._result_transformer = transformer  # pylint: disable=protected-access
+        cli_ctx.register_event(events.EVENT_INVOKER_TRANSFORM_RESULT, transformer.on_transform_result)
+    return transformer
+
+
+class ResultTransformer(object):
+    """ Applies registered field handlers to every dict of a command result in a single recursive walk.
+
+    A handler is called with each dict, before the walk descends into its values. Handlers registered with
+    `skip_keys` are not applied to the subtrees under those keys.
+    """
+
+    def __init__(self):
+        self._handlers = ()
+        self._skip_keys = {}
+
+    def register(self, handler, skip_keys=None):
+        self._handlers += (handler,)
+        for key in skip_keys or []:
+            self._skip_keys.setdefault(key, set()).add(handler)
+
+    def on_transform_result(self, _, **kwargs):
+        self.transform(kwargs['event_data']['result'])
+
+    def transform(self, obj):
+        if self._handlers:
+            self._walk(obj, self._handlers)
+
+    def _walk(self, obj, handlers):
+        if isinstance(obj, list):
+            for item in obj:
+                if isinstance(item, (dict, list)):
+                    self._walk(item, handlers)
+        elif isinstance(obj, dict):
+            for handler in handlers:
+                handler(obj)
+            skip_keys = self._skip_keys
+            for key, value in obj.items():
+                if not isinstance(value, (dict, list)):
+                    continue
+                if key in skip_keys:
+                    skipped = skip_keys[key]
+                    child_handlers = tuple(h for h in handlers if h not in skipped)
+                    if child_handlers:
+                        self._walk(value, child_handlers)
+                else:
+                    self._walk(value, handlers)
 
 
 def _parse_id(strid):
@@ -26,43 +85,34 @@ def _parse_id(strid):
     return parsed
 
 
+def _add_resource_group_field(obj):
+    if not obj.get('id') or 'resourceGroup' in obj or any(x.lower() == 'resourcegroup' for x in obj):
+        return
+    try:
+        obj['resourceGroup'] = _parse_id(obj['id'])['resource-group']
+    except (KeyError, IndexError, TypeError):
+        pass
+
+
+def _add_x509_hex_field(obj):
+    if 'x509ThumbprintHex' in obj or not obj.get('x509Thumbprint'):
+        return
+    try:
+        obj['x509ThumbprintHex'] = b64_to_hex(obj['x509Thumbprint'])
+    except (KeyError, IndexError, TypeError):
+        pass
+
+
 def _add_resource_group(obj):
-    if isinstance(obj, list):
-        for array_item in obj:
-            _add_resource_group(array_item)
-    elif isinstance(obj, dict):
-        try:
-            if 'resourcegroup' not in [x.lower() for x in obj.keys()]:
-                if obj['id']:
-                    obj['resourceGroup'] = _parse_id(obj['id'])['resource-group']
-        except (KeyError, IndexError, TypeError):
-            pass
-        for item_key in obj:
-            if item_key != 'sourceVault':
-                _add_resource_group(obj[item_key])
+    transformer = ResultTransformer()
+    transformer.register(_add_resource_group_field, skip_keys=('sourceVault',))
+    transformer.transform(obj)
 
 
 def _add_x509_hex(obj):
-    if isinstance(obj, list):
-        for array_item in obj:
-            _add_x509_hex(array_item)
-    elif isinstance(obj, dict):
-        try:
-            if 'x509ThumbprintHex' not in obj:
-                if obj['x509Thumbprint']:
-                    obj['x509ThumbprintHex'] = b64_to_hex(obj['x509Thumbprint'])
-        except (KeyError, IndexError, TypeError):
-            pass
-        for item_key in obj:
-            _add_x509_hex(obj[item_key])
-
-
-def _resource_group_transform(_, **kwargs):
-    _add_resource_group(kwargs['event_data']['result'])
-
-
-def _x509_from_base64_to_hex_transform(_, **kwargs):
-    _add_x509_hex(kwargs['event_data']['result'])
+    transformer = ResultTransformer()
+    transformer.register(_add_x509_hex_field)
+    transformer.transform(obj)
 
 
 def gen_dict_to_list_transform(key='value'):
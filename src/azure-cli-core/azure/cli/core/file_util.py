@@ -42,6 +42,7 @@ def get_all_help(cli_ctx, skip=True):
                 logger.warning("Skipping '%s': %s", cmd, ex)
             else:
                 help_errors[cmd] = "Error '{}': {}".format(cmd, ex)
+    help_ctx.help_index.save()
     if help_errors:
         raise CLIError(help_errors)
     help_files = sorted(help_files, key=lambda x: x.command)
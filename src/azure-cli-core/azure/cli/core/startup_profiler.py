@@ -0,0 +1,109 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Lightweight startup profile shown with --debug.
+
+Startup phases are recorded with `startup_phase`. When `enable_import_timing` is called (by the entry point,
+before the CLI is imported, if --debug is on the command line), module imports are timed as well, similar to
+`python -X importtime`. `log_startup_profile` writes both reports to the debug log.
+"""
+
+import sys
+import timeit
+from contextlib import contextmanager
+
+# (phase name, elapsed seconds) in the order the phases finished
+_phases = []
+# module name -> [self seconds, cumulative seconds]
+_imports = {}
+_import_stack = []
+
+
+@contextmanager
+def startup_phase(name):
+    start = timeit.default_timer()
+    try:
+        yield
+    finally:
+        record_phase(name, timeit.default_timer() - start, start)
+
+
+def record_phase(name, elapsed, start=None):
+    from azure.cli.core import tracing
+    _phases.append((name, elapsed))
+    if start is None:
+        start = timeit.default_timer() - elapsed
+    tracing.add_span(name, 'startup', start, elapsed)
+
+
+class _TimedLoader(object):
+
+    def __init__(self, loader, name):
+        self._loader = loader
+        self._name = name
+
+    def __getattr__(self, item):
+        return getattr(self._loader, item)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        _import_stack.append(0.0)
+        start = timeit.default_timer()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            cumulative = timeit.default_timer() - start
+            nested = _import_stack.pop()
+            if _import_stack:
+                _import_stack[-1] += cumulative
+            _imports[self._name] = [cumulative - nested, cumulative]
+
+
+class _ImportTimingFinder(object):
+    """A meta path finder that wraps the loaders found by the other finders to time module execution."""
+
+    @staticmethod
+    def find_spec(fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is _ImportTimingFinder or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is None or not hasattr(spec.loader, 'exec_module'):
+            return spec
+        spec.loader = _TimedLoader(spec.loader, fullname)
+        return spec
+
+
+def enable_import_timing():
+    if _ImportTimingFinder not in sys.meta_path:
+        sys.meta_path.insert(0, _ImportTimingFinder)
+
+
+def disable_import_timing():
+    if _ImportTimingFinder in sys.meta_path:
+        sys.meta_path.remove(_ImportTimingFinder)
+
+
+def get_startup_profile(top=20):
+    """ Return the recorded phases and the `top` slowest imports (by cumulative time). """
+    imports = sorted(((name, t[0], t[1]) for name, t in _imports.items()), key=lambda i: i[2], reverse=True)
+    return list(_phases), imports[:top]
+
+
+def log_startup_profile(logger, top=20):
+    phases, imports = get_startup_profile(top)
+    if phases:
+        logger.debug('Startup profile (phase: seconds):\n%s',
+                     '\n'.join('{:>10.3f}  {}'.format(elapsed, name) for name, elapsed in phases))
+    if imports:
+        logger.debug('Slowest imports (self | cumulative seconds | module):\n%s',
+                     '\n'.join('{:>10.3f} | {:>10.3f} | {}'.format(self_time, cumulative, name)
+                               for name, self_time, cumulative in imports))
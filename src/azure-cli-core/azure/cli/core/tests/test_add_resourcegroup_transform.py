@@ -5,7 +5,7 @@
 
 import unittest
 from six import StringIO
-from azure.cli.core.commands.transform import _parse_id, _add_resource_group
+from azure.cli.core.commands.transform import _parse_id, _add_resource_group, get_result_transformer
 
 
 class TestResourceGroupTransform(unittest.TestCase):
@@ -86,5 +86,41 @@ class TestResourceGroupTransform(unittest.TestCase):
         })
 
 
+class TestResultTransformer(unittest.TestCase):
+
+    def _get_transformer(self):
+        from azure.cli.core.mock import DummyCli
+        return get_result_transformer(DummyCli())
+
+    def test_global_transforms_single_pass(self):
+        vault_id = TestResourceGroupTransform.CORRECT_ID.replace('virtualMachines/vMName', 'vaults/vault')
+        result = [{
+            'id': TestResourceGroupTransform.CORRECT_ID,
+            'secrets': [{
+                'sourceVault': {'id': vault_id, 'cert': {'x509Thumbprint': 'AQID'}},
+                'x509Thumbprint': 'AQID'
+            }],
+            'tags': None
+        }]
+        self._get_transformer().transform(result)
+        self.assertEqual(result[0]['resourceGroup'], 'REsourceGROUPname')
+        self.assertEqual(result[0]['secrets'][0]['x509ThumbprintHex'], '010203')
+        # the resource group transform skips 'sourceVault', the thumbprint transform does not
+        self.assertNotIn('resourceGroup', result[0]['secrets'][0]['sourceVault'])
+        self.assertEqual(result[0]['secrets'][0]['sourceVault']['cert']['x509ThumbprintHex'], '010203')
+
+    def test_register_field_handler(self):
+        transformer = self._get_transformer()
+        seen = []
+        transformer.register(lambda obj: seen.append(obj.get('name')), skip_keys=('properties',))
+        transformer.transform({'name': 'a', 'properties': {'name': 'b'}, 'children': [{'name': 'c'}]})
+        self.assertEqual(seen, ['a', 'c'])
+
+    def test_case_insensitive_resource_group_key_is_kept(self):
+        instance = {'id': TestResourceGroupTransform.CORRECT_ID, 'resourcegroup': 'lower'}
+        self._get_transformer().transform(instance)
+        self.assertNotIn('resourceGroup', instance)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -6,6 +6,7 @@
 from __future__ import print_function
 
 import logging
+import os
 import shutil
 import inspect
 from inspect import getmembers as inspect_getmembers
@@ -538,6 +539,108 @@ class TestHelpLoads(unittest.TestCase):
             return f.name
 
 
+class TestHelpIndex(unittest.TestCase):
+    def setUp(self):
+        from knack.help_files import helps
+        self.helps = helps
+        self.helps['test alpha'] = """
+            type: command
+            short-summary: Foo Bar Command
+            long-summary: Foo Bar Baz Command is a fun command
+            parameters:
+                - name: --arg1 -a
+                  short-summary: A short summary
+                  populator-commands:
+                  - az foo bar
+            examples:
+                - name: Alpha Example
+                  text: az test alpha --arg1 a --arg2 b
+        """
+        self._tempdirName = tempfile.mkdtemp(prefix="help_index_test_temp_dir_")
+
+    def tearDown(self):
+        shutil.rmtree(self._tempdirName)
+        self.helps.clear()
+
+    def _show_help(self, enabled=True):
+        from io import StringIO
+        from azure.cli.core._help_index import HelpIndex
+        from azure.cli.core.parser import AzCliCommandParser
+
+        cli_ctx = DummyCli()
+        cli_ctx.invocation = cli_ctx.invocation_cls(cli_ctx=cli_ctx, commands_loader_cls=cli_ctx.commands_loader_cls,
+                                                    parser_cls=cli_ctx.parser_cls, help_cls=cli_ctx.help_cls)
+        help_ctx = cli_ctx.invocation.help
+        help_ctx.help_index = HelpIndex(config_dir=self._tempdirName)
+        help_ctx.help_index.enabled = enabled
+        parser = AzCliCommandParser(cli_ctx, prog='az test alpha')
+        parser.add_argument('--arg1', '-a', help='The first argument.')
+        parser.add_argument('--arg2', help='The second argument.')
+
+        with mock.patch('sys.stdout', new_callable=StringIO) as stdout:
+            help_ctx.show_help('az', ['test', 'alpha'], parser, False)
+        return stdout.getvalue().encode('utf-8')
+
+    def test_help_index_output_identical(self):
+        from azure.cli.core._help_index import HELP_INDEX_FILE
+        index_path = os.path.join(self._tempdirName, HELP_INDEX_FILE)
+
+        expected = self._show_help(enabled=False)
+        self.assertFalse(os.path.exists(index_path))
+
+        # the first help compiles the entry, the second one is served from the index without parsing YAML
+        self.assertEqual(self._show_help(), expected)
+        self.assertTrue(os.path.exists(index_path))
+        with mock.patch('yaml.safe_load', side_effect=AssertionError('YAML parsed')):
+            self.assertEqual(self._show_help(), expected)
+
+        # changed help text is parsed again
+        self.helps['test alpha'] = self.helps['test alpha'].replace('fun command', 'funnier command')
+        self.assertIn(b'funnier command', self._show_help())
+
+    def test_help_index_discarded_for_other_version(self):
+        from azure.cli.core._help_index import HelpIndex
+        help_index = HelpIndex(config_dir=self._tempdirName)
+        help_index.get('test alpha', self.helps['test alpha'])
+        help_index.save()
+
+        help_index = HelpIndex(config_dir=self._tempdirName)
+        help_index.version = '0.0.0'
+        with mock.patch('yaml.safe_load', return_value={'type': 'command'}) as safe_load:
+            self.assertEqual(help_index.get('test alpha', self.helps['test alpha']), {'type': 'command'})
+        safe_load.assert_called_once()
+
+    def test_help_index_reads_requested_entries(self):
+        from azure.cli.core._help_index import HelpIndex
+        help_index = HelpIndex(config_dir=self._tempdirName)
+        help_index.get('test alpha', self.helps['test alpha'])
+        help_index.save()
+        help_index = HelpIndex(config_dir=self._tempdirName)
+        help_index.get('test beta', 'type: group\nshort-summary: Beta.\n')
+        help_index.save()
+
+        help_index = HelpIndex(config_dir=self._tempdirName)
+        with mock.patch('yaml.safe_load', side_effect=AssertionError('YAML parsed')):
+            self.assertEqual(help_index.get('test beta', 'type: group\nshort-summary: Beta.\n'),
+                             {'type': 'group', 'short-summary': 'Beta.'})
+            self.assertEqual(help_index.get('test alpha', self.helps['test alpha'])['short-summary'],
+                             'Foo Bar Command')
+
+        # only the header and the requested entry are read
+        help_index = HelpIndex(config_dir=self._tempdirName)
+        with mock.patch.object(help_index, '_read_entries', wraps=help_index._read_entries) as read_mock:
+            help_index.get('test beta', 'type: group\nshort-summary: Beta.\n')
+        read_mock.assert_called_once_with(['test beta'])
+
+        # an entry added later keeps the others
+        help_index.get('test gamma', 'type: command\n')
+        help_index.save()
+        help_index = HelpIndex(config_dir=self._tempdirName)
+        with mock.patch('yaml.safe_load', side_effect=AssertionError('YAML parsed')):
+            self.assertEqual(help_index.get('test alpha', self.helps['test alpha'])['type'], 'command')
+            self.assertEqual(help_index.get('test gamma', 'type: command\n'), {'type': 'command'})
+
+
 class TestHelpSupportedProfiles(unittest.TestCase):
     def setUp(self):
         from azure.cli.core.profiles._shared import AZURE_API_PROFILES
@@ -0,0 +1,111 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+import mock
+
+from azure.cli.core._session import Session
+
+
+class TestSession(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'azureProfile.json')
+        with open(self.filename, 'w') as f:
+            json.dump({'subscriptions': [{'id': '1'}]}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_lazy_load_reads_file_on_first_access(self):
+        session = Session()
+        with mock.patch.object(session, 'load', wraps=session.load) as load_mock:
+            session.lazy_load(self.filename)
+            load_mock.assert_not_called()
+            self.assertEqual(session.filename, self.filename)
+
+            self.assertEqual(session['subscriptions'], [{'id': '1'}])
+            self.assertEqual(session.get('subscriptions'), [{'id': '1'}])
+            load_mock.assert_called_once_with(self.filename, 0)
+
+    def test_lazy_load_then_write(self):
+        session = Session()
+        session.lazy_load(self.filename)
+        session['installationId'] = 'abc'
+        with open(self.filename, 'r', encoding='utf-8-sig') as f:
+            self.assertEqual(json.load(f), {'subscriptions': [{'id': '1'}], 'installationId': 'abc'})
+
+    def test_lazy_load_missing_file(self):
+        session = Session()
+        session.lazy_load(os.path.join(self.tmp_dir, 'az.sess'), max_age=3600)
+        self.assertEqual(len(session), 0)
+        self.assertTrue(os.path.isfile(os.path.join(self.tmp_dir, 'az.sess')))
+
+    def test_lazy_load_concurrent_first_access(self):
+        session = Session()
+        session.lazy_load(self.filename)
+        json_load = json.load
+
+        def slow_json_load(f):
+            time.sleep(0.05)
+            return json_load(f)
+
+        barrier = threading.Barrier(8)
+        results, errors = [], []
+
+        def first_access():
+            barrier.wait()
+            try:
+                results.append(session.get('subscriptions'))
+            except Exception as ex:  # pylint: disable=broad-except
+                errors.append(ex)
+
+        with mock.patch.object(session, 'load', wraps=session.load) as load_mock, \
+                mock.patch('azure.cli.core._session.json.load', side_effect=slow_json_load):
+            threads = [threading.Thread(target=first_access) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            load_mock.assert_called_once_with(self.filename, 0)
+        self.assertEqual(errors, [])
+        self.assertEqual(results, [[{'id': '1'}]] * 8)
+
+    def test_lazy_load_on_load_runs_once_after_first_access(self):
+        session = Session()
+        seen = []
+
+        def on_load():
+            seen.append(session.get('subscriptions'))
+            session['checked'] = True
+
+        session.lazy_load(self.filename, on_load=on_load)
+        self.assertEqual(seen, [])
+
+        self.assertEqual(session['subscriptions'], [{'id': '1'}])
+        self.assertTrue(session['checked'])
+        self.assertEqual(seen, [[{'id': '1'}]])
+        list(session)
+        self.assertEqual(len(seen), 1)
+
+    def test_lazy_load_records_startup_phase(self):
+        from azure.cli.core import startup_profiler
+        session = Session()
+        session.lazy_load(self.filename)
+        list(session)
+        phases, _ = startup_profiler.get_startup_profile()
+        self.assertIn('load azureProfile.json', [name for name, _ in phases])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from azure.cli.core import tracing
+
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self._patches = [mock.patch.object(tracing, '_events', []), mock.patch.object(tracing, '_enabled', True)]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_trace_span_records_complete_event(self):
+        with tracing.trace_span('parse arguments', 'parse', command='vm list') as args:
+            args['extra'] = 1
+        events = tracing.get_events()
+        self.assertEqual(len(events), 1)
+        event = events[0]
+        self.assertEqual(event['name'], 'parse arguments')
+        self.assertEqual(event['cat'], 'parse')
+        self.assertEqual(event['ph'], 'X')
+        self.assertEqual(event['args'], {'command': 'vm list', 'extra': 1})
+        self.assertGreaterEqual(event['dur'], 0)
+
+    def test_trace_span_records_on_error(self):
+        with self.assertRaises(ValueError):
+            with tracing.trace_span('execute', 'execute'):
+                raise ValueError()
+        self.assertEqual([e['name'] for e in tracing.get_events()], ['execute'])
+
+    def test_disabled_records_nothing(self):
+        with mock.patch.object(tracing, '_enabled', False):
+            with tracing.trace_span('parse arguments'):
+                pass
+            tracing.add_span('load', 'startup', 0, 1)
+            self.assertIsNone(tracing.save(os.path.join(self.tmp_dir, 'trace.json')))
+        self.assertEqual(tracing.get_events(), [])
+
+    def test_save_to_file_and_directory(self):
+        from azure.cli.core import startup_profiler
+        startup_profiler.record_phase('load cloud', 0.5)
+
+        trace_file = tracing.save(os.path.join(self.tmp_dir, 'trace.json'))
+        with open(trace_file, 'r') as f:
+            data = json.load(f)
+        self.assertEqual([(e['name'], e['cat'], e['dur']) for e in data['traceEvents']],
+                         [('load cloud', 'startup', 500000)])
+
+        trace_file = tracing.save(self.tmp_dir)
+        self.assertEqual(os.path.dirname(trace_file), self.tmp_dir)
+        self.assertTrue(os.path.basename(trace_file).startswith('az-trace-'))
+
+    def test_instrument_requests(self):
+        import requests
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Length'] = '42'
+        response.elapsed = datetime.timedelta(milliseconds=15)
+        with mock.patch.object(requests.Session, 'send', return_value=response):
+            tracing.instrument_requests()
+            request = requests.Request('PUT', 'https://management.azure.com/subscriptions?sig=secret',
+                                       data=b'abcd').prepare()
+            self.assertIs(requests.Session().send(request), response)
+
+        event = tracing.get_events()[0]
+        self.assertEqual(event['name'], 'PUT https://management.azure.com/subscriptions')
+        self.assertEqual(event['cat'], 'http')
+        self.assertEqual(event['args'], {'request_size': 4, 'status_code': 200, 'response_size': 42,
+                                         'latency_ms': 15})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Opt-in local performance traces.
+
+Set AZURE_CLI_TRACE to a file path (or an existing directory) to have every az invocation write its spans -
+startup, command table load per module, argument load, parse, validation, token acquisition, HTTP requests,
+long running operation polling and output formatting - in the Chrome trace event format. The file can be
+opened with chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import json
+import os
+import threading
+import timeit
+from contextlib import contextmanager
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+TRACE_ENV_VAR = 'AZURE_CLI_TRACE'
+
+_events = []
+_enabled = bool(os.environ.get(TRACE_ENV_VAR))
+
+
+def is_enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled  # pylint: disable=global-statement
+    _enabled = True
+
+
+def add_span(name, category, start, elapsed, **args):
+    """ Record a finished span. `start` is a `timeit.default_timer()` value, `elapsed` is in seconds. """
+    if not _enabled:
+        return
+    _events.append({
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': int(start * 1e6),
+        'dur': int(elapsed * 1e6),
+        'pid': os.getpid(),
+        'tid': threading.current_thread().ident,
+        'args': args
+    })
+
+
+@contextmanager
+def trace_span(name, category='cli', **args):
+    """ Record the enclosed block as a span. `args` are attached to the span and can be updated inside the block. """
+    if not _enabled:
+        yield args
+        return
+    start = timeit.default_timer()
+    try:
+        yield args
+    finally:
+        add_span(name, category, start, timeit.default_timer() - start, **args)
+
+
+def get_events():
+    return list(_events)
+
+
+def _get_trace_file(target):
+    if os.path.isdir(target):
+        import datetime
+        return os.path.join(target, 'az-trace-{}-{}.json'.format(
+            datetime.datetime.now().strftime('%Y%m%d%H%M%S%f'), os.getpid()))
+    return target
+
+
+def save(target=None):
+    """ Write the recorded spans to `target` (default: the AZURE_CLI_TRACE value). Returns the file written. """
+    target = target or os.environ.get(TRACE_ENV_VAR)
+    if not _enabled or not target:
+        return None
+    trace_file = _get_trace_file(target)
+    try:
+        with open(trace_file, 'w') as f:
+            json.dump({'traceEvents': _events, 'displayTimeUnit': 'ms'}, f)
+    except (OSError, IOError) as ex:
+        logger.warning("Failed to write the performance trace to '%s': %s", trace_file, ex)
+        return None
+    logger.debug("Performance trace written to '%s'", trace_file)
+    return trace_file
+
+
+def instrument_requests():
+    """ Record a span for every HTTP request sent through `requests`, used by both track 1 and track 2 SDKs. """
+    import requests
+    original_send = requests.Session.send
+    if getattr(original_send, '_az_traced', False) is True:
+        return
+
+    def _traced_send(session, request, **kwargs):
+        with trace_span('{} {}'.format(request.method, _strip_query(request.url)), 'http') as args:
+            body = request.body
+            args['request_size'] = len(body) if isinstance(body, (bytes, str)) else 0
+            response = original_send(session, request, **kwargs)
+            args['status_code'] = response.status_code
+            args['response_size'] = int(response.headers.get('Content-Length') or 0)
+            args['latency_ms'] = int(response.elapsed.total_seconds() * 1000)
+            return response
+
+    _traced_send._az_traced = True  # pylint: disable=protected-access
+    requests.Session.send = _traced_send
+
+
+def _strip_query(url):
+    # query strings may contain SAS tokens
+    return url.split('?', 1)[0]
@@ -0,0 +1,216 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+"""Measure the CLI overhead by replaying recorded scenario tests.
+
+Every command a scenario test runs through `ExecutionResult` is timed and its wall time is split into the load
+(command table and arguments), parse (parsing and validation), execute, transform and output phases using the
+spans of `azure.cli.core.tracing`. The HTTP traffic is served by the vcr recordings, so the benchmark runs
+offline and what it measures is the time spent in the CLI itself.
+
+Usage:
+    python -m azure.cli.testsdk.benchmark [test ids] [--repeat N] [--save-baseline FILE]
+                                          [--baseline FILE] [--tolerance 0.25]
+
+Without test ids a curated set of scenario tests is replayed. With --baseline, the exit code is 1 when the
+mean time of a command or one of its phases exceeds the baseline by more than the tolerance.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import unittest
+from collections import OrderedDict
+
+import mock
+
+PHASES = ('load', 'parse', 'execute', 'transform', 'output')
+# regressions smaller than this many seconds are treated as noise, whatever the tolerance
+MIN_REGRESSION = 0.005
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_REPEAT = 3
+
+# Scenario tests whose recordings cover commands with small, medium and large command tables and outputs.
+DEFAULT_SCENARIOS = [
+    'azure.cli.command_modules.resource.tests.latest.test_resource.ResourceGroupScenarioTest.test_resource_group',
+    'azure.cli.command_modules.resource.tests.latest.test_resource.TagScenarioTest.test_tag_scenario',
+    'azure.cli.command_modules.vm.tests.latest.test_vm_commands.VMImageListByAliasesScenarioTest.'
+    'test_vm_image_list_by_alias',
+    'azure.cli.command_modules.vm.tests.latest.test_vm_commands.VMUsageScenarioTest.test_vm_usage',
+    'azure.cli.command_modules.vm.tests.latest.test_vm_commands.VMSizeListScenarioTest.test_vm_size_list',
+    'azure.cli.command_modules.vm.tests.latest.test_vm_commands.VMImageListSkusScenarioTest.test_vm_image_list_skus',
+    'azure.cli.command_modules.network.tests.latest.test_network_commands.NetworkUsageListScenarioTest.'
+    'test_network_usage_list',
+    'azure.cli.command_modules.network.tests.latest.test_network_commands.NetworkApplicationSecurityGroupScenario.'
+    'test_network_asg',
+]
+
+
+def _get_phase(span_name):
+    if span_name in ('load command table', 'load arguments'):
+        return 'load'
+    if span_name in ('parse arguments', 'validate arguments'):
+        return 'parse'
+    if span_name.startswith('execute '):
+        return 'execute'
+    if span_name == 'transform result':
+        return 'transform'
+    if span_name == 'format output':
+        return 'output'
+    return None
+
+
+class CommandTiming(object):
+    """ The wall time and per phase time of one command invocation. """
+
+    def __init__(self, command, wall, events):
+        self.command = command
+        self.wall = wall
+        self.phases = OrderedDict((phase, 0.0) for phase in PHASES)
+        for event in events:
+            phase = _get_phase(event['name'])
+            if phase:
+                self.phases[phase] += event['dur'] / 1e6
+            if phase == 'execute':
+                # the command name as resolved by the parser, without arguments
+                self.command = event['name'][len('execute '):]
+
+
+def summarize(timings):
+    """ Return {command: {'count', 'wall', <phase>...}} with the mean seconds per invocation of each command. """
+    totals = OrderedDict()
+    for timing in timings:
+        entry = totals.setdefault(timing.command, OrderedDict([('count', 0), ('wall', 0.0)] +
+                                                              [(phase, 0.0) for phase in PHASES]))
+        entry['count'] += 1
+        entry['wall'] += timing.wall
+        for phase, elapsed in timing.phases.items():
+            entry[phase] += elapsed
+    for entry in totals.values():
+        for key in ['wall'] + list(PHASES):
+            entry[key] /= entry['count']
+    return totals
+
+
+def compare(summary, baseline, tolerance=DEFAULT_TOLERANCE):
+    """ Return the (command, measure, baseline seconds, current seconds) of the regressions against `baseline`. """
+    regressions = []
+    for command, entry in summary.items():
+        expected = baseline.get(command)
+        if not expected:
+            continue
+        for key in ['wall'] + list(PHASES):
+            if key not in expected:
+                continue
+            if entry[key] > expected[key] * (1 + tolerance) and entry[key] - expected[key] > MIN_REGRESSION:
+                regressions.append((command, key, expected[key], entry[key]))
+    return regressions
+
+
+def run_scenarios(test_ids, repeat=DEFAULT_REPEAT, stream=None):
+    """ Replay the scenario tests `repeat` times and return the CommandTiming of every command they ran.
+
+    When the tests are replayed more than once, the first replay is a warm-up and is not measured.
+    """
+    from azure_devtools.scenario_tests.const import ENV_LIVE_TEST
+    from azure.cli.core import tracing
+    from .base import ExecutionResult
+
+    stream = stream or sys.stderr
+    # never record, a live run would overwrite the recordings
+    os.environ[ENV_LIVE_TEST] = 'False'
+    tracing.enable()
+    timings = []
+    original_execute = ExecutionResult._in_process_execute  # pylint: disable=protected-access
+
+    def _timed_execute(result, cli_ctx, command, expect_failure=False):
+        first_event = len(tracing.get_events())
+        start = timeit.default_timer()
+        try:
+            return original_execute(result, cli_ctx, command, expect_failure=expect_failure)
+        finally:
+            wall = timeit.default_timer() - start
+            name = command[3:] if command.startswith('az ') else command
+            timings.append(CommandTiming(name.split(' -')[0].strip(), wall, tracing.get_events()[first_event:]))
+
+    failed = False
+    with mock.patch.object(ExecutionResult, '_in_process_execute', _timed_execute):
+        for iteration in range(repeat):
+            suite = unittest.TestSuite()
+            for test in unittest.defaultTestLoader.loadTestsFromNames(test_ids):
+                for case in _iter_cases(test):
+                    if getattr(case, 'in_recording', False):
+                        stream.write('Skipping {}: no recording to replay\n'.format(case.id()))
+                        continue
+                    suite.addTest(case)
+            result = unittest.TextTestRunner(stream=stream, verbosity=1).run(suite)
+            failed = failed or not result.wasSuccessful()
+            if iteration == 0 and repeat > 1:
+                # the first replay pays for the module imports and warms up the caches
+                del timings[:]
+    if failed:
+        stream.write('Some scenarios failed to replay, their commands are only partially measured\n')
+    return timings
+
+
+def _iter_cases(test):
+    if isinstance(test, unittest.TestSuite):
+        for child in test:
+            for case in _iter_cases(child):
+                yield case
+    else:
+        yield test
+
+
+def format_summary(summary, baseline=None):
+    header = ' '.join('{:>9}'.format(phase) for phase in PHASES)
+    lines = ['{:<40} {:>5} {:>9} {}'.format('Command', 'Count', 'Wall (ms)', header)]
+    for command, entry in summary.items():
+        phases = ' '.join('{:>9.1f}'.format(entry[phase] * 1000) for phase in PHASES)
+        line = '{:<40} {:>5} {:>9.1f} {}'.format(command[:40], entry['count'], entry['wall'] * 1000, phases)
+        if baseline and command in baseline:
+            line += '  ({:+.0%} wall)'.format(entry['wall'] / baseline[command]['wall'] - 1
+                                              if baseline[command]['wall'] else 0)
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m azure.cli.testsdk.benchmark',
+                                     description='Replay recorded scenario tests and report the CLI overhead.')
+    parser.add_argument('tests', nargs='*', help='Test ids, e.g. '
+                        'azure.cli.command_modules.vm.tests.latest.test_vm_commands.VMUsageScenarioTest')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Times every scenario is replayed.')
+    parser.add_argument('--baseline', help='JSON file of a previous run to compare against.')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed slowdown against the baseline, as a fraction.')
+    parser.add_argument('--save-baseline', help='Write the results to this JSON file.')
+    ns = parser.parse_args(args)
+
+    summary = summarize(run_scenarios(ns.tests or DEFAULT_SCENARIOS, repeat=ns.repeat))
+    baseline = None
+    if ns.baseline:
+        with open(ns.baseline, 'r') as f:
+            baseline = json.load(f)
+    print(format_summary(summary, baseline))
+
+    if ns.save_baseline:
+        with open(ns.save_baseline, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+    if baseline:
+        regressions = compare(summary, baseline, ns.tolerance)
+        for command, key, expected, actual in regressions:
+            print('REGRESSION {} {}: {:.1f} ms -> {:.1f} ms'.format(command, key, expected * 1000, actual * 1000))
+        if regressions:
+            return 1
+        print('No regressions beyond {:.0%} of the baseline'.format(ns.tolerance))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+
+from azure.cli.testsdk.benchmark import CommandTiming, summarize, compare, format_summary
+
+
+def _event(name, ms):
+    return {'name': name, 'dur': ms * 1000}
+
+
+def _timing(command, wall, load=0, parse=0, execute=0, transform=0, output=0):
+    events = [_event('load command table', load), _event('validate arguments', parse),
+              _event('execute ' + command, execute), _event('transform result', transform),
+              _event('format output', output), _event('unrelated span', 1000)]
+    return CommandTiming('unparsed ' + command, wall, events)
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_summarize(self):
+        summary = summarize([
+            _timing('group list', 0.2, load=50, parse=10, execute=100, transform=10, output=20),
+            _timing('vm list', 0.5, load=100, execute=300),
+            _timing('group list', 0.4, load=150, parse=30, execute=100, transform=30, output=40)])
+        self.assertEqual(list(summary), ['group list', 'vm list'])
+        group = summary['group list']
+        self.assertEqual(group['count'], 2)
+        self.assertEqual([round(group[k], 6) for k in ('wall', 'load', 'parse', 'execute', 'transform', 'output')],
+                         [0.3, 0.1, 0.02, 0.1, 0.02, 0.03])
+        self.assertEqual(summary['vm list']['count'], 1)
+        self.assertAlmostEqual(summary['vm list']['execute'], 0.3)
+
+    def test_compare(self):
+        baseline = {'group list': {'wall': 0.2, 'load': 0.1, 'execute': 0.001},
+                    'vm list': {'wall': 0.5}}
+        summary = {
+            'group list': {'wall': 0.26, 'load': 0.12, 'parse': 1.0, 'execute': 0.004,
+                           'transform': 0, 'output': 0},
+            'vm list': {'wall': 0.6, 'load': 0, 'parse': 0, 'execute': 0, 'transform': 0, 'output': 0},
+            'new command': {'wall': 9.0, 'load': 0, 'parse': 0, 'execute': 0, 'transform': 0, 'output': 0}}
+        # wall is 30% slower, load only 20% and execute is 4x slower but by less than the noise floor;
+        # measures and commands missing from the baseline are not compared
+        self.assertEqual(compare(summary, baseline), [('group list', 'wall', 0.2, 0.26)])
+        self.assertEqual(compare(summary, baseline, tolerance=0.1),
+                         [('group list', 'wall', 0.2, 0.26), ('group list', 'load', 0.1, 0.12),
+                          ('vm list', 'wall', 0.5, 0.6)])
+        self.assertEqual(compare(summary, baseline, tolerance=0.5), [])
+
+    def test_format_summary(self):
+        summary = summarize([_timing('group list', 0.3, load=100, parse=20, execute=150, transform=5, output=25)])
+        lines = format_summary(summary).split('\n')
+        self.assertEqual(lines, [
+            'Command                                  Count Wall (ms)      load     parse   execute transform    output',
+            'group list                                   1     300.0     100.0      20.0     150.0       5.0      25.0'])
+
+        lines = format_summary(summary, {'group list': {'wall': 0.25}, 'vm list': {'wall': 1.0}}).split('\n')
+        self.assertTrue(lines[1].endswith('  (+20% wall)'))
+        lines = format_summary(summary, {'group list': {'wall': 0}}).split('\n')
+        self.assertTrue(lines[1].endswith('  (+0% wall)'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,15 @@ start_time = timeit.default_timer()
 import sys
 import uuid
 
+from azure.cli.core import startup_profiler
+if '--debug' in sys.argv:
+    startup_profiler.enable_import_timing()
+startup_profiler.record_phase('import azure.cli.core', timeit.default_timer() - start_time, start_time)
+
+from azure.cli.core import tracing
+if tracing.is_enabled():
+    tracing.instrument_requests()
+
 import azure.cli.core.telemetry as telemetry
 from azure.cli.core import get_default_cli
 from knack.completion import ARGCOMPLETE_ENV_NAME
@@ -35,7 +44,8 @@ def cli_main(cli, args):
     return cli.invoke(args)
 
 
-az_cli = get_default_cli()
+with startup_profiler.startup_phase('create cli'):
+    az_cli = get_default_cli()
 
 telemetry.set_application(az_cli, ARGCOMPLETE_ENV_NAME)
 
@@ -67,6 +77,9 @@ finally:
                     invoke_finish_time - start_time,
                     init_finish_time - start_time,
                     invoke_finish_time - init_finish_time)
+        startup_profiler.record_phase('invoke', invoke_finish_time - init_finish_time, init_finish_time)
+        startup_profiler.log_startup_profile(logger)
+        tracing.save()
     except NameError:
         pass
 
@@ -19,27 +19,32 @@ from ._constants import TASK_VALID_VSTS_URLS
 logger = get_logger(__name__)
 
 
+# size of the uncompressed tar chunks that are compressed and uploaded as one block
+SOURCE_UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+# number of threads compressing and uploading blocks, overridable through
+# `az config set acr.source_upload_workers=<count>`
+DEFAULT_SOURCE_UPLOAD_WORKERS = 4
+
+
 def upload_source_code(cmd, client,
                        registry_name,
                        resource_group_name,
                        source_location,
-                       tar_file_path,
                        docker_file_path,
                        docker_file_in_tar):
-    _pack_source_code(source_location,
-                      tar_file_path,
-                      docker_file_path,
-                      docker_file_in_tar)
+    from ._build_context_cache import BuildContextCache
+    items = _walk_source_code(source_location, docker_file_path)
+
+    context_cache = BuildContextCache(cmd.cli_ctx, registry_name, resource_group_name)
+    context_hash = None
+    if context_cache.enabled:
+        context_hash = context_cache.hash_context(source_location, items, docker_file_path, docker_file_in_tar)
+        relative_path = context_cache.get(context_hash)
+        if relative_path:
+            logger.warning("The source code has not changed since it was last uploaded. "
+                           "Sending context to registry: %s...", registry_name)
+            return relative_path
 
-    size = os.path.getsize(tar_file_path)
-    unit = 'GiB'
-    for S in ['Bytes', 'KiB', 'MiB', 'GiB']:
-        if size < 1024:
-            unit = S
-            break
-        size = size / 1024.0
-
-    logger.warning("Uploading archived source code from '%s'...", tar_file_path)
     upload_url = None
     relative_path = None
     try:
@@ -54,29 +59,157 @@ def upload_source_code(cmd, client,
         raise CLIError("Failed to get a SAS URL to upload context.")
 
     account_name, endpoint_suffix, container_name, blob_name, sas_token = get_blob_info(upload_url)
-    BlockBlobService = get_sdk(cmd.cli_ctx, ResourceType.DATA_STORAGE, 'blob#BlockBlobService')
-    BlockBlobService(account_name=account_name,
-                     sas_token=sas_token,
-                     endpoint_suffix=endpoint_suffix).create_blob_from_path(
-                         container_name=container_name,
-                         blob_name=blob_name,
-                         file_path=tar_file_path)
+    BlockBlobService, BlobBlock = get_sdk(cmd.cli_ctx, ResourceType.DATA_STORAGE,
+                                          'blob#BlockBlobService', 'blob.models#BlobBlock')
+    blob_service = BlockBlobService(account_name=account_name,
+                                    sas_token=sas_token,
+                                    endpoint_suffix=endpoint_suffix)
+
+    def _put_block(block, block_id):
+        blob_service.put_block(container_name, blob_name, block, block_id)
+
+    max_workers = cmd.cli_ctx.config.getint('acr', 'source_upload_workers', fallback=DEFAULT_SOURCE_UPLOAD_WORKERS)
+    logger.warning("Uploading archived source code...")
+    with _GzipBlockUploader(_put_block, chunk_size=SOURCE_UPLOAD_CHUNK_SIZE, max_workers=max_workers) as uploader:
+        _pack_source_code(source_location, uploader, docker_file_path, docker_file_in_tar, items=items)
+    blob_service.put_block_list(container_name, blob_name, [BlobBlock(id=i) for i in uploader.block_ids])
+    if context_hash:
+        context_cache.put(context_hash, relative_path)
+
+    size = uploader.size
+    unit = 'GiB'
+    for S in ['Bytes', 'KiB', 'MiB', 'GiB']:
+        if size < 1024:
+            unit = S
+            break
+        size = size / 1024.0
+
     logger.warning("Sending context ({0:.3f} {1}) to registry: {2}...".format(
         size, unit, registry_name))
     return relative_path
 
 
-def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_file_in_tar):
+class _GzipBlockUploader(object):
+    """A write-only file object that streams what is written to it into the blocks of a block blob.
+
+    The data is cut into `chunk_size` chunks. Each chunk is compressed into its own gzip member and uploaded as
+    one block by `put_block(block, block_id)`; compression and upload run on `max_workers` threads while the
+    caller keeps writing. Concatenated gzip members form a valid gzip stream (RFC 1952), so the committed blob
+    is an ordinary .tar.gz. At most `2 * max_workers` chunks are held in memory.
+    """
+
+    def __init__(self, put_block, chunk_size=SOURCE_UPLOAD_CHUNK_SIZE, max_workers=DEFAULT_SOURCE_UPLOAD_WORKERS,
+                 compress_level=6):
+        from concurrent.futures import ThreadPoolExecutor
+        import threading
+        self._put_block = put_block
+        self._chunk_size = chunk_size
+        self._compress_level = compress_level
+        self._buffer = bytearray()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self._slots = threading.BoundedSemaphore(2 * max(1, max_workers))
+        self._futures = []
+        self._lock = threading.Lock()
+        self._error = None
+        self.block_ids = []
+        self.size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None:
+                self.close()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def write(self, data):
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self._submit(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def close(self):
+        """ Upload the remaining data and wait for all the blocks. Raises the first upload error, if any. """
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        for future in self._futures:
+            future.result()
+
+    def _submit(self, chunk):
+        if self._error is not None:
+            # stop packing as soon as a block fails
+            raise self._error
+        # block ids of a blob must all have the same length
+        block_id = '{:08d}'.format(len(self.block_ids))
+        self.block_ids.append(block_id)
+        self._slots.acquire()
+        future = self._executor.submit(self._compress_and_put, chunk, block_id)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _compress_and_put(self, chunk, block_id):
+        import zlib
+        # zlib releases the GIL while compressing, so chunks are compressed in parallel
+        compressor = zlib.compressobj(self._compress_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        block = compressor.compress(chunk) + compressor.flush()
+        try:
+            self._put_block(block, block_id)
+        except Exception as ex:  # pylint: disable=broad-except
+            self._error = self._error or ex
+            raise
+        with self._lock:
+            self.size += len(block)
+
+
+def _pack_source_code(source_location, fileobj, docker_file_path, docker_file_in_tar, items=None):
+    """ Write the build context, filtered by .dockerignore, as a tar stream into `fileobj`.
+    `items` are the (path, arcname) pairs returned by `_walk_source_code`, walked here if not given. """
     logger.warning("Packing source code into tar to upload...")
 
+    if items is None:
+        items = _walk_source_code(source_location, docker_file_path)
+
+    # stream mode: the tar is written sequentially, without seeking, to `fileobj`
+    with tarfile.open(fileobj=fileobj, mode="w|") as tar:
+        for name, arcname in items:
+            # create a TarInfo object from the file
+            tarinfo = tar.gettarinfo(name, arcname)
+
+            if tarinfo is None:
+                raise CLIError("tarfile: unsupported type {}".format(name))
+
+            # append the tar header and data to the archive
+            if tarinfo.isreg():
+                with open(name, "rb") as f:
+                    tar.addfile(tarinfo, f)
+            else:
+                tar.addfile(tarinfo)
+
+        # Add the Dockerfile if it's specified.
+        # In the case of run, there will be no Dockerfile.
+        if docker_file_path:
+            docker_file_tarinfo = tar.gettarinfo(
+                docker_file_path, docker_file_in_tar)
+            with open(docker_file_path, "rb") as f:
+                tar.addfile(docker_file_tarinfo, f)
+
+
+def _walk_source_code(source_location, docker_file_path):
+    """ Return the (path, arcname) pairs of the build context items that are not excluded, in archive order. """
     original_docker_file_name = os.path.basename(docker_file_path.replace("\\", os.sep))
     ignore_list, ignore_list_size = _load_dockerignore_file(source_location, original_docker_file_name)
     common_vcs_ignore_list = {'.git', '.gitignore', '.bzr', 'bzrignore', '.hg', '.hgignore', '.svn'}
 
-    def _ignore_check(tarinfo, parent_ignored, parent_matching_rule_index):
+    matcher = IgnoreMatcher(ignore_list or [])
+
+    def _ignore_check(name, parent_ignored, parent_matching_rule_index):
         # ignore common vcs dir or file
-        if tarinfo.name in common_vcs_ignore_list:
-            logger.warning("Excluding '%s' based on default ignore rules", tarinfo.name)
+        if name in common_vcs_ignore_list:
+            logger.warning("Excluding '%s' based on default ignore rules", name)
             return True, parent_matching_rule_index
 
         if ignore_list is None:
@@ -84,37 +217,27 @@ def _pack_source_code(source_location, tar_file_path, docker_file_path, docker_f
             # eg, it will ignore the files under .git folder.
             return parent_ignored, parent_matching_rule_index
 
-        for index, item in enumerate(ignore_list):
-            # stop checking the remaining rules whose priorities are lower than the parent matching rule
-            # at this point, current item should just inherit from parent
-            if index >= parent_matching_rule_index:
-                break
-            if re.match(item.pattern, tarinfo.name):
-                logger.debug(".dockerignore: rule '%s' matches '%s'.",
-                             item.rule, tarinfo.name)
-                return item.ignore, index
-
-        logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'",
-                     tarinfo.name, parent_ignored)
+        # only the rules whose priorities are higher than the parent matching rule are checked,
+        # if none of them matches, the item inherits from parent
+        index = matcher.match(name, parent_matching_rule_index)
+        if index is not None:
+            logger.debug(".dockerignore: rule '%s' matches '%s'.", ignore_list[index].rule, name)
+            return ignore_list[index].ignore, index
+
+        logger.debug(".dockerignore: no rule for '%s'. parent ignore '%s'", name, parent_ignored)
         # inherit from parent
         return parent_ignored, parent_matching_rule_index
 
-    with tarfile.open(tar_file_path, "w:gz") as tar:
-        # need to set arcname to empty string as the archive root path
-        _archive_file_recursively(tar,
-                                  source_location,
-                                  arcname="",
-                                  parent_ignored=False,
-                                  parent_matching_rule_index=ignore_list_size,
-                                  ignore_check=_ignore_check)
-
-        # Add the Dockerfile if it's specified.
-        # In the case of run, there will be no Dockerfile.
-        if docker_file_path:
-            docker_file_tarinfo = tar.gettarinfo(
-                docker_file_path, docker_file_in_tar)
-            with open(docker_file_path, "rb") as f:
-                tar.addfile(docker_file_tarinfo, f)
+    items = []
+    # need to set arcname to empty string as the archive root path
+    _walk_recursively(items,
+                      source_location,
+                      arcname="",
+                      parent_ignored=False,
+                      parent_matching_rule_index=ignore_list_size,
+                      ignore_check=_ignore_check,
+                      prune_check=matcher.can_prune)
+    return items
 
 
 class IgnoreRule:  # pylint: disable=too-few-public-methods
@@ -127,6 +250,10 @@ class IgnoreRule:  # pylint: disable=too-few-public-methods
             self.ignore = False
             rule = rule[1:]  # remove !
 
+        # the part of the rule before its first wildcard (or regex special character),
+        # any path the rule matches starts with it
+        self.literal_prefix = re.split(r'[*?\[\]\\+(){}|^$]', rule, maxsplit=1)[0]
+
         self.pattern = "^"
         tokens = rule.split('/')
         token_length = len(tokens)
@@ -145,6 +272,44 @@ class IgnoreRule:  # pylint: disable=too-few-public-methods
         self.pattern += "$"
 
 
+class IgnoreMatcher(object):
+    """The .dockerignore rules compiled for matching many paths.
+
+    `ignore_list` is ordered by priority, highest first. Rather than trying the rules one by one, the rules above
+    a priority cut-off are combined into a single regular expression whose alternatives are tried in priority
+    order, so the first (highest priority) matching rule wins just like in the rule by rule evaluation.
+    """
+
+    def __init__(self, ignore_list):
+        self._rules = ignore_list
+        self._regexes = {}
+        self._exception_prefixes = {}
+
+    def match(self, name, max_index):
+        """ Return the index of the highest priority rule matching `name` among the first `max_index` rules. """
+        if max_index <= 0:
+            return None
+        regex = self._regexes.get(max_index)
+        if regex is None:
+            regex = re.compile('|'.join('(?P<r{}>{})'.format(i, r.pattern)
+                                        for i, r in enumerate(self._rules[:max_index])))
+            self._regexes[max_index] = regex
+        m = regex.match(name)
+        # the rule's group closes last, so it is the last matched group even if the rule has groups of its own
+        return int(m.lastgroup[1:]) if m else None
+
+    def can_prune(self, dir_name, max_index):
+        """ Whether nothing under the excluded directory `dir_name` can be included again, so it needn't be
+        walked. That is the case when no exception (!) rule among the first `max_index` rules can match a path
+        under it. """
+        prefixes = self._exception_prefixes.get(max_index)
+        if prefixes is None:
+            prefixes = [r.literal_prefix for r in self._rules[:max_index] if not r.ignore]
+            self._exception_prefixes[max_index] = prefixes
+        dir_name += '/'
+        return not any(dir_name.startswith(p) or p.startswith(dir_name) for p in prefixes)
+
+
 def _load_dockerignore_file(source_location, original_docker_file_name):
     # reference: https://docs.docker.com/engine/reference/builder/#dockerignore-file
     docker_ignore_file = os.path.join(source_location, ".dockerignore")
@@ -181,31 +346,29 @@ def _load_dockerignore_file(source_location, original_docker_file_name):
     return ignore_list, len(ignore_list)
 
 
-def _archive_file_recursively(tar, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check):
-    # create a TarInfo object from the file
-    tarinfo = tar.gettarinfo(name, arcname)
-
-    if tarinfo is None:
-        raise CLIError("tarfile: unsupported type {}".format(name))
+def _walk_recursively(items, name, arcname, parent_ignored, parent_matching_rule_index, ignore_check,
+                      prune_check=None, is_dir=None):
+    if is_dir is None:
+        is_dir = os.path.isdir(name) and not os.path.islink(name)
 
     # check if the file/dir is ignored
     ignored, matching_rule_index = ignore_check(
-        tarinfo, parent_ignored, parent_matching_rule_index)
+        arcname, parent_ignored, parent_matching_rule_index)
 
     if not ignored:
-        # append the tar header and data to the archive
-        if tarinfo.isreg():
-            with open(name, "rb") as f:
-                tar.addfile(tarinfo, f)
-        else:
-            tar.addfile(tarinfo)
+        items.append((name, arcname))
+    elif is_dir and prune_check and prune_check(arcname, matching_rule_index):
+        logger.debug("Skipping '%s': no rule can include the items under it.", arcname)
+        return
 
     # even the dir is ignored, its child items can still be included, so continue to scan
-    if tarinfo.isdir():
-        for f in os.listdir(name):
-            _archive_file_recursively(tar, os.path.join(name, f), os.path.join(arcname, f),
-                                      parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
-                                      ignore_check=ignore_check)
+    if is_dir:
+        # sorted, so that the same context always produces the same archive
+        for entry in sorted(os.scandir(name), key=lambda e: e.name):
+            _walk_recursively(items, entry.path, '{}/{}'.format(arcname, entry.name) if arcname else entry.name,
+                              parent_ignored=ignored, parent_matching_rule_index=matching_rule_index,
+                              ignore_check=ignore_check, prune_check=prune_check,
+                              is_dir=entry.is_dir(follow_symlinks=False))
 
 
 def check_remote_source_code(source_location):
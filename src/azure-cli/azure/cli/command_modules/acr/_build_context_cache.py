@@ -0,0 +1,116 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import stat
+import time
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# minutes an uploaded build context is reused for, overridable through
+# `az config set acr.build_context_cache_ttl=<minutes>`. A value of 0 disables the cache.
+DEFAULT_BUILD_CONTEXT_CACHE_TTL = 60
+# uploaded contexts remembered per registry
+MAX_CACHED_CONTEXTS = 20
+
+
+class BuildContextCache(object):
+    """Remembers the build contexts uploaded to a registry by their content hash.
+
+    The hash covers the archive member names, types and modes, the file contents and the Dockerfile, so an
+    identical context is recognized however often it is packed. File contents are only read again when the
+    mtime or size of the file changed since it was last hashed.
+    """
+
+    def __init__(self, cli_ctx, registry_name, resource_group_name, subscription_id=None):
+        from azure.cli.core.commands.client_factory import get_subscription_id
+        self.ttl = cli_ctx.config.getint('acr', 'build_context_cache_ttl',
+                                         fallback=DEFAULT_BUILD_CONTEXT_CACHE_TTL) * 60
+        self.cache_dir = os.path.join(cli_ctx.config.config_dir, 'object_cache', cli_ctx.cloud.name,
+                                      subscription_id or get_subscription_id(cli_ctx), 'acrBuildContexts')
+        self.path = os.path.join(self.cache_dir, '{}.{}.json'.format(resource_group_name, registry_name).lower())
+        self.file_hashes_path = os.path.join(self.cache_dir, '_fileHashes.json')
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write(path, data):
+        from knack.util import ensure_dir
+        ensure_dir(os.path.dirname(path))
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    def hash_context(self, source_location, items, docker_file_path, docker_file_in_tar):
+        """ Return the content hash of the context made of `items`, the (path, arcname) pairs to be archived. """
+        all_file_hashes = self._read(self.file_hashes_path)
+        source_key = os.path.abspath(source_location)
+        cached = all_file_hashes.get(source_key, {})
+        file_hashes = {}
+
+        context_hash = hashlib.sha256()
+        for name, arcname in items:
+            st = os.lstat(name)
+            if stat.S_ISREG(st.st_mode):
+                entry = cached.get(arcname)
+                if not entry or entry[0] != st.st_mtime_ns or entry[1] != st.st_size:
+                    entry = [st.st_mtime_ns, st.st_size, _hash_file(name)]
+                file_hashes[arcname] = entry
+                content = entry[2]
+            elif stat.S_ISLNK(st.st_mode):
+                content = os.readlink(name)
+            else:
+                content = ''
+            context_hash.update('{}\0{:o}\0{}\n'.format(arcname, st.st_mode, content).encode('utf-8'))
+        if docker_file_path:
+            context_hash.update('{}\0{}\n'.format(docker_file_in_tar, _hash_file(docker_file_path)).encode('utf-8'))
+
+        # keep the file hashes of the latest walk of each source directory only
+        if file_hashes != cached:
+            all_file_hashes[source_key] = file_hashes
+            try:
+                self._write(self.file_hashes_path, all_file_hashes)
+            except (OSError, IOError) as ex:
+                logger.debug("Failed to save the file hashes: %s", ex)
+        return context_hash.hexdigest()
+
+    def get(self, context_hash):
+        """ Return the relative path of the upload of the context, if it was uploaded within the TTL. """
+        entry = self._read(self.path).get(context_hash)
+        if entry and time.time() - entry['uploaded'] <= self.ttl:
+            return entry['relative_path']
+        return None
+
+    def put(self, context_hash, relative_path):
+        contexts = {k: v for k, v in self._read(self.path).items() if time.time() - v['uploaded'] <= self.ttl}
+        contexts[context_hash] = {'relative_path': relative_path, 'uploaded': time.time()}
+        if len(contexts) > MAX_CACHED_CONTEXTS:
+            latest = sorted(contexts, key=lambda k: contexts[k]['uploaded'])[-MAX_CACHED_CONTEXTS:]
+            contexts = {k: contexts[k] for k in latest}
+        try:
+            self._write(self.path, contexts)
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save the uploaded build context: %s", ex)
+
+
+def _hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
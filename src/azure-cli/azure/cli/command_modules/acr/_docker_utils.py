@@ -110,14 +110,8 @@ def _handle_challenge_phase(login_server,
     return token_params
 
 
-def _get_aad_token_after_challenge(cli_ctx,
-                                   token_params,
-                                   login_server,
-                                   only_refresh_token,
-                                   repository,
-                                   artifact_repository,
-                                   permission,
-                                   is_diagnostics_context):
+def _exchange_aad_token_for_refresh_token(cli_ctx, token_params, login_server, is_diagnostics_context,
+                                          token_cache=None):
     authurl = urlparse(token_params['realm'])
     authhost = urlunparse((authurl[0], authurl[1], '/oauth2/exchange', '', '', ''))
 
@@ -147,18 +141,39 @@ def _get_aad_token_after_challenge(cli_ctx,
                        .get_error_message())
 
     refresh_token = loads(response.content.decode("utf-8"))["refresh_token"]
+    if token_cache:
+        token_cache.put(token_cache.refresh_token_key(login_server), refresh_token)
+    return refresh_token
+
+
+def _get_aad_token_after_challenge(cli_ctx,
+                                   token_params,
+                                   login_server,
+                                   only_refresh_token,
+                                   repository,
+                                   artifact_repository,
+                                   permission,
+                                   is_diagnostics_context,
+                                   token_cache=None):
+    # a cached refresh token is only used to get access tokens, `az acr login` always hands out a fresh one
+    refresh_token = None
+    if token_cache and not only_refresh_token:
+        refresh_token = token_cache.get(token_cache.refresh_token_key(login_server))
+    is_cached_refresh_token = bool(refresh_token)
+
+    if not refresh_token:
+        refresh_token = _exchange_aad_token_for_refresh_token(cli_ctx, token_params, login_server,
+                                                              is_diagnostics_context, token_cache)
+        from ._errors import ErrorClass
+        if isinstance(refresh_token, ErrorClass):
+            return refresh_token
     if only_refresh_token:
         return refresh_token
 
+    authurl = urlparse(token_params['realm'])
     authhost = urlunparse((authurl[0], authurl[1], '/oauth2/token', '', '', ''))
-
-    if repository:
-        scope = 'repository:{}:{}'.format(repository, permission)
-    elif artifact_repository:
-        scope = 'artifact-repository:{}:{}'.format(artifact_repository, permission)
-    else:
-        # catalog only has * as permission, even for a read operation
-        scope = 'registry:catalog:*'
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    scope = _get_scope(repository, artifact_repository, permission)
 
     content = {
         'grant_type': 'refresh_token',
@@ -169,6 +184,16 @@ def _get_aad_token_after_challenge(cli_ctx,
     response = requests.post(authhost, urlencode(content), headers=headers,
                              verify=(not should_disable_connection_verify()))
 
+    if response.status_code not in [200] and is_cached_refresh_token:
+        # the cached refresh token may have been revoked, e.g. by a role assignment change or a registry re-creation
+        logger.debug("The cached refresh token of '%s' was rejected with status code %s, getting a new one",
+                     login_server, response.status_code)
+        token_cache.remove(token_cache.refresh_token_key(login_server))
+        content['refresh_token'] = _exchange_aad_token_for_refresh_token(cli_ctx, token_params, login_server,
+                                                                         is_diagnostics_context, token_cache)
+        response = requests.post(authhost, urlencode(content), headers=headers,
+                                 verify=(not should_disable_connection_verify()))
+
     if response.status_code not in [200]:
         from ._errors import CONNECTIVITY_ACCESS_TOKEN_ERROR
         if is_diagnostics_context:
@@ -176,7 +201,32 @@ def _get_aad_token_after_challenge(cli_ctx,
         raise CLIError(CONNECTIVITY_ACCESS_TOKEN_ERROR.format_error_message(login_server, response.status_code)
                        .get_error_message())
 
-    return loads(response.content.decode("utf-8"))["access_token"]
+    access_token = loads(response.content.decode("utf-8"))["access_token"]
+    if token_cache:
+        token_cache.put(token_cache.access_token_key(login_server, scope), access_token)
+    return access_token
+
+
+def _get_scope(repository, artifact_repository, permission):
+    if repository:
+        return 'repository:{}:{}'.format(repository, permission)
+    if artifact_repository:
+        return 'artifact-repository:{}:{}'.format(artifact_repository, permission)
+    # catalog only has * as permission, even for a read operation
+    return 'registry:catalog:*'
+
+
+def _get_token_cache(cli_ctx):
+    """Return the registry token cache of the current identity. The cache is disabled if there is none."""
+    from azure.cli.core._profile import Profile
+    from ._token_cache import RegistryTokenCache
+    try:
+        subscription = Profile(cli_ctx=cli_ctx).get_subscription(get_subscription_id(cli_ctx))
+        identity = '{} {}'.format(subscription['tenantId'], subscription['user']['name'])
+    except (CLIError, KeyError, TypeError) as e:
+        logger.debug("Registry tokens are not cached: %s", str(e))
+        identity = None
+    return RegistryTokenCache(cli_ctx, identity)
 
 
 def _get_aad_token(cli_ctx,
@@ -193,6 +243,14 @@ def _get_aad_token(cli_ctx,
     :param str artifact_repository: Artifact repository for which the access token is requested
     :param str permission: The requested permission on the repository, '*' or 'pull'
     """
+    # diagnostics go through the whole exchange
+    token_cache = None if is_diagnostics_context else _get_token_cache(cli_ctx)
+    if token_cache and not only_refresh_token:
+        access_token = token_cache.get(token_cache.access_token_key(
+            login_server, _get_scope(repository, artifact_repository, permission)))
+        if access_token:
+            return access_token
+
     token_params = _handle_challenge_phase(
         login_server, repository, artifact_repository, permission, True, is_diagnostics_context
     )
@@ -210,7 +268,8 @@ def _get_aad_token(cli_ctx,
                                           repository,
                                           artifact_repository,
                                           permission,
-                                          is_diagnostics_context)
+                                          is_diagnostics_context,
+                                          token_cache)
 
 
 def _get_token_with_username_and_password(login_server,
@@ -246,13 +305,7 @@ def _get_token_with_username_and_password(login_server,
     if ALLOWS_BASIC_AUTH in token_params:
         return username, password
 
-    if repository:
-        scope = 'repository:{}:{}'.format(repository, permission)
-    elif artifact_repository:
-        scope = 'artifact-repository:{}:{}'.format(artifact_repository, permission)
-    else:
-        # catalog only has * as permission, even for a read operation
-        scope = 'registry:catalog:*'
+    scope = _get_scope(repository, artifact_repository, permission)
 
     authurl = urlparse(token_params['realm'])
     authhost = urlunparse((authurl[0], authurl[1], '/oauth2/token', '', '', ''))
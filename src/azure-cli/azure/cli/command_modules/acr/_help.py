@@ -432,6 +432,21 @@ examples:
     text: az acr repository list -n MyRegistry
 """
 
+helps['acr repository purge'] = """
+type: command
+short-summary: Delete old or untagged images from repositories in an Azure Container Registry.
+long-summary: >
+    Manifests are selected by age (--ago), by a regular expression on their tags (--filter-tag) and by being
+    untagged (--untagged). Manifests whose delete is disabled are skipped. Registry requests run concurrently
+    and use one access token per repository, renewed when it is rejected or gets old. A repository whose manifests
+    can't be listed is reported with its error and the other repositories are still purged.
+examples:
+  - name: Show what would be purged from 'hello-world' - tags starting with 'dev-' older than 30 days - without deleting anything.
+    text: az acr repository purge -n MyRegistry --repository hello-world --filter-tag "^dev-" --ago 30d --dry-run
+  - name: Delete all untagged manifests older than a week in every repository of the registry.
+    text: az acr repository purge -n MyRegistry --untagged --ago 7d --yes
+"""
+
 helps['acr repository show'] = """
 type: command
 short-summary: Get the attributes of a repository or image in an Azure Container Registry.
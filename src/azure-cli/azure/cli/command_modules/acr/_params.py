@@ -127,6 +127,14 @@ def load_arguments(self, _):  # pylint: disable=too-many-statements
     with self.argument_context('acr repository untag') as c:
         c.argument('image', options_list=['--image', '-t'], help="The name of the image. May include a tag in the format 'name:tag'.")
 
+    with self.argument_context('acr repository purge') as c:
+        c.argument('repository', nargs='+', help="Space-separated names of the repositories to purge. Default to all the repositories in the registry.")
+        c.argument('filter_tag', help="Regular expression matched against the tags. A manifest is deleted if all of its tags match, otherwise only the matching tags are removed.")
+        c.argument('ago', help="Only purge manifests last updated longer ago than this duration, e.g. '30d', '12h' or '1d6h30m'.")
+        c.argument('untagged', action='store_true', help="Delete the manifests that have no tags.")
+        c.argument('dry_run', action='store_true', help="List the manifests and tags that would be purged without deleting them.")
+        c.argument('concurrency', type=int, help="The maximum number of concurrent registry requests.")
+
     with self.argument_context('acr create') as c:
         c.argument('registry_name', completer=None, validator=None)
         c.argument('deployment_name', validator=None)
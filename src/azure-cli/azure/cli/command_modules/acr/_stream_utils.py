@@ -2,8 +2,9 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
-from io import BytesIO
 import time
+import timeit
+from contextlib import contextmanager
 from random import uniform
 import colorama
 import requests
@@ -16,7 +17,7 @@ from ._azure_utils import get_blob_info
 
 logger = get_logger(__name__)
 
-DEFAULT_CHUNK_SIZE = 1024 * 4
+DEFAULT_CHUNK_SIZE = 1024 * 1024
 DEFAULT_LOG_TIMEOUT_IN_SEC = 60 * 30  # 30 minutes
 
 
@@ -78,117 +79,104 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
     if not no_format:
         colorama.init()
 
-    stream = BytesIO()
+    decoder = _LogLineDecoder()
+    poller = _AdaptivePoller()
+    stats = _StreamStats()
     metadata = {}
     start = 0
-    end = byte_size - 1
     available = 0
-    sleep_time = 1
-    max_sleep_time = 15
-    num_fails = 0
-    num_fails_for_backoff = 3
     consecutive_sleep_in_sec = 0
 
-    # Try to get the initial properties so there's no waiting.
-    # If the storage call fails, we'll just sleep and try again after.
+    def _print(text):
+        if text:
+            stats.lines += text.count('\n') + 1
+            stats.on_output()
+            print(text)
+
     try:
-        props = blob_service.get_blob_properties(
-            container_name=container_name, blob_name=blob_name)
-        metadata = props.metadata
-        available = props.properties.content_length
-    except (AttributeError, AzureHttpError):
-        pass
-
-    while (_blob_is_not_complete(metadata) or start < available):
-        while start < available:
-            # Success! Reset our polling backoff.
-            sleep_time = 1
-            num_fails = 0
-            consecutive_sleep_in_sec = 0
+        # Try to get the initial properties so there's no waiting.
+        # If the storage call fails, we'll just sleep and try again after.
+        try:
+            props = blob_service.get_blob_properties(
+                container_name=container_name, blob_name=blob_name)
+            metadata = props.metadata
+            available = props.properties.content_length
+        except (AttributeError, AzureHttpError):
+            pass
+
+        while (_blob_is_not_complete(metadata) or start < available):
+            received = False
+            while start < available:
+                try:
+                    # Read everything appended since the last poll, up to byte_size per request.
+                    with stats.request():
+                        content = blob_service.get_blob_to_bytes(
+                            container_name=container_name,
+                            blob_name=blob_name,
+                            start_range=start,
+                            end_range=min(available, start + byte_size) - 1).content
+                    if not content:
+                        break
+                    received = True
+                    start += len(content)
+                    stats.bytes_read += len(content)
+                    _print(decoder.feed(content))
+                except AzureHttpError as ae:
+                    if ae.status_code != 404:
+                        raise CLIError(ae)
+                    break
+                except KeyboardInterrupt:
+                    _print(decoder.flush())
+                    return
+
+            if received:
+                # Success! Tighten the polling interval while the output keeps flowing.
+                poller.on_data()
+                consecutive_sleep_in_sec = 0
 
             try:
-                old_byte_size = len(stream.getvalue())
-                blob_service.get_blob_to_stream(
-                    container_name=container_name,
-                    blob_name=blob_name,
-                    start_range=start,
-                    end_range=end,
-                    stream=stream)
-
-                curr_bytes = stream.getvalue()
-                new_byte_size = len(curr_bytes)
-                amount_read = new_byte_size - old_byte_size
-                start += amount_read
-                end = start + byte_size - 1
-
-                # Only scan what's newly read. If nothing is read, default to 0.
-                min_scan_range = max(new_byte_size - amount_read - 1, 0)
-                for i in range(new_byte_size - 1, min_scan_range, -1):
-                    if curr_bytes[i - 1:i + 1] == b'\r\n':
-                        flush = curr_bytes[:i]  # won't print \n
-                        stream = BytesIO()
-                        stream.write(curr_bytes[i + 1:])
-                        print(flush.decode('utf-8', errors='ignore'))
-                        break
+                with stats.request():
+                    props = blob_service.get_blob_properties(
+                        container_name=container_name, blob_name=blob_name)
+                metadata = props.metadata
+                available = props.properties.content_length
             except AzureHttpError as ae:
                 if ae.status_code != 404:
                     raise CLIError(ae)
             except KeyboardInterrupt:
-                curr_bytes = stream.getvalue()
-                if curr_bytes:
-                    print(curr_bytes.decode('utf-8', errors='ignore'))
+                _print(decoder.flush())
                 return
+            except Exception as err:
+                raise CLIError(err)
 
-        try:
-            props = blob_service.get_blob_properties(
-                container_name=container_name, blob_name=blob_name)
-            metadata = props.metadata
-            available = props.properties.content_length
-        except AzureHttpError as ae:
-            if ae.status_code != 404:
-                raise CLIError(ae)
-        except KeyboardInterrupt:
-            if curr_bytes:
-                print(curr_bytes.decode('utf-8', errors='ignore'))
-            return
-        except Exception as err:
-            raise CLIError(err)
-
-        if consecutive_sleep_in_sec > timeout_in_seconds:
-            # Flush anything remaining in the buffer - this would be the case
-            # if the file has expired and we weren't able to detect any \r\n
-            curr_bytes = stream.getvalue()
-            if curr_bytes:
-                print(curr_bytes.decode('utf-8', errors='ignore'))
-
-            logger.warning("Failed to find any new logs in %d seconds. Client will stop polling for additional logs.",
-                           consecutive_sleep_in_sec)
-            return
-
-        # If no new data available but not complete, sleep before trying to process additional data.
-        if (_blob_is_not_complete(metadata) and start >= available):
-            num_fails += 1
-
-            logger.debug(
-                "Failed to find new content %d times in a row", num_fails)
-            if num_fails >= num_fails_for_backoff:
-                num_fails = 0
-                sleep_time = min(sleep_time * 2, max_sleep_time)
-                logger.debug("Resetting failure count to %d", num_fails)
-
-            rnd = uniform(1, 2)  # 1.0 <= x < 2.0
-            total_sleep_time = sleep_time + rnd
-            consecutive_sleep_in_sec += total_sleep_time
-            logger.debug("Base sleep time: %d, random delay: %d, total: %d, consecutive: %d",
-                         sleep_time, rnd, total_sleep_time, consecutive_sleep_in_sec)
-            time.sleep(total_sleep_time)
-
-    # One final check to see if there's anything in the buffer to flush
-    # E.g., metadata has been set and start == available, but the log file
-    # didn't end in \r\n, so we were unable to flush out the final contents.
-    curr_bytes = stream.getvalue()
-    if curr_bytes:
-        print(curr_bytes.decode('utf-8', errors='ignore'))
+            if consecutive_sleep_in_sec > timeout_in_seconds:
+                # Flush anything remaining in the buffer - this would be the case
+                # if the file has expired and we weren't able to detect any \r\n
+                _print(decoder.flush())
+
+                logger.warning("Failed to find any new logs in %d seconds. "
+                               "Client will stop polling for additional logs.", consecutive_sleep_in_sec)
+                return
+
+            # If no new data available but not complete, sleep before trying to process additional data.
+            if (_blob_is_not_complete(metadata) and start >= available):
+                if not received:
+                    poller.on_idle()
+                try:
+                    slept = poller.sleep()
+                except KeyboardInterrupt:
+                    _print(decoder.flush())
+                    return
+                stats.sleep_time += slept
+                if not received:
+                    consecutive_sleep_in_sec += slept
+
+        # One final check to see if there's anything in the buffer to flush
+        # E.g., metadata has been set and start == available, but the log file
+        # didn't end in \r\n, so we were unable to flush out the final contents.
+        _print(decoder.flush())
+    finally:
+        stats.log()
 
     build_status = _get_run_status(metadata).lower()
     logger.debug("status was: '%s'", build_status)
@@ -202,6 +190,104 @@ def _stream_logs(no_format,  # pylint: disable=too-many-locals, too-many-stateme
             raise CLIError("Run was canceled")
 
 
+class _LogLineDecoder(object):
+    """Splits the streamed log bytes into complete lines as they arrive.
+
+    The pending bytes are kept in a bytearray that is consumed from the front, which CPython does without moving
+    the remaining bytes, and only the newly appended bytes are scanned for a line break. Complete lines are
+    decoded straight out of the buffer, so every byte is copied once on the way in and once when it is decoded.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        # offset up to which the buffer is known not to contain a line break
+        self._scanned = 0
+
+    def feed(self, data):
+        """ Append `data` and return the text up to the last \r\n (excluding the \n), or None. """
+        self._buffer += data
+        # a \r\n may straddle the previous read
+        index = self._buffer.rfind(b'\r\n', max(self._scanned - 1, 0))
+        if index < 0:
+            self._scanned = len(self._buffer)
+            return None
+        text = self._consume(index + 1)
+        del self._buffer[:1]  # the \n
+        return text
+
+    def flush(self):
+        """ Return whatever is left in the buffer, e.g. a last line without a line break. """
+        return self._consume(len(self._buffer)) or None
+
+    def _consume(self, size):
+        with memoryview(self._buffer) as view, view[:size] as line_view:
+            text = str(line_view, 'utf-8', 'ignore')
+        del self._buffer[:size]
+        self._scanned = 0
+        return text
+
+
+class _AdaptivePoller(object):
+    """Polling interval that halves while new output arrives and grows while the log is idle."""
+
+    def __init__(self, min_interval=0.5, max_interval=15, initial_interval=1, backoff=1.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = initial_interval
+        self.backoff = backoff
+
+    def on_data(self):
+        self.interval = max(self.interval / 2, self.min_interval)
+
+    def on_idle(self):
+        self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def sleep(self):
+        # add some jitter so concurrent clients don't poll in lockstep
+        sleep_time = self.interval * uniform(1, 1.25)
+        logger.debug("Waiting %.2f seconds for new logs", sleep_time)
+        time.sleep(sleep_time)
+        return sleep_time
+
+
+class _StreamStats(object):
+    """Throughput and latency counters of a log stream, logged with --debug."""
+
+    def __init__(self):
+        self.started = timeit.default_timer()
+        self.first_output = None
+        self.requests = 0
+        self.request_time = 0
+        self.max_request_time = 0
+        self.bytes_read = 0
+        self.lines = 0
+        self.sleep_time = 0
+
+    @contextmanager
+    def request(self):
+        start = timeit.default_timer()
+        try:
+            yield
+        finally:
+            elapsed = timeit.default_timer() - start
+            self.requests += 1
+            self.request_time += elapsed
+            self.max_request_time = max(self.max_request_time, elapsed)
+
+    def on_output(self):
+        if self.first_output is None:
+            self.first_output = timeit.default_timer() - self.started
+
+    def log(self):
+        elapsed = max(timeit.default_timer() - self.started, 1e-6)
+        logger.debug("Streamed %d bytes (%d lines) in %.2f seconds, %.1f KiB/s. %d requests, "
+                     "mean latency %.0f ms, max latency %.0f ms, first output after %s, %.2f seconds spent waiting.",
+                     self.bytes_read, self.lines, elapsed, self.bytes_read / 1024 / elapsed, self.requests,
+                     self.request_time * 1000 / max(self.requests, 1), self.max_request_time * 1000,
+                     '-' if self.first_output is None else '{:.0f} ms'.format(self.first_output * 1000),
+                     self.sleep_time)
+
+
 def _stream_artifact_logs(log_file_sas,
                           no_format):
 
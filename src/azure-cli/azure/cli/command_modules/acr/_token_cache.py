@@ -0,0 +1,102 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import base64
+import json
+import os
+import threading
+import time
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+ACR_TOKEN_CACHE_FILE = 'acrTokens.json'
+# cached tokens are renewed when they expire in less than this many seconds
+TOKEN_EXPIRY_MARGIN = 300
+
+_lock = threading.Lock()
+
+
+class RegistryTokenCache(object):
+    """Caches the refresh and access tokens issued by registries, keyed by login server, scope and identity.
+
+    Tokens are kept with their expiry claim in `acrTokens.json` next to the ARM token cache and, like it, the file
+    is only readable by its owner. Caching can be turned off with `az config set acr.token_cache=false`.
+    """
+
+    def __init__(self, cli_ctx, identity):
+        self.identity = identity
+        self.enabled = bool(identity) and cli_ctx.config.getboolean('acr', 'token_cache', fallback=True)
+        self.path = os.path.join(cli_ctx.config.config_dir, ACR_TOKEN_CACHE_FILE)
+
+    @staticmethod
+    def refresh_token_key(login_server):
+        return 'refresh {}'.format(login_server.lower())
+
+    @staticmethod
+    def access_token_key(login_server, scope):
+        return 'access {} {}'.format(login_server.lower(), scope)
+
+    def _read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError):
+            return {}
+
+    def get(self, key):
+        """ Return the cached token for `key` unless it expires within `TOKEN_EXPIRY_MARGIN` seconds. """
+        if not self.enabled:
+            return None
+        with _lock:
+            entry = self._read().get(self.identity, {}).get(key)
+        if entry and entry['expires_on'] - time.time() > TOKEN_EXPIRY_MARGIN:
+            logger.debug("Using the cached registry token for '%s'", key)
+            return entry['token']
+        return None
+
+    def put(self, key, token):
+        if not self.enabled:
+            return
+        expires_on = _get_token_expiry(token)
+        if expires_on is None:
+            return
+        now = time.time()
+        with _lock:
+            data = self._read()
+            # drop the expired tokens while at it
+            data = {identity: {k: v for k, v in entries.items() if v['expires_on'] > now}
+                    for identity, entries in data.items()}
+            data.setdefault(self.identity, {})[key] = {'token': token, 'expires_on': expires_on}
+            self._write(data)
+
+    def remove(self, key):
+        """ Drop the cached token for `key`, e.g. when the registry rejected it. """
+        if not self.enabled:
+            return
+        with _lock:
+            data = self._read()
+            if data.get(self.identity, {}).pop(key, None) is not None:
+                self._write(data)
+
+    def _write(self, data):
+        try:
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+            with os.fdopen(os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                json.dump({k: v for k, v in data.items() if v}, f)
+            os.replace(tmp_path, self.path)
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save the registry token cache: %s", ex)
+
+
+def _get_token_expiry(token):
+    """ Return the `exp` claim of a JWT, or None if the token is not a JWT. """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(payload.encode('ascii')).decode('utf-8'))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError, AttributeError):
+        return None
@@ -3,8 +3,6 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 import os
-import uuid
-import tempfile
 
 from knack.util import CLIError
 from knack.log import get_logger
@@ -443,22 +441,12 @@ def prepare_source_location(cmd, source_location, client_registries, registry_na
             raise CLIError(
                 "Source location should be a local directory path or remote URL.")
 
-        tar_file_path = os.path.join(tempfile.gettempdir(
-        ), 'cli_source_archive_{}.tar.gz'.format(uuid.uuid4().hex))
-
         try:
             source_location = upload_source_code(
                 cmd, client_registries, registry_name, resource_group_name,
-                source_location, tar_file_path, "", "")
+                source_location, "", "")
         except Exception as err:
             raise CLIError(err)
-        finally:
-            try:
-                logger.debug(
-                    "Deleting the archived source code from '%s'...", tar_file_path)
-                os.remove(tar_file_path)
-            except OSError:
-                pass
     else:
         source_location = check_remote_source_code(source_location)
         logger.warning("Sending context to registry: %s...", registry_name)
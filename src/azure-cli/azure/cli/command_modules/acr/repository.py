@@ -27,6 +27,11 @@ ORDERBY_PARAMS = {
     'time_desc': 'timedesc'
 }
 DEFAULT_PAGINATION = 100
+# the largest page size (`n`) the registry accepts
+MAX_PAGINATION = 1000
+DEFAULT_PURGE_CONCURRENCY = 5
+# repository access tokens last about an hour, a long purge gets new ones well before that
+PURGE_TOKEN_REFRESH_SECONDS = 45 * 60
 
 
 def _get_repository_path(repository=None):
@@ -68,27 +73,46 @@ def _get_manifest_digest(login_server, repository, tag, username, password):
     raise CLIError("Could not get the manifest digest for image '{}:{}'.".format(repository, tag))
 
 
+def _get_page_size(cli_ctx):
+    """Return the page size of registry listings, set with `az config set acr.page_size=<n>`."""
+    page_size = cli_ctx.config.getint('acr', 'page_size', fallback=DEFAULT_PAGINATION)
+    if not 0 < page_size <= MAX_PAGINATION:
+        logger.warning("acr.page_size must be between 1 and %d, using %d.", MAX_PAGINATION, DEFAULT_PAGINATION)
+        return DEFAULT_PAGINATION
+    return page_size
+
+
 def _obtain_data_from_registry(login_server,
                                path,
                                username,
                                password,
                                result_index,
                                top=None,
-                               orderby=None):
-    result_list = []
-    execute_next_http_call = True
+                               orderby=None,
+                               page_size=DEFAULT_PAGINATION):
+    return list(_iter_data_from_registry(login_server, path, username, password, result_index,
+                                         top=top, orderby=orderby, page_size=page_size))
+
 
+def _iter_data_from_registry(login_server,
+                             path,
+                             username,
+                             password,
+                             result_index,
+                             top=None,
+                             orderby=None,
+                             page_size=DEFAULT_PAGINATION):
+    """Yield the items of a paginated registry listing, requesting each page when the previous one is consumed.
+    """
     params = {
-        'n': DEFAULT_PAGINATION,
+        'n': page_size,
         'orderby': ORDERBY_PARAMS[orderby] if orderby else None
     }
 
-    while execute_next_http_call:
-        execute_next_http_call = False
-
+    while params:
         # Override the default page size if top is provided
         if top is not None:
-            params['n'] = DEFAULT_PAGINATION if top > DEFAULT_PAGINATION else top
+            params['n'] = page_size if top > page_size else top
             top -= params['n']
 
         result, next_link = request_data_from_registry(
@@ -99,14 +123,9 @@ def _obtain_data_from_registry(login_server,
             password=password,
             result_index=result_index,
             params=params)
+        params = None
 
-        if result:
-            result_list += result
-
-        if top is not None and top <= 0:
-            break
-
-        if next_link:
+        if next_link and (top is None or top > 0):
             # The registry is telling us there's more items in the list,
             # and another call is needed. The link header looks something
             # like `Link: </v2/_catalog?last=hello-world&n=1>; rel="next"`
@@ -114,9 +133,9 @@ def _obtain_data_from_registry(login_server,
             next_link_path = next_link[(next_link.index('<') + 1):next_link.index('>')]
             tokens = next_link_path.split('?', 2)
             params = {y[0]: unquote(y[1]) for y in (x.split('=', 2) for x in tokens[1].split('&'))}
-            execute_next_http_call = True
 
-    return result_list
+        for item in result or []:
+            yield item
 
 
 def acr_repository_list(cmd,
@@ -139,7 +158,8 @@ def acr_repository_list(cmd,
         username=username,
         password=password,
         result_index='repositories',
-        top=top)
+        top=top,
+        page_size=_get_page_size(cmd.cli_ctx))
 
 
 def acr_repository_show_tags(cmd,
@@ -169,7 +189,8 @@ def acr_repository_show_tags(cmd,
             password=password,
             result_index='tags',
             top=top,
-            orderby=orderby)
+            orderby=orderby,
+            page_size=_get_page_size(cmd.cli_ctx))
     except RegistryException as e:
         # Check for Classic registry
         if e.status_code == 405:
@@ -220,7 +241,8 @@ def acr_repository_show_manifests(cmd,
         password=password,
         result_index='manifests',
         top=top,
-        orderby=orderby)
+        orderby=orderby,
+        page_size=_get_page_size(cmd.cli_ctx))
 
     # For backward compatibility, convert the results to the old schema
     if not detail:
@@ -424,6 +446,189 @@ def acr_repository_delete(cmd,
         password=password)[0]
 
 
+def acr_repository_purge(cmd,
+                         registry_name,
+                         repository=None,
+                         filter_tag=None,
+                         ago=None,
+                         untagged=False,
+                         dry_run=False,
+                         concurrency=DEFAULT_PURGE_CONCURRENCY,
+                         resource_group_name=None,  # pylint: disable=unused-argument
+                         tenant_suffix=None,
+                         username=None,
+                         password=None,
+                         yes=False):
+    import re
+    import threading
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    if not filter_tag and not untagged:
+        raise CLIError('Usage error: --filter-tag REGEX | --untagged')
+    if concurrency < 1:
+        raise CLIError('--concurrency must be at least 1.')
+    tag_regex = re.compile(filter_tag) if filter_tag else None
+    cutoff = _get_purge_cutoff(ago)
+    page_size = _get_page_size(cmd.cli_ctx)
+
+    if not repository:
+        login_server, catalog_username, catalog_password = get_access_credentials(
+            cmd=cmd,
+            registry_name=registry_name,
+            tenant_suffix=tenant_suffix,
+            username=username,
+            password=password)
+        # the repositories are planned as the catalog pages come in
+        repository = _iter_data_from_registry(
+            login_server=login_server,
+            path='/v2/_catalog',
+            username=catalog_username,
+            password=catalog_password,
+            result_index='repositories',
+            page_size=page_size)
+
+    credentials_lock = threading.Lock()
+    repository_credentials = {}
+
+    def _get_repository_credentials(repo, expired=None):
+        # one access token per repository scope, shared by all the calls on the repository until it is `expired`
+        # or old enough to run out during the purge
+        with credentials_lock:
+            cached = repository_credentials.get(repo)
+        if cached and cached[0] is not expired and time.time() - cached[1] < PURGE_TOKEN_REFRESH_SECONDS:
+            return cached[0]
+        credentials = get_access_credentials(
+            cmd=cmd,
+            registry_name=registry_name,
+            tenant_suffix=tenant_suffix,
+            username=username,
+            password=password,
+            repository=repo,
+            permission=RepoAccessTokenPermission.DELETE_META_READ.value)
+        with credentials_lock:
+            repository_credentials[repo] = credentials, time.time()
+        return credentials
+
+    def _plan(repo):
+        try:
+            credentials = _get_repository_credentials(repo)
+            manifests = _iter_data_from_registry(
+                login_server=credentials[0],
+                path=_get_manifest_path(repo),
+                username=credentials[1],
+                password=credentials[2],
+                result_index='manifests',
+                page_size=page_size)
+            return _select_manifests_to_purge(repo, manifests, tag_regex, cutoff, untagged)
+        except (CLIError, RegistryException) as e:
+            # the other repositories are still purged
+            logger.warning("Failed to list the manifests of '%s': %s", repo, e)
+            return [{'repository': repo, 'digest': '', 'tags': [], 'timestamp': '', 'action': 'none',
+                     'error': str(e)}]
+
+    def _delete(repo, path):
+        credentials = _get_repository_credentials(repo)
+        try:
+            request_data_from_registry(
+                http_method='delete',
+                login_server=credentials[0],
+                path=path,
+                username=credentials[1],
+                password=credentials[2])
+        except RegistryException as e:
+            if e.status_code != 401:
+                raise
+            logger.debug("Access token for '%s' was rejected, getting a new one: %s", repo, e)
+            credentials = _get_repository_credentials(repo, expired=credentials)
+            request_data_from_registry(
+                http_method='delete',
+                login_server=credentials[0],
+                path=path,
+                username=credentials[1],
+                password=credentials[2])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        result = [item for items in executor.map(_plan, repository) for item in items]
+        plan = [item for item in result if 'error' not in item]
+        if dry_run or not plan:
+            return result
+
+        user_confirmation("This operation will delete {} manifest(s) and untag {} tag(s) in {} repository(s). "
+                          "Are you sure you want to continue?".format(
+                              sum(1 for i in plan if i['action'] == 'delete'),
+                              sum(len(i['tags']) for i in plan if i['action'] == 'untag'),
+                              len({i['repository'] for i in plan})), yes)
+
+        def _purge(item):
+            if item['action'] == 'delete':
+                paths = ['/v2/{}/manifests/{}'.format(item['repository'], item['digest'])]
+            else:
+                paths = [_get_tag_path(item['repository'], tag) for tag in item['tags']]
+            try:
+                for path in paths:
+                    _delete(item['repository'], path)
+            except (CLIError, RegistryException) as e:
+                logger.warning("Failed to purge '%s@%s': %s", item['repository'], item['digest'], e)
+                item['error'] = str(e)
+
+        list(executor.map(_purge, plan))
+
+    failed = sum(1 for i in plan if 'error' in i)
+    if failed:
+        logger.warning("%d of %d manifest(s) could not be purged.", failed, len(plan))
+    return result
+
+
+def _get_purge_cutoff(ago):
+    """Convert a duration such as '30d', '12h' or '1d2h30m' into the timestamp before which items are purged.
+    """
+    import datetime
+    import re
+    if not ago:
+        return None
+    match = re.match(r'^(?:(\d+)d)?(?:(\d+)h)?(?:(\d+)m)?$', ago)
+    if not match or not any(match.groups()):
+        raise CLIError("Invalid --ago '{}'. Use a duration in days, hours and minutes, e.g. '30d' or '1d12h'."
+                       .format(ago))
+    days, hours, minutes = (int(x or 0) for x in match.groups())
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=days, hours=hours, minutes=minutes)
+    # registry timestamps are ISO 8601 in UTC, comparable as strings down to the second
+    return cutoff.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _select_manifests_to_purge(repository, manifests, tag_regex, cutoff, untagged):
+    """Return the purge actions for the manifests of a repository. A tagged manifest is deleted when all its tags
+    match `tag_regex`, otherwise only the matching tags are removed. Locked manifests are left alone.
+    """
+    selected = []
+    for manifest in manifests:
+        if cutoff and manifest.get('lastUpdateTime', '')[:19] >= cutoff:
+            continue
+        if not manifest.get('changeableAttributes', {}).get('deleteEnabled', True):
+            continue
+        tags = manifest.get('tags') or []
+        if tags:
+            if not tag_regex:
+                continue
+            matched = [t for t in tags if tag_regex.search(t)]
+            if not matched:
+                continue
+            action = 'delete' if len(matched) == len(tags) else 'untag'
+        elif untagged:
+            action, matched = 'delete', []
+        else:
+            continue
+        selected.append({
+            'repository': repository,
+            'digest': manifest.get('digest', ''),
+            'tags': matched,
+            'timestamp': manifest.get('lastUpdateTime', ''),
+            'action': action
+        })
+    return selected
+
+
 def _validate_parameters(repository, image):
     if bool(repository) == bool(image):
         raise CLIError('Usage error: --image IMAGE | --repository REPOSITORY')
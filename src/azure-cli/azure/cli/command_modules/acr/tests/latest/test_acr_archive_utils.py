@@ -0,0 +1,190 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import mock
+
+from azure.cli.command_modules.acr._archive_utils import (
+    upload_source_code, _GzipBlockUploader, _pack_source_code, IgnoreRule, IgnoreMatcher)
+from azure.cli.command_modules.acr import _build_context_cache
+from azure.cli.core.mock import DummyCli
+
+TEST_UPLOAD_URL = 'https://myaccount.blob.core.windows.net/container/source.tar.gz?sv=2019&sig=abc'
+
+
+class _FakeBlockBlobService(object):
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.blocks = {}
+        self.block_list = None
+        _FakeBlockBlobService.instances.append(self)
+
+    def put_block(self, container_name, blob_name, block, block_id):
+        self.blocks[block_id] = block
+
+    def put_block_list(self, container_name, blob_name, block_list):
+        self.block_list = [b.id for b in block_list]
+
+    def committed_blob(self):
+        return b''.join(self.blocks[i] for i in self.block_list)
+
+
+class AcrArchiveUtilsTests(unittest.TestCase):
+
+    def setUp(self):
+        self.source_dir = tempfile.mkdtemp()
+        self._write('Dockerfile', 'FROM scratch')
+        self._write('.dockerignore', 'ignored\n')
+        self._write('app/main.py', 'print("hello")\n' * 1000)
+        self._write('app/data.bin', os.urandom(300 * 1024))
+        self._write('ignored/file.txt', 'ignored')
+        _FakeBlockBlobService.instances = []
+        self.config_dir = tempfile.mkdtemp()
+        self._sub_patch = mock.patch('azure.cli.core.commands.client_factory.get_subscription_id',
+                                     return_value='00000000-0000-0000-0000-000000000000')
+        self._sub_patch.start()
+
+    def tearDown(self):
+        self._sub_patch.stop()
+        shutil.rmtree(self.source_dir, ignore_errors=True)
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    def _write(self, path, content):
+        path = os.path.join(self.source_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content.encode() if isinstance(content, str) else content)
+
+    def _setup_cmd(self):
+        cmd = mock.MagicMock()
+        cmd.cli_ctx = DummyCli()
+        cmd.cli_ctx.config.config_dir = self.config_dir
+        return cmd
+
+    def _upload(self, cmd, client, build_context_cache_ttl=0):
+        from azure.multiapi.storage.v2018_11_09.blob.models import BlobBlock
+        env = {'AZURE_ACR_BUILD_CONTEXT_CACHE_TTL': str(build_context_cache_ttl)}
+        with mock.patch.dict(os.environ, env), \
+                mock.patch('azure.cli.command_modules.acr._archive_utils.get_sdk',
+                           return_value=(_FakeBlockBlobService, BlobBlock)), \
+                mock.patch('azure.cli.command_modules.acr._archive_utils.SOURCE_UPLOAD_CHUNK_SIZE', 64 * 1024):
+            return upload_source_code(cmd, client, 'myregistry', 'myresourcegroup', self.source_dir,
+                                      os.path.join(self.source_dir, 'Dockerfile'), 'abc_Dockerfile')
+
+    def test_upload_source_code_streams_blocks(self):
+        client = mock.MagicMock()
+        client.get_build_source_upload_url.return_value = mock.MagicMock(
+            upload_url=TEST_UPLOAD_URL, relative_path='source/202010190000/source.tar.gz')
+
+        relative_path = self._upload(self._setup_cmd(), client)
+
+        self.assertEqual(relative_path, 'source/202010190000/source.tar.gz')
+        client.get_build_source_upload_url.assert_called_once_with('myresourcegroup', 'myregistry')
+        blob_service = _FakeBlockBlobService.instances[0]
+        self.assertEqual(blob_service.kwargs['sas_token'], 'sv=2019&sig=abc')
+        self.assertGreater(len(blob_service.block_list), 1)
+        self.assertEqual(blob_service.block_list, sorted(blob_service.block_list))
+
+        with tarfile.open(fileobj=io.BytesIO(blob_service.committed_blob()), mode='r:gz') as tar:
+            names = tar.getnames()
+            self.assertEqual(tar.extractfile('app/main.py').read(), b'print("hello")\n' * 1000)
+            self.assertEqual(len(tar.extractfile('app/data.bin').read()), 300 * 1024)
+        self.assertIn('abc_Dockerfile', names)
+        self.assertNotIn('ignored/file.txt', names)
+
+    def test_upload_source_code_reuses_unchanged_context(self):
+        client = mock.MagicMock()
+        client.get_build_source_upload_url.side_effect = [
+            mock.MagicMock(upload_url=TEST_UPLOAD_URL, relative_path='source/1/source.tar.gz'),
+            mock.MagicMock(upload_url=TEST_UPLOAD_URL, relative_path='source/2/source.tar.gz')]
+        cmd = self._setup_cmd()
+
+        self.assertEqual(self._upload(cmd, client, build_context_cache_ttl=60), 'source/1/source.tar.gz')
+        with mock.patch.object(_build_context_cache, '_hash_file', wraps=_build_context_cache._hash_file) as hash_mock:
+            self.assertEqual(self._upload(cmd, client, build_context_cache_ttl=60), 'source/1/source.tar.gz')
+        client.get_build_source_upload_url.assert_called_once()
+        self.assertEqual(len(_FakeBlockBlobService.instances), 1)
+        # only the Dockerfile is hashed again, the context files are unchanged
+        hash_mock.assert_called_once_with(os.path.join(self.source_dir, 'Dockerfile'))
+
+        self._write('app/main.py', 'print("changed")')
+        self.assertEqual(self._upload(cmd, client, build_context_cache_ttl=60), 'source/2/source.tar.gz')
+        self.assertEqual(client.get_build_source_upload_url.call_count, 2)
+        self.assertEqual(len(_FakeBlockBlobService.instances), 2)
+
+    def test_gzip_block_uploader_raises_upload_error(self):
+        def _put_block(block, block_id):
+            raise IOError('connection reset')
+
+        with self.assertRaises(IOError):
+            with _GzipBlockUploader(_put_block, chunk_size=4, max_workers=2) as uploader:
+                for _ in range(100):
+                    uploader.write(b'data')
+
+    def test_ignore_matcher_priority(self):
+        # rules at the end of .dockerignore have higher priority
+        rules = [IgnoreRule(r) for r in reversed(['*.md', '!README*.md', 'README-secret.md', 'docs/**'])]
+        matcher = IgnoreMatcher(rules)
+
+        def _check(name, max_index=len(rules)):
+            index = matcher.match(name, max_index)
+            return None if index is None else rules[index].ignore
+
+        self.assertTrue(_check('CHANGELOG.md'))
+        self.assertFalse(_check('README.md'))
+        self.assertTrue(_check('README-secret.md'))
+        self.assertTrue(_check('docs/a/b.txt'))
+        self.assertIsNone(_check('main.py'))
+        self.assertIsNone(_check('README.md', max_index=1))
+        self.assertEqual(matcher.match('README.md', 3), 2)
+
+    def test_ignore_matcher_can_prune(self):
+        rules = [IgnoreRule(r) for r in reversed(['node_modules', 'build', '!build/output/*.txt'])]
+        matcher = IgnoreMatcher(rules)
+        self.assertTrue(matcher.can_prune('node_modules', len(rules)))
+        self.assertFalse(matcher.can_prune('build', len(rules)))
+        self.assertFalse(matcher.can_prune('build/output', len(rules)))
+        self.assertTrue(matcher.can_prune('build/tmp', len(rules)))
+        # only exception rules with a higher priority than the matching rule count
+        self.assertTrue(matcher.can_prune('build', 0))
+        self.assertFalse(IgnoreMatcher([IgnoreRule('!**/*.txt')]).can_prune('node_modules', 1))
+
+    def test_pack_source_code_prunes_excluded_directories(self):
+        self._write('.dockerignore', 'node_modules\nbuild\n!build/output.txt\n')
+        self._write('node_modules/lib/index.js', 'module.exports = {}')
+        self._write('.git/objects/ab/cdef', 'blob')
+        self._write('build/output.txt', 'output')
+        self._write('build/tmp/cache.bin', 'cache')
+
+        scanned = []
+        original_scandir = os.scandir
+
+        def _scandir(path):
+            scanned.append(os.path.relpath(path, self.source_dir).replace(os.sep, '/'))
+            return original_scandir(path)
+
+        stream = io.BytesIO()
+        with mock.patch('os.scandir', side_effect=_scandir):
+            _pack_source_code(self.source_dir, stream, '', '')
+        stream.seek(0)
+        with tarfile.open(fileobj=stream, mode='r') as tar:
+            names = set(tar.getnames())
+
+        self.assertTrue({'Dockerfile', 'app/main.py', 'build/output.txt'}.issubset(names))
+        self.assertFalse({'node_modules', 'node_modules/lib/index.js', '.git', 'build/tmp/cache.bin'} & names)
+        self.assertNotIn('node_modules', scanned)
+        self.assertNotIn('.git', scanned)
+        self.assertIn('build', scanned)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -21,7 +21,8 @@ from azure.cli.command_modules.acr.repository import (
     acr_repository_show,
     acr_repository_update,
     acr_repository_delete,
-    acr_repository_untag
+    acr_repository_untag,
+    acr_repository_purge
 )
 from azure.cli.command_modules.acr.helm import (
     acr_helm_list,
@@ -39,6 +40,7 @@ from azure.cli.command_modules.acr._docker_utils import (
 )
 from azure.cli.command_modules.acr._docker_utils import ResourceNotFound
 from azure.cli.core.mock import DummyCli
+from knack.util import CLIError
 
 
 TEST_TENANT = 'testtenant'
@@ -92,6 +94,42 @@ class AcrMockCommandsTests(unittest.TestCase):
             timeout=300,
             verify=mock.ANY)
 
+    @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
+    @mock.patch('requests.request', autospec=True)
+    def test_repository_list_pagination(self, mock_requests_get, mock_get_access_credentials):
+        cmd = self._setup_cmd()
+        repositories = ['repo{:04d}'.format(i) for i in range(1000)]
+
+        def _request(method, url, params, **kwargs):
+            start = repositories.index(params['last']) + 1 if 'last' in params else 0
+            page = repositories[start:start + int(params['n'])]
+            response = mock.MagicMock()
+            response.status_code = 200
+            response.json.return_value = {'repositories': page}
+            response.headers = {}
+            if start + len(page) < len(repositories):
+                response.headers['link'] = '</v2/_catalog?last={}&n={}&orderby=>; rel="next"'.format(
+                    page[-1], params['n'])
+            return response
+
+        mock_requests_get.side_effect = _request
+        mock_get_access_credentials.return_value = 'testregistry.azurecr.io', 'username', 'password'
+
+        self.assertEqual(acr_repository_list(cmd, registry_name='testregistry'), repositories)
+        self.assertEqual(mock_requests_get.call_count, 10)
+
+        # --top limits the size of the last page and stops following the links
+        mock_requests_get.reset_mock()
+        self.assertEqual(acr_repository_list(cmd, registry_name='testregistry', top=250), repositories[:250])
+        self.assertEqual([c[1]['params']['n'] for c in mock_requests_get.call_args_list], [100, 100, 50])
+
+        # the page size is configurable
+        mock_requests_get.reset_mock()
+        with mock.patch.dict('os.environ', {'AZURE_ACR_PAGE_SIZE': '500'}):
+            self.assertEqual(acr_repository_list(cmd, registry_name='testregistry'), repositories)
+        self.assertEqual(mock_requests_get.call_count, 2)
+        self.assertEqual(mock_requests_get.call_args_list[0][1]['params']['n'], 500)
+
     @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
     @mock.patch('requests.request', autospec=True)
     def test_repository_show_tags(self, mock_requests_get, mock_get_access_credentials):
@@ -387,6 +425,155 @@ class AcrMockCommandsTests(unittest.TestCase):
             timeout=300,
             verify=mock.ANY)
 
+    @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
+    @mock.patch('requests.request', autospec=True)
+    def test_repository_purge(self, mock_requests, mock_get_access_credentials):
+        cmd = self._setup_cmd()
+        manifests = {
+            'repo1': [
+                {'digest': 'sha256:old-dev', 'tags': ['dev-1', 'dev-2'], 'lastUpdateTime': '2018-01-01T00:00:00.1234567Z'},
+                {'digest': 'sha256:old-mixed', 'tags': ['dev-3', 'v1'], 'lastUpdateTime': '2018-01-01T00:00:00Z'},
+                {'digest': 'sha256:old-untagged', 'lastUpdateTime': '2018-01-01T00:00:00Z'},
+                {'digest': 'sha256:new-dev', 'tags': ['dev-4'], 'lastUpdateTime': '2999-01-01T00:00:00Z'},
+                {'digest': 'sha256:locked', 'tags': ['dev-5'], 'lastUpdateTime': '2018-01-01T00:00:00Z',
+                 'changeableAttributes': {'deleteEnabled': False}}],
+            'repo2': [
+                {'digest': 'sha256:repo2-untagged', 'tags': [], 'lastUpdateTime': '2018-01-01T00:00:00Z'}]
+        }
+
+        def _request(method, url, **kwargs):
+            response = mock.MagicMock()
+            response.headers = {}
+            response.status_code = 200
+            if method == 'get' and url.endswith('/v2/_catalog'):
+                response.json.return_value = {'repositories': ['repo1', 'repo2']}
+            elif method == 'get':
+                response.json.return_value = {'manifests': manifests[url.split('/')[-2]]}
+            else:
+                response.status_code = 202
+                response.json.return_value = {}
+            return response
+
+        mock_requests.side_effect = _request
+        mock_get_access_credentials.side_effect = \
+            lambda cmd, registry_name, repository=None, **kwargs: ('testregistry.azurecr.io', 'username', repository)
+
+        # dry run lists the selection without deleting
+        result = acr_repository_purge(cmd, registry_name='testregistry', filter_tag='^dev-', ago='30d',
+                                      untagged=True, dry_run=True)
+        self.assertEqual([(r['repository'], r['digest'], r['action'], r['tags']) for r in result], [
+            ('repo1', 'sha256:old-dev', 'delete', ['dev-1', 'dev-2']),
+            ('repo1', 'sha256:old-mixed', 'untag', ['dev-3']),
+            ('repo1', 'sha256:old-untagged', 'delete', []),
+            ('repo2', 'sha256:repo2-untagged', 'delete', [])])
+        self.assertFalse([c for c in mock_requests.call_args_list if c[1]['method'] == 'delete'])
+
+        mock_requests.reset_mock()
+        mock_get_access_credentials.reset_mock()
+        acr_repository_purge(cmd, registry_name='testregistry', repository=['repo1'], filter_tag='^dev-',
+                             ago='30d', untagged=True, concurrency=3, yes=True)
+        deleted = sorted(c[1]['url'] for c in mock_requests.call_args_list if c[1]['method'] == 'delete')
+        self.assertEqual(deleted, [
+            'https://testregistry.azurecr.io/acr/v1/repo1/_tags/dev-3',
+            'https://testregistry.azurecr.io/v2/repo1/manifests/sha256:old-dev',
+            'https://testregistry.azurecr.io/v2/repo1/manifests/sha256:old-untagged'])
+        # one access token for the repository, reused by all its requests
+        mock_get_access_credentials.assert_called_once_with(
+            cmd=cmd, registry_name='testregistry', tenant_suffix=None, username=None, password=None,
+            repository='repo1', permission=RepoAccessTokenPermission.DELETE_META_READ.value)
+        for c in mock_requests.call_args_list:
+            self.assertEqual(c[1]['headers'], get_authorization_header('username', 'repo1'))
+
+        with self.assertRaises(CLIError):
+            acr_repository_purge(cmd, registry_name='testregistry', repository=['repo1'])
+        with self.assertRaises(CLIError):
+            acr_repository_purge(cmd, registry_name='testregistry', repository=['repo1'], untagged=True, ago='1y')
+
+    @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
+    @mock.patch('requests.request', autospec=True)
+    def test_repository_purge_errors(self, mock_requests, mock_get_access_credentials):
+        cmd = self._setup_cmd()
+        tokens = iter(['token1', 'token2', 'token3'])
+        rejected = []
+
+        def _get_access_credentials(cmd, registry_name, repository=None, **kwargs):
+            if repository == 'bad':
+                raise CLIError('Access to the repository was denied.')
+            return 'testregistry.azurecr.io', 'username', next(tokens)
+
+        def _request(method, url, headers=None, **kwargs):
+            response = mock.MagicMock()
+            response.headers = {}
+            response.status_code = 200
+            if method == 'get':
+                response.json.return_value = {'manifests': [
+                    {'digest': 'sha256:a', 'lastUpdateTime': '2018-01-01T00:00:00Z'},
+                    {'digest': 'sha256:b', 'lastUpdateTime': '2018-01-01T00:00:00Z'}]}
+            elif headers == get_authorization_header('username', 'token1'):
+                # the token ran out after listing the manifests
+                rejected.append(url)
+                response.status_code = 401
+                response.text = ''
+            else:
+                response.status_code = 202
+                response.json.return_value = {}
+            return response
+
+        mock_requests.side_effect = _request
+        mock_get_access_credentials.side_effect = _get_access_credentials
+
+        result = acr_repository_purge(cmd, registry_name='testregistry', repository=['bad', 'repo1'],
+                                      untagged=True, concurrency=1, yes=True)
+        self.assertEqual([(r['repository'], r['digest'], 'error' in r) for r in result], [
+            ('bad', '', True),
+            ('repo1', 'sha256:a', False),
+            ('repo1', 'sha256:b', False)])
+        self.assertIn('denied', result[0]['error'])
+        # the rejected delete is retried once with a new token, which the next delete reuses
+        self.assertEqual(rejected, ['https://testregistry.azurecr.io/v2/repo1/manifests/sha256:a'])
+        deleted = [c[1]['headers'] for c in mock_requests.call_args_list if c[1]['method'] == 'delete']
+        self.assertEqual(deleted[1:], [get_authorization_header('username', 'token2')] * 2)
+
+        # an old token is renewed before it gets rejected
+        mock_requests.reset_mock()
+        mock_get_access_credentials.reset_mock()
+        mock_get_access_credentials.side_effect = None
+        mock_get_access_credentials.return_value = 'testregistry.azurecr.io', 'username', 'token3'
+        with mock.patch('azure.cli.command_modules.acr.repository.PURGE_TOKEN_REFRESH_SECONDS', 0):
+            acr_repository_purge(cmd, registry_name='testregistry', repository=['repo1'], untagged=True,
+                                 concurrency=1, yes=True)
+        self.assertEqual(mock_get_access_credentials.call_count, 3)
+
+    @mock.patch('azure.cli.command_modules.acr.repository.get_access_credentials', autospec=True)
+    @mock.patch('requests.request', autospec=True)
+    def test_repository_purge_catalog_pages(self, mock_requests, mock_get_access_credentials):
+        import threading
+        cmd = self._setup_cmd()
+        first_repository_listed = threading.Event()
+
+        def _request(method, url, params=None, **kwargs):
+            response = mock.MagicMock()
+            response.headers = {}
+            response.status_code = 200
+            if url.endswith('/v2/_catalog') and 'last' not in params:
+                response.json.return_value = {'repositories': ['repo1']}
+                response.headers['link'] = '</v2/_catalog?last=repo1&n=100>; rel="next"'
+            elif url.endswith('/v2/_catalog'):
+                # the first repository is planned before the catalog is fully listed
+                self.assertTrue(first_repository_listed.wait(5))
+                response.json.return_value = {'repositories': ['repo2']}
+            else:
+                first_repository_listed.set()
+                response.json.return_value = {'manifests': [
+                    {'digest': 'sha256:' + url.split('/')[-2], 'lastUpdateTime': '2018-01-01T00:00:00Z'}]}
+            return response
+
+        mock_requests.side_effect = _request
+        mock_get_access_credentials.return_value = 'testregistry.azurecr.io', 'username', 'password'
+
+        result = acr_repository_purge(cmd, registry_name='testregistry', untagged=True, dry_run=True)
+        self.assertEqual([r['digest'] for r in result], ['sha256:repo1', 'sha256:repo2'])
+
     @mock.patch('azure.cli.core._profile.Profile.get_subscription_id', autospec=True)
     @mock.patch('azure.cli.command_modules.acr._docker_utils.get_registry_by_name', autospec=True)
     @mock.patch('requests.post', autospec=True)
@@ -0,0 +1,102 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import unittest
+import mock
+
+from knack.util import CLIError
+from azure.cli.command_modules.acr._stream_utils import _stream_logs, _LogLineDecoder
+
+# The appends seen by successive get_blob_properties calls while a run was streaming: a burst of output, a few
+# idle polls, a line break and a multi-byte character split across appends, then the completed blob.
+RECORDED_APPENDS = [
+    (b'', None),
+    (b'2020/10/19 10:00:00 Downloading source code...\r\n', None),
+    (b'2020/10/19 10:00:01 Finished downloading source code\r\nStep 1/3 : FROM', None),
+    (b' scratch\r\n', None),
+    (b'', None),
+    (b'', None),
+    (b'', None),
+    (b'Step 2/3 : RUN echo caf\xc3', None),
+    (b'\xa9\r', None),
+    (b'\nStep 3/3 : CMD ["sh"]\r\n', None),
+    (b'Run ID: cb1 was successful after 5s', 'Succeeded'),
+]
+
+
+class _ReplayBlobService(object):
+
+    def __init__(self, appends):
+        self.appends = list(appends)
+        self.content = b''
+        self.metadata = {}
+        self.range_requests = []
+
+    def get_blob_properties(self, container_name, blob_name):
+        if self.appends:
+            data, status = self.appends.pop(0)
+            self.content += data
+            if status:
+                self.metadata = {'Complete': status}
+        return mock.MagicMock(metadata=self.metadata,
+                              properties=mock.MagicMock(content_length=len(self.content)))
+
+    def get_blob_to_bytes(self, container_name, blob_name, start_range, end_range):
+        self.range_requests.append((start_range, end_range))
+        return mock.MagicMock(content=self.content[start_range:end_range + 1])
+
+
+class AcrStreamUtilsTests(unittest.TestCase):
+
+    def _stream(self, blob_service, byte_size=16, raise_error_on_failure=False):
+        printed = []
+        with mock.patch('azure.cli.command_modules.acr._stream_utils.print', create=True,
+                        side_effect=printed.append), \
+                mock.patch('azure.cli.command_modules.acr._stream_utils.uniform', return_value=1), \
+                mock.patch('time.sleep') as sleep_mock:
+            _stream_logs(True, byte_size, 1800, blob_service, 'logs', 'cb1/rawtext.log', raise_error_on_failure)
+        return printed, [c[0][0] for c in sleep_mock.call_args_list]
+
+    def test_stream_logs_replays_append_pattern(self):
+        blob_service = _ReplayBlobService(RECORDED_APPENDS)
+        printed, sleeps = self._stream(blob_service)
+
+        expected = b''.join(data for data, _ in RECORDED_APPENDS).decode('utf-8')
+        self.assertEqual('\n'.join(printed), expected)
+        self.assertIn('Step 2/3 : RUN echo caf\xe9\r', printed)
+        # every byte is requested once, in ranges of at most byte_size bytes
+        self.assertEqual(sum(end - start + 1 for start, end in blob_service.range_requests), len(expected.encode()))
+        self.assertTrue(all(end - start < 16 for start, end in blob_service.range_requests))
+
+        # no waiting while new output keeps arriving, the interval tightened from 1s during the burst and
+        # backs off while the log is idle
+        self.assertEqual(sleeps, [0.5, 0.75, 1.125])
+
+    def test_stream_logs_raises_on_failure(self):
+        blob_service = _ReplayBlobService([(b'error\r\n', 'Failed')])
+        with self.assertRaisesRegex(CLIError, 'Run failed'):
+            self._stream(blob_service, raise_error_on_failure=True)
+
+    def test_stream_logs_stops_after_timeout(self):
+        blob_service = _ReplayBlobService([(b'partial line', None)])
+        printed = []
+        with mock.patch('azure.cli.command_modules.acr._stream_utils.print', create=True,
+                        side_effect=printed.append), mock.patch('time.sleep'):
+            _stream_logs(True, 16, 60, blob_service, 'logs', 'cb1/rawtext.log', False)
+        self.assertEqual(printed, ['partial line'])
+
+    def test_line_decoder(self):
+        decoder = _LogLineDecoder()
+        self.assertIsNone(decoder.feed(b'abc\r'))
+        self.assertEqual(decoder.feed(b'\ndef\r\nghi'), 'abc\r\ndef\r')
+        self.assertIsNone(decoder.feed(b'jk\xe2\x82'))
+        self.assertEqual(decoder.feed(b'\xac\r\n'), 'ghijk€\r')
+        self.assertIsNone(decoder.flush())
+        self.assertIsNone(decoder.feed(b'tail'))
+        self.assertEqual(decoder.flush(), 'tail')
+
+
+if __name__ == '__main__':
+    unittest.main()
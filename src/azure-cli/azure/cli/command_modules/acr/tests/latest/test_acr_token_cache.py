@@ -0,0 +1,162 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import base64
+import json
+import os
+import shutil
+import stat
+import tempfile
+import time
+import unittest
+import mock
+from knack.util import CLIError
+
+from azure.cli.command_modules.acr._docker_utils import (get_access_credentials, RepoAccessTokenPermission,
+                                                         _get_aad_token)
+from azure.cli.command_modules.acr._token_cache import RegistryTokenCache, ACR_TOKEN_CACHE_FILE
+from azure.cli.core.mock import DummyCli
+
+TEST_LOGIN_SERVER = 'testregistry.azurecr.io'
+
+
+def _jwt(expires_in, **claims):
+    claims['exp'] = int(time.time() + expires_in)
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode().rstrip('=')
+    return 'eyJhbGciOiJSUzI1NiJ9.{}.c2lnbmF0dXJl'.format(payload)
+
+
+class _FakeRegistry(object):
+    """Stands in for the registry endpoints behind requests.get/requests.post and counts the token requests."""
+
+    def __init__(self, access_token_lifetime=3600):
+        self.access_token_lifetime = access_token_lifetime
+        self.challenges = 0
+        self.exchanges = 0
+        self.token_requests = 0
+        self.refresh_tokens = []
+        self.revoked = set()
+        self.reject_all = False
+
+    @staticmethod
+    def _response(status_code, body=None, headers=None):
+        response = mock.MagicMock()
+        response.status_code = status_code
+        response.headers = headers or {}
+        response.content = json.dumps(body or {}).encode()
+        return response
+
+    def get(self, url, **kwargs):
+        assert url == 'https://{}/v2/'.format(TEST_LOGIN_SERVER)
+        self.challenges += 1
+        return self._response(401, headers={'WWW-Authenticate': 'Bearer realm="https://{}/oauth2/token",'
+                                                                'service="{}"'.format(TEST_LOGIN_SERVER,
+                                                                                      TEST_LOGIN_SERVER)})
+
+    def post(self, url, data, **kwargs):
+        if url.endswith('/oauth2/exchange'):
+            self.exchanges += 1
+            self.refresh_tokens.append(_jwt(3 * 3600, grant_type='refresh_token', n=self.exchanges))
+            return self._response(200, {'refresh_token': self.refresh_tokens[-1]})
+        self.token_requests += 1
+        if self.reject_all or any('refresh_token=' + token in data for token in self.revoked):
+            return self._response(401)
+        scope = [x for x in data.split('&') if x.startswith('scope=')][0]
+        return self._response(200, {'access_token': _jwt(self.access_token_lifetime, scope=scope,
+                                                         n=self.token_requests)})
+
+
+class AcrTokenCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.cmd = mock.MagicMock()
+        self.cmd.cli_ctx = DummyCli()
+        self.cmd.cli_ctx.config.config_dir = self.config_dir
+        self.cmd.get_models.return_value = mock.MagicMock()
+        registry = mock.MagicMock(login_server=TEST_LOGIN_SERVER)
+        registry.sku.name = self.cmd.get_models.return_value.premium.value
+
+        self.registry = _FakeRegistry()
+        self._patches = [
+            mock.patch('azure.cli.command_modules.acr._docker_utils.get_registry_by_name',
+                       return_value=(registry, 'testrg')),
+            mock.patch('azure.cli.command_modules.acr._docker_utils.get_subscription_id', return_value='sub1'),
+            mock.patch('azure.cli.core._profile.Profile.get_subscription',
+                       return_value={'tenantId': 'tenant1', 'user': {'name': 'user@contoso.com'}}),
+            mock.patch('azure.cli.core._profile.Profile.get_raw_token',
+                       return_value=(('Bearer', 'aadtoken', {}), 'sub1', 'tenant1')),
+            mock.patch('requests.get', side_effect=self.registry.get),
+            mock.patch('requests.post', side_effect=self.registry.post)]
+        for p in self._patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self._patches:
+            p.stop()
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    def _get_token(self, repository='repo1', permission=RepoAccessTokenPermission.METADATA_READ.value):
+        return get_access_credentials(self.cmd, 'testregistry', repository=repository, permission=permission)[2]
+
+    def test_access_token_reused_per_scope(self):
+        token = self._get_token()
+        self.assertEqual((self.registry.exchanges, self.registry.token_requests), (1, 1))
+
+        # the same scope skips both exchanges
+        self.assertEqual(self._get_token(), token)
+        self.assertEqual((self.registry.exchanges, self.registry.token_requests), (1, 1))
+
+        # another scope only needs the access token exchange, the refresh token is reused
+        self.assertNotEqual(self._get_token(repository='repo2'), token)
+        self.assertNotEqual(self._get_token(permission=RepoAccessTokenPermission.DELETE.value), token)
+        self.assertEqual((self.registry.exchanges, self.registry.token_requests), (1, 3))
+
+        cache_file = os.path.join(self.config_dir, ACR_TOKEN_CACHE_FILE)
+        if os.name != 'nt':
+            self.assertEqual(stat.S_IMODE(os.stat(cache_file).st_mode), 0o600)
+
+    def test_expiring_access_token_renewed(self):
+        self.registry.access_token_lifetime = 60
+        self._get_token()
+        self._get_token()
+        self.assertEqual((self.registry.exchanges, self.registry.token_requests), (1, 2))
+
+    def test_rejected_refresh_token_renewed(self):
+        self._get_token()
+        self.registry.revoked.update(self.registry.refresh_tokens)
+
+        # the cached refresh token is dropped and exchanged again once
+        self.assertIsNotNone(self._get_token(repository='repo2'))
+        self.assertEqual((self.registry.exchanges, self.registry.token_requests), (2, 3))
+        self._get_token(repository='repo3')
+        self.assertEqual((self.registry.exchanges, self.registry.token_requests), (2, 4))
+
+        # a token request rejected with a fresh refresh token is not retried
+        self.registry.reject_all = True
+        with self.assertRaisesRegex(CLIError, 'CONNECTIVITY_ACCESS_TOKEN_ERROR'):
+            _get_aad_token(self.cmd.cli_ctx, TEST_LOGIN_SERVER, False, repository='repo4',
+                           permission=RepoAccessTokenPermission.METADATA_READ.value)
+        self.assertEqual((self.registry.exchanges, self.registry.token_requests), (3, 6))
+
+    def test_cache_disabled(self):
+        with mock.patch.dict(os.environ, {'AZURE_ACR_TOKEN_CACHE': 'false'}):
+            self._get_token()
+            self._get_token()
+        self.assertEqual((self.registry.exchanges, self.registry.token_requests), (2, 2))
+
+    def test_cache_per_identity(self):
+        cache = RegistryTokenCache(self.cmd.cli_ctx, 'tenant1 user1')
+        key = cache.access_token_key(TEST_LOGIN_SERVER, 'registry:catalog:*')
+        cache.put(key, _jwt(3600))
+        self.assertIsNotNone(cache.get(key))
+        self.assertIsNone(RegistryTokenCache(self.cmd.cli_ctx, 'tenant1 user2').get(key))
+        # tokens without an expiry claim are not cached
+        cache.put(key, 'opaque-token')
+        self.assertNotEqual(cache.get(key), 'opaque-token')
+
+
+if __name__ == '__main__':
+    unittest.main()
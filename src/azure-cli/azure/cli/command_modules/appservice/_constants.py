@@ -62,4 +62,10 @@ class FUNCTIONS_STACKS_API_KEYS():
         self.FUNCTIONS_WORKER_RUNTIME = 'FUNCTIONS_WORKER_RUNTIME'
 
 
+# largest read from the zip package while it is sent to the zipdeploy endpoint, upload progress is reported
+# once per this many bytes
+ZIP_DEPLOY_CHUNK_SIZE = 1024 * 1024
+# times the zip package is sent again when the connection to the scm site drops
+ZIP_DEPLOY_RETRIES = 3
+
 RUNTIME_STACKS = os.path.abspath(os.path.join(os.path.abspath(__file__), '../resources/WebappRuntimeStacks.json'))
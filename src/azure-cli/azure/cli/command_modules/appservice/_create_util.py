@@ -4,6 +4,7 @@
 # --------------------------------------------------------------------------------------------
 
 import os
+import sys
 import zipfile
 from knack.util import CLIError
 from knack.log import get_logger
@@ -30,7 +31,25 @@ def web_client_factory(cli_ctx, **_):
     return get_mgmt_service_client(cli_ctx, WebSiteManagementClient)
 
 
-def zip_contents_from_dir(dirPath, lang):
+# files larger than this are streamed into the archive instead of being compressed on a worker thread
+ZIP_PARALLEL_MAX_FILE_SIZE = 32 * 1024 * 1024
+# projects whose last package is kept to be reused by the next `az webapp up`, up to a total size in bytes
+ZIP_CACHE_MAX_PROJECTS = 5
+ZIP_CACHE_MAX_SIZE = 512 * 1024 * 1024
+# compressed entries are written as is with zipfile internals that are known on these Python versions, on others
+# every file is compressed through the public zipfile API, serially and without reuse
+_ZIP_RAW_ENTRIES = (3, 6) <= sys.version_info[:2] <= (3, 13) and hasattr(zipfile, '_FH_EXTRA_FIELD_LENGTH')
+_ZIP_CACHE_MANIFEST = 'manifest.json'
+_ZIP_CACHE_PACKAGE = 'package.zip'
+
+
+def zip_contents_from_dir(dirPath, lang, cache_dir=None):
+    """Zip the contents of `dirPath` to a temporary file and return its path.
+
+    With a `cache_dir`, the package and a manifest of its file hashes are kept there, and the compressed entries
+    of files that did not change are copied from the previous package of the same directory instead of being
+    compressed again. New or changed files are compressed on worker threads. Both rely on `_ZIP_RAW_ENTRIES`.
+    """
     import tempfile
     import uuid
     relroot = os.path.abspath(tempfile.gettempdir())
@@ -40,29 +59,12 @@ def zip_contents_from_dir(dirPath, lang):
     zip_file_path = relroot + os.path.sep + file_val_unique + ".zip"
     abs_src = os.path.abspath(dirPath)
     try:
+        files = _get_files_to_zip(dirPath, lang, abs_src)
+        cache = _ZipPackageCache(cache_dir, abs_src) if cache_dir and _ZIP_RAW_ENTRIES else None
         with zipfile.ZipFile("{}".format(zip_file_path), "w", zipfile.ZIP_DEFLATED) as zf:
-            for dirname, subdirs, files in os.walk(dirPath):
-                # skip node_modules folder for Node apps,
-                # since zip_deployment will perform the build operation
-                if lang.lower() == NODE_RUNTIME_NAME:
-                    subdirs[:] = [d for d in subdirs if 'node_modules' not in d]
-                elif lang.lower() == NETCORE_RUNTIME_NAME:
-                    subdirs[:] = [d for d in subdirs if d not in ['obj', 'bin']]
-                elif lang.lower() == PYTHON_RUNTIME_NAME:
-                    subdirs[:] = [d for d in subdirs if 'env' not in d]  # Ignores dir that contain env
-
-                    filtered_files = []
-                    for filename in files:
-                        if filename == '.env':
-                            logger.info("Skipping file: %s/%s", dirname, filename)
-                        else:
-                            filtered_files.append(filename)
-                    files[:] = filtered_files
-
-                for filename in files:
-                    absname = os.path.abspath(os.path.join(dirname, filename))
-                    arcname = absname[len(abs_src) + 1:]
-                    zf.write(absname, arcname)
+            manifest = _write_zip_entries(zf, files, cache)
+        if cache:
+            cache.save(zip_file_path, manifest)
     except IOError as e:
         if e.errno == 13:
             raise CLIError('Insufficient permissions to create a zip in current directory. '
@@ -72,6 +74,205 @@ def zip_contents_from_dir(dirPath, lang):
     return zip_file_path
 
 
+def _get_files_to_zip(dirPath, lang, abs_src):
+    result = []
+    for dirname, subdirs, files in os.walk(dirPath):
+        # skip node_modules folder for Node apps,
+        # since zip_deployment will perform the build operation
+        if lang.lower() == NODE_RUNTIME_NAME:
+            subdirs[:] = [d for d in subdirs if 'node_modules' not in d]
+        elif lang.lower() == NETCORE_RUNTIME_NAME:
+            subdirs[:] = [d for d in subdirs if d not in ['obj', 'bin']]
+        elif lang.lower() == PYTHON_RUNTIME_NAME:
+            subdirs[:] = [d for d in subdirs if 'env' not in d]  # Ignores dir that contain env
+
+            filtered_files = []
+            for filename in files:
+                if filename == '.env':
+                    logger.info("Skipping file: %s/%s", dirname, filename)
+                else:
+                    filtered_files.append(filename)
+            files[:] = filtered_files
+
+        for filename in files:
+            absname = os.path.abspath(os.path.join(dirname, filename))
+            arcname = absname[len(abs_src) + 1:]
+            result.append((absname, arcname))
+    return result
+
+
+def _write_zip_entries(zf, files, cache):
+    """ Write `files`, a list of (path, arcname), to `zf` in order. Returns the manifest of the written files. """
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    previous = cache.load() if cache else None
+    manifest = {}
+    max_workers = os.cpu_count() or 1
+    pending = deque()
+    reused = [0]
+
+    def _flush(max_pending):
+        while len(pending) > max_pending:
+            write, arg = pending.popleft()
+            write(arg.result() if hasattr(arg, 'result') else arg)
+
+    def _write_compressed(result):
+        zinfo, data, entry = result
+        _write_raw_entry(zf, zinfo, [data])
+        manifest[zinfo.filename] = entry
+
+    def _write_streamed(item):
+        (absname, arcname), st = item
+        zf.write(absname, arcname)
+        manifest[zf.filelist[-1].filename] = [st.st_mtime_ns, st.st_size, _hash_file(absname)]
+
+    def _write_reused(item):
+        (absname, arcname), st, entry = item
+        zinfo = zipfile.ZipInfo.from_file(absname, arcname)
+        old_info = previous[0].getinfo(zinfo.filename)
+        zinfo.compress_type = old_info.compress_type
+        zinfo.CRC = old_info.CRC
+        zinfo.compress_size = old_info.compress_size
+        _write_raw_entry(zf, zinfo, _read_raw_entry(previous[0], old_info))
+        manifest[zinfo.filename] = [st.st_mtime_ns, st.st_size, entry[2]]
+        reused[0] += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for absname, arcname in files:
+                st = os.stat(absname)
+                entry = _get_reusable_entry(previous, absname, arcname, st)
+                if entry:
+                    pending.append((_write_reused, ((absname, arcname), st, entry)))
+                elif st.st_size > ZIP_PARALLEL_MAX_FILE_SIZE or not _ZIP_RAW_ENTRIES:
+                    pending.append((_write_streamed, ((absname, arcname), st)))
+                else:
+                    pending.append((_write_compressed, executor.submit(_compress_file, absname, arcname, st)))
+                # bound the compressed data held in memory
+                _flush(2 * max_workers)
+            _flush(0)
+        finally:
+            if previous:
+                previous[0].close()
+    logger.info("Zipped %d files, reused %d compressed entries from the previous package", len(files), reused[0])
+    return manifest
+
+
+def _compress_file(absname, arcname, st):
+    import hashlib
+    import zlib
+    zinfo = zipfile.ZipInfo.from_file(absname, arcname)
+    with open(absname, 'rb') as f:
+        content = f.read()
+    # raw deflate stream, as written by zipfile for ZIP_DEFLATED
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    data = compressor.compress(content) + compressor.flush()
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    zinfo.file_size = len(content)
+    zinfo.compress_size = len(data)
+    zinfo.CRC = zlib.crc32(content) & 0xffffffff
+    return zinfo, data, [st.st_mtime_ns, len(content), hashlib.sha256(content).hexdigest()]
+
+
+def _get_reusable_entry(previous, absname, arcname, st):
+    """ Return the manifest entry of the file if its compressed entry in the previous package can be reused. """
+    if not previous:
+        return None
+    package, manifest = previous
+    arcname = arcname.replace(os.sep, '/')
+    entry = manifest.get(arcname)
+    if not entry or entry[1] != st.st_size or arcname not in package.NameToInfo:
+        return None
+    # the content is only hashed when the file was touched since the previous package
+    if entry[0] != st.st_mtime_ns and _hash_file(absname) != entry[2]:
+        return None
+    return entry
+
+
+def _write_raw_entry(zf, zinfo, chunks):
+    """ Append an entry whose compressed data is already known to `zf`. Only used with `_ZIP_RAW_ENTRIES`. """
+    # pylint: disable=protected-access
+    zinfo.flag_bits &= ~0x08  # sizes and CRC are in the local header, no data descriptor
+    zf.fp.seek(zf.start_dir)
+    zinfo.header_offset = zf.start_dir
+    zf.fp.write(zinfo.FileHeader())
+    for chunk in chunks:
+        zf.fp.write(chunk)
+    zf.filelist.append(zinfo)
+    zf.NameToInfo[zinfo.filename] = zinfo
+    zf.start_dir = zf.fp.tell()
+    zf._didModify = True
+
+
+def _read_raw_entry(package, zinfo, chunk_size=1024 * 1024):
+    """ Yield the compressed data of the `zinfo` entry of `package`. """
+    import struct
+    package.fp.seek(zinfo.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, package.fp.read(zipfile.sizeFileHeader))
+    # skip the file name and extra field that follow the fixed size local header
+    package.fp.seek(header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH], 1)  # pylint: disable=protected-access
+    remaining = zinfo.compress_size
+    while remaining > 0:
+        chunk = package.fp.read(min(chunk_size, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile('Truncated entry {}'.format(zinfo.filename))
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _hash_file(path):
+    import hashlib
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class _ZipPackageCache(object):
+    """The last package zipped from a source directory and the manifest of its files, kept in `cache_dir`."""
+
+    def __init__(self, cache_dir, abs_src):
+        import hashlib
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, hashlib.sha256(abs_src.encode('utf-8')).hexdigest()[:32])
+
+    def load(self):
+        """ Return the (ZipFile, manifest) of the previous package, or None. """
+        import json
+        try:
+            with open(os.path.join(self.path, _ZIP_CACHE_MANIFEST), 'r') as f:
+                manifest = json.load(f)
+            return zipfile.ZipFile(os.path.join(self.path, _ZIP_CACHE_PACKAGE), 'r'), manifest
+        except (OSError, IOError, ValueError, zipfile.BadZipFile) as ex:
+            logger.debug("No previous package to reuse: %s", ex)
+            return None
+
+    def save(self, zip_file_path, manifest):
+        import json
+        import shutil
+        from knack.util import ensure_dir
+        try:
+            ensure_dir(self.path)
+            # the manifest is written last so that it never describes another package
+            manifest_path = os.path.join(self.path, _ZIP_CACHE_MANIFEST)
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            shutil.copyfile(zip_file_path, os.path.join(self.path, _ZIP_CACHE_PACKAGE))
+            with open(manifest_path, 'w') as f:
+                json.dump(manifest, f)
+            # keep the most recently deployed projects only
+            projects = sorted((os.path.join(self.cache_dir, d) for d in os.listdir(self.cache_dir)),
+                              key=os.path.getmtime, reverse=True)
+            total_size = 0
+            for index, project in enumerate(projects):
+                total_size += sum(os.path.getsize(os.path.join(project, f)) for f in os.listdir(project))
+                if index >= ZIP_CACHE_MAX_PROJECTS or total_size > ZIP_CACHE_MAX_SIZE:
+                    shutil.rmtree(project, ignore_errors=True)
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save the package for reuse: %s", ex)
+
+
 def get_runtime_version_details(file_path, lang_name):
     version_detected = None
     version_to_create = None
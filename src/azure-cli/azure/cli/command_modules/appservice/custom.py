@@ -61,7 +61,8 @@ from ._create_util import (zip_contents_from_dir, get_runtime_version_details, c
                            detect_os_form_src, get_current_stack_from_runtime)
 from ._constants import (FUNCTIONS_STACKS_API_JSON_PATHS, FUNCTIONS_STACKS_API_KEYS,
                          FUNCTIONS_LINUX_RUNTIME_VERSION_REGEX, FUNCTIONS_WINDOWS_RUNTIME_VERSION_REGEX,
-                         NODE_EXACT_VERSION_DEFAULT, RUNTIME_STACKS, FUNCTIONS_NO_V2_REGIONS)
+                         NODE_EXACT_VERSION_DEFAULT, RUNTIME_STACKS, FUNCTIONS_NO_V2_REGIONS, ZIP_DEPLOY_CHUNK_SIZE,
+                         ZIP_DEPLOY_RETRIES)
 
 logger = get_logger(__name__)
 
@@ -411,15 +412,10 @@ def enable_zip_deploy(cmd, resource_group_name, name, src, timeout=None, slot=No
     headers['Cache-Control'] = 'no-cache'
     headers['User-Agent'] = get_az_user_agent()
 
-    import requests
     import os
-    from azure.cli.core.util import should_disable_connection_verify
-    # Read file content
-    with open(os.path.realpath(os.path.expanduser(src)), 'rb') as fs:
-        zip_content = fs.read()
-        logger.warning("Starting zip deployment. This operation can take a while to complete ...")
-        res = requests.post(zip_url, data=zip_content, headers=headers, verify=not should_disable_connection_verify())
-        logger.warning("Deployment endpoint responded with status code %d", res.status_code)
+    logger.warning("Starting zip deployment. This operation can take a while to complete ...")
+    res = _upload_zip_for_deployment(cmd.cli_ctx, zip_url, os.path.realpath(os.path.expanduser(src)), headers)
+    logger.warning("Deployment endpoint responded with status code %d", res.status_code)
 
     # check if there's an ongoing process
     if res.status_code == 409:
@@ -433,6 +429,69 @@ def enable_zip_deploy(cmd, resource_group_name, name, src, timeout=None, slot=No
     return response
 
 
+class _ZipDeployBody(object):
+    """Read-only view of the zip being deployed that reports the upload progress.
+
+    requests streams objects with a `read` method, so the artifact is sent from disk in reads of at most
+    ZIP_DEPLOY_CHUNK_SIZE bytes instead of being loaded in memory.
+    """
+
+    def __init__(self, path, progress_hook=None):
+        import os
+        self._file = open(path, 'rb')
+        self.len = os.fstat(self._file.fileno()).st_size
+        self.sent = 0
+        self._progress_hook = progress_hook
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > ZIP_DEPLOY_CHUNK_SIZE:
+            size = ZIP_DEPLOY_CHUNK_SIZE
+        data = self._file.read(size)
+        reported = self.sent // ZIP_DEPLOY_CHUNK_SIZE
+        self.sent += len(data)
+        if self._progress_hook and (self.sent // ZIP_DEPLOY_CHUNK_SIZE != reported or self.sent == self.len):
+            self._progress_hook.add(message='Uploading', value=self.sent, total_val=self.len)
+        return data
+
+    def rewind(self):
+        self._file.seek(0)
+        self.sent = 0
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _upload_zip_for_deployment(cli_ctx, zip_url, src, headers, retries=ZIP_DEPLOY_RETRIES):
+    """ POST the zip at `src` to the Kudu zipdeploy endpoint, sending it again if the connection drops. """
+    import requests
+    from azure.cli.core.util import should_disable_connection_verify
+    hook = cli_ctx.get_progress_controller(det=True)
+    try:
+        with _ZipDeployBody(src, hook) as body:
+            attempt = 0
+            while True:
+                try:
+                    return requests.post(zip_url, data=body, headers=headers,
+                                         verify=not should_disable_connection_verify())
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as ex:
+                    attempt += 1
+                    if attempt > retries:
+                        raise CLIError("Failed to upload the zip package after {} attempts: {}".format(attempt, ex))
+                    # Kudu can't resume a partial upload, the package is sent again from the start
+                    logger.warning("The connection dropped after %d of %d bytes were sent. Retrying (%d/%d) ...",
+                                   body.sent, body.len, attempt, retries)
+                    time.sleep(2 ** attempt)
+                    body.rewind()
+    finally:
+        hook.end()
+
+
 def add_remote_build_app_settings(cmd, resource_group_name, name, slot):
     settings = get_app_settings(cmd, resource_group_name, name, slot)
     scm_do_build_during_deployment = None
@@ -3746,7 +3805,8 @@ def webapp_up(cmd, name, resource_group_name=None, plan=None, location=None, sku
     # Zip contents & Deploy
     logger.warning("Creating zip with contents of dir %s ...", src_dir)
     # zip contents & deploy
-    zip_file_path = zip_contents_from_dir(src_dir, language)
+    zip_file_path = zip_contents_from_dir(src_dir, language,
+                                          cache_dir=os.path.join(cmd.cli_ctx.config.config_dir, 'webappUpPackages'))
     enable_zip_deploy(cmd, rg_name, name, zip_file_path)
 
     if launch_browser:
@@ -3888,11 +3948,14 @@ def create_tunnel(cmd, resource_group_name, name, port=None, slot=None, timeout=
 
     logger.warning('Ctrl + C to close')
 
-    if timeout:
-        time.sleep(int(timeout))
-    else:
-        while t.is_alive():
-            time.sleep(5)
+    try:
+        if timeout:
+            time.sleep(int(timeout))
+        else:
+            while t.is_alive():
+                time.sleep(5)
+    finally:
+        tunnel_server.stop_server()
 
 
 def create_tunnel_and_session(cmd, resource_group_name, name, port=None, slot=None, timeout=None, instance=None):
@@ -3910,11 +3973,14 @@ def create_tunnel_and_session(cmd, resource_group_name, name, port=None, slot=No
     s.daemon = True
     s.start()
 
-    if timeout:
-        time.sleep(int(timeout))
-    else:
-        while s.is_alive() and t.is_alive():
-            time.sleep(5)
+    try:
+        if timeout:
+            time.sleep(int(timeout))
+        else:
+            while s.is_alive() and t.is_alive():
+                time.sleep(5)
+    finally:
+        tunnel_server.stop_server()
 
 
 def _wait_for_webapp(tunnel_server):
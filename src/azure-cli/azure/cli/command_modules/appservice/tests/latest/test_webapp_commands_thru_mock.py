@@ -27,7 +27,8 @@ from azure.cli.command_modules.appservice.custom import (set_deployment_user,
                                                          restore_deleted_webapp,
                                                          list_snapshots,
                                                          restore_snapshot,
-                                                         create_managed_ssl_cert)
+                                                         create_managed_ssl_cert,
+                                                         enable_zip_deploy)
 
 # pylint: disable=line-too-long
 from vsts_cd_manager.continuous_delivery_manager import ContinuousDeliveryResult
@@ -436,11 +437,98 @@ class TestWebappMocked(unittest.TestCase):
         client.certificates.create_or_update.assert_called_once_with(name=host_name, resource_group_name=rg_name,
                                                                      certificate_envelope=cert_def)
 
+    @mock.patch('azure.cli.command_modules.appservice.custom._get_scm_url', autospec=True)
+    @mock.patch('azure.cli.command_modules.appservice.custom._get_site_credential', autospec=True)
+    def test_enable_zip_deploy_retries_dropped_upload(self, site_credential_mock, scm_url_mock):
+        import os
+        import tempfile
+        package = os.urandom(3 * 1024 * 1024 + 17)
+        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as f:
+            f.write(package)
+        try:
+            site_credential_mock.return_value = ('user', 'password')
+            server = _KuduZipDeployStandIn(drop_uploads=2)
+            scm_url_mock.return_value = server.url
+            cmd_mock = _get_test_cmd()
+            with mock.patch('azure.cli.command_modules.appservice.custom.time.sleep') as sleep_mock, \
+                    mock.patch.object(cmd_mock.cli_ctx, 'get_progress_controller') as progress_mock:
+                result = enable_zip_deploy(cmd_mock, 'rg', 'name', f.name)
+            server.shutdown()
+
+            self.assertEqual(result, {'status': 4, 'complete': True})
+            self.assertEqual(server.attempts, 3)
+            self.assertEqual(server.received, package)
+            # backed off before each retry and before polling the deployment status
+            self.assertEqual([c[0][0] for c in sleep_mock.call_args_list], [2, 4, 2])
+            hook = progress_mock.return_value
+            hook.add.assert_called_with(message='Uploading', value=len(package), total_val=len(package))
+            # progress is reported once per MiB sent, not per socket write
+            self.assertLess(hook.add.call_count, 3 * 5)
+            hook.end.assert_called_once_with()
+
+            # gives up once the retries are exhausted
+            server = _KuduZipDeployStandIn(drop_uploads=10)
+            scm_url_mock.return_value = server.url
+            with mock.patch('azure.cli.command_modules.appservice.custom.time.sleep'):
+                with self.assertRaisesRegex(CLIError, 'after 4 attempts'):
+                    enable_zip_deploy(_get_test_cmd(), 'rg', 'name', f.name)
+        finally:
+            server.shutdown()
+            os.remove(f.name)
+        self.assertEqual(server.attempts, 4)
+
 
 class FakedResponse(object):  # pylint: disable=too-few-public-methods
     def __init__(self, status_code):
         self.status_code = status_code
 
 
+class _KuduZipDeployStandIn(object):
+    """Local stand-in for the Kudu zipdeploy and deployment status endpoints that drops the first
+    `drop_uploads` uploads half way through."""
+
+    def __init__(self, drop_uploads):
+        import threading
+        from http.server import HTTPServer, BaseHTTPRequestHandler
+        stand_in = self
+        self.attempts = 0
+        self.received = None
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # pylint: disable=invalid-name
+                stand_in.attempts += 1
+                length = int(self.headers['Content-Length'])
+                if stand_in.attempts <= drop_uploads:
+                    self.rfile.read(length // 2)
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                stand_in.received = self.rfile.read(length)
+                self.send_response(202)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                body = b'{"status": 4, "complete": true}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self._server = HTTPServer(('127.0.0.1', 0), _Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self._server.server_port)
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def shutdown(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
 if __name__ == '__main__':
     unittest.main()
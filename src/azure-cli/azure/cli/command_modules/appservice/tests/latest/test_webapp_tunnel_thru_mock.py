@@ -0,0 +1,159 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import queue
+import socket
+import threading
+import time
+import unittest
+import mock
+from websocket import WebSocket
+
+from azure.cli.command_modules.appservice.tunnel import TunnelServer, TunnelConnectionStats
+
+
+class _EchoWebSocket(WebSocket):
+    """In-process stand-in for the Kudu tunnel websocket that echoes back what it receives."""
+    lock = threading.Lock()
+    open_sockets = 0
+    max_open_sockets = 0
+
+    def __init__(self):  # pylint: disable=super-init-not-called
+        self.connected = True
+        self._frames = queue.Queue()
+        with _EchoWebSocket.lock:
+            _EchoWebSocket.open_sockets += 1
+            _EchoWebSocket.max_open_sockets = max(_EchoWebSocket.max_open_sockets, _EchoWebSocket.open_sockets)
+
+    def send_binary(self, data):
+        self._frames.put(bytes(data))
+
+    def recv(self):
+        return self._frames.get()
+
+    def abort(self):
+        self._frames.put(b'')
+
+    def close(self, *args, **kwargs):
+        if self.connected:
+            self.connected = False
+            self._frames.put(b'')
+            with _EchoWebSocket.lock:
+                _EchoWebSocket.open_sockets -= 1
+
+
+class TestTunnelServer(unittest.TestCase):
+
+    def setUp(self):
+        _EchoWebSocket.open_sockets = 0
+        _EchoWebSocket.max_open_sockets = 0
+
+    def _start_server(self, max_connections):
+        server = TunnelServer('127.0.0.1', 0, 'https://myapp.scm.azurewebsites.net', 'user', 'password', None,
+                              max_connections=max_connections)
+        patcher = mock.patch('azure.cli.command_modules.appservice.tunnel.create_connection',
+                             side_effect=lambda *args, **kwargs: _EchoWebSocket())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        thread = threading.Thread(target=server.start_server)
+        thread.daemon = True
+        thread.start()
+        # the connections of a test are closed before the counters are reset for the next one
+        self.addCleanup(self._join_connections)
+        self.addCleanup(server.stop_server)
+        server.thread = thread
+        return server
+
+    @staticmethod
+    def _serving_threads():
+        return [t for t in threading.enumerate() if t.name.endswith('(_serve_connection)')]
+
+    def _join_connections(self):
+        for thread in self._serving_threads():
+            thread.join(5)
+
+    def _connect(self, server):
+        for _ in range(50):
+            try:
+                return socket.create_connection(('127.0.0.1', server.get_port()), timeout=10)
+            except OSError:
+                time.sleep(0.1)
+        raise AssertionError('tunnel is not listening')
+
+    def test_tunnel_serves_concurrent_connections(self):
+        server = self._start_server(max_connections=8)
+        clients = [self._connect(server) for _ in range(8)]
+        try:
+            # every client talks while all of them are connected
+            for i, client in enumerate(clients):
+                client.sendall('hello {}'.format(i).encode())
+            for i, client in enumerate(clients):
+                self.assertEqual(client.recv(4096), 'hello {}'.format(i).encode())
+            self.assertEqual(_EchoWebSocket.max_open_sockets, 8)
+        finally:
+            for client in clients:
+                client.close()
+
+    def test_tunnel_bounds_concurrent_connections(self):
+        server = self._start_server(max_connections=2)
+        first, second, third = [self._connect(server) for _ in range(3)]
+        try:
+            for client in (first, second):
+                client.sendall(b'ping')
+                self.assertEqual(client.recv(4096), b'ping')
+            # the third connection waits in the backlog until a slot frees up
+            third.sendall(b'ping')
+            third.settimeout(0.5)
+            with self.assertRaises(socket.timeout):
+                third.recv(4096)
+            first.close()
+            third.settimeout(10)
+            self.assertEqual(third.recv(4096), b'ping')
+            self.assertEqual(_EchoWebSocket.max_open_sockets, 2)
+        finally:
+            for client in (first, second, third):
+                client.close()
+
+    def test_stop_server_closes_connections(self):
+        server = self._start_server(max_connections=2)
+        client = self._connect(server)
+        try:
+            client.sendall(b'ping')
+            self.assertEqual(client.recv(4096), b'ping')
+            serving = self._serving_threads()
+            self.assertEqual(len(serving), 1)
+            self.assertTrue(serving[0].daemon)
+
+            # the connected client does not keep the server running
+            server.stop_server()
+            server.thread.join(5)
+            serving[0].join(5)
+            self.assertFalse(server.thread.is_alive() or serving[0].is_alive())
+            self.assertEqual(_EchoWebSocket.open_sockets, 0)
+            self.assertEqual(client.recv(4096), b'')
+        finally:
+            client.close()
+
+    def test_connection_stats(self):
+        # started, two sends and a receive 100 ms apart, then one 300 ms round trip, then closed
+        clock = [0.0, 1.0, 1.1, 2.0, 2.3, 5.0]
+        with mock.patch('azure.cli.command_modules.appservice.tunnel.time.time', side_effect=clock):
+            stats = TunnelConnectionStats(1)
+            stats.on_sent(10)
+            stats.on_sent(5)
+            stats.on_received(15)
+            stats.on_received(3)
+            stats.on_sent(1)
+            stats.on_received(1)
+            self.assertEqual((stats.bytes_sent, stats.bytes_received), (16, 19))
+            self.assertEqual(stats.round_trips, 2)
+            with mock.patch('azure.cli.command_modules.appservice.tunnel.logger') as logger_mock:
+                stats.close()
+        message, args = logger_mock.info.call_args[0][0], logger_mock.info.call_args[0][1:]
+        self.assertIn('16 bytes sent, 19 bytes received', message % args)
+        self.assertIn('mean round trip 200 ms, max 300 ms', message % args)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+import mock
+
+from azure.cli.command_modules.appservice import _create_util
+from azure.cli.command_modules.appservice._create_util import zip_contents_from_dir
+
+
+class TestWebappUpZip(unittest.TestCase):
+
+    def setUp(self):
+        self.src = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.zips = []
+        self._write('package.json', '{"name": "app"}')
+        self._write('server.js', 'console.log("hello")\n' * 500)
+        self._write('public/data.bin', os.urandom(200 * 1024))
+        self._write('node_modules/express/index.js', 'module.exports = {}')
+
+    def tearDown(self):
+        shutil.rmtree(self.src, ignore_errors=True)
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        for path in self.zips:
+            os.remove(path)
+
+    def _write(self, path, content):
+        path = os.path.join(self.src, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content.encode() if isinstance(content, str) else content)
+
+    def _zip(self):
+        with mock.patch.object(_create_util, '_compress_file', wraps=_create_util._compress_file) as compress_mock:
+            zip_file_path = zip_contents_from_dir(self.src, 'node', cache_dir=self.cache_dir)
+        self.zips.append(zip_file_path)
+        with zipfile.ZipFile(zip_file_path) as zf:
+            self.assertIsNone(zf.testzip())
+            contents = {name: zf.read(name) for name in zf.namelist()}
+        return contents, sorted(c[0][1] for c in compress_mock.call_args_list)
+
+    def test_zip_reuses_unchanged_entries(self):
+        contents, compressed = self._zip()
+        self.assertEqual(sorted(contents), ['package.json', 'public/data.bin', 'server.js'])
+        self.assertEqual(compressed, ['package.json', 'public/data.bin', 'server.js'])
+
+        self._write('server.js', 'console.log("changed")')
+        # touched but unchanged files are hashed and still reused
+        os.utime(os.path.join(self.src, 'package.json'), ns=(0, 10 ** 18))
+        contents, compressed = self._zip()
+        self.assertEqual(compressed, ['server.js'])
+        self.assertEqual(contents['server.js'], b'console.log("changed")')
+        self.assertEqual(contents['package.json'], b'{"name": "app"}')
+        with open(os.path.join(self.src, 'public', 'data.bin'), 'rb') as f:
+            self.assertEqual(contents['public/data.bin'], f.read())
+
+        contents, compressed = self._zip()
+        self.assertEqual(compressed, [])
+        self.assertEqual(len(contents), 3)
+
+    def test_zip_streams_large_files_and_works_without_cache(self):
+        with mock.patch.object(_create_util, 'ZIP_PARALLEL_MAX_FILE_SIZE', 100 * 1024):
+            zip_file_path = zip_contents_from_dir(self.src, 'node')
+        self.zips.append(zip_file_path)
+        with zipfile.ZipFile(zip_file_path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(sorted(zf.namelist()), ['package.json', 'public/data.bin', 'server.js'])
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_zip_without_raw_entries(self):
+        with mock.patch.object(_create_util, '_ZIP_RAW_ENTRIES', False):
+            contents, compressed = self._zip()
+        self.assertEqual(sorted(contents), ['package.json', 'public/data.bin', 'server.js'])
+        self.assertEqual(contents['package.json'], b'{"name": "app"}')
+        self.assertEqual(compressed, [])
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_zip_cache_size_limit(self):
+        self._zip()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        with mock.patch.object(_create_util, 'ZIP_CACHE_MAX_SIZE', 1024):
+            _, compressed = self._zip()
+        # the package was reused, but it is too large to be kept for the next run
+        self.assertEqual(compressed, [])
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,7 +13,7 @@ import traceback
 import logging as logs
 from contextlib import closing
 from datetime import datetime
-from threading import Thread
+from threading import BoundedSemaphore, Lock, Thread
 
 import websocket
 from websocket import create_connection, WebSocket
@@ -35,9 +35,14 @@ class TunnelWebSocket(WebSocket):
         return data
 
 
+# client connections served at the same time, each with its own websocket to the scm site
+TUNNEL_MAX_CONNECTIONS = 20
+
+
 # pylint: disable=no-member,too-many-instance-attributes,bare-except,no-self-use
 class TunnelServer:
-    def __init__(self, local_addr, local_port, remote_addr, remote_user_name, remote_password, instance):
+    def __init__(self, local_addr, local_port, remote_addr, remote_user_name, remote_password, instance,
+                 max_connections=TUNNEL_MAX_CONNECTIONS):
         self.local_addr = local_addr
         self.local_port = local_port
         if self.local_port != 0 and not self.is_port_open():
@@ -49,8 +54,11 @@ class TunnelServer:
         self.remote_user_name = remote_user_name
         self.remote_password = remote_password
         self.instance = instance
-        self.client = None
-        self.ws = None
+        self.max_connections = max_connections
+        self._connection_slots = BoundedSemaphore(max_connections)
+        # sockets of the connections being served, closed by stop_server
+        self._open_sockets = set()
+        self._open_sockets_lock = Lock()
         logger.info('Creating a socket on port: %s', self.local_port)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         logger.info('Setting socket options')
@@ -136,43 +144,79 @@ class TunnelServer:
         self.sock.listen(100)
         index = 0
         basic_auth_string = self.create_basic_auth()
+        cli_logger = get_logger()  # get CLI logger which has the level set through command lines
+        is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
+        if is_verbose:
+            logger.info('Websocket tracing enabled')
+            websocket.enableTrace(True)
+        else:
+            logger.info('Websocket tracing disabled, use --verbose flag to enable')
+            websocket.enableTrace(False)
         while True:
-            self.client, _address = self.sock.accept()
-            self.client.settimeout(60 * 60)
-            host = 'wss://{}{}'.format(self.remote_addr, '/AppServiceTunnel/Tunnel.ashx')
-            basic_auth_header = ['Authorization: Basic {}'.format(basic_auth_string)]
-            if self.instance is not None:
-                basic_auth_header.append('Cookie: ARRAffinity=' + self.instance)
-            cli_logger = get_logger()  # get CLI logger which has the level set through command lines
-            is_verbose = any(handler.level <= logs.INFO for handler in cli_logger.handlers)
-            if is_verbose:
-                logger.info('Websocket tracing enabled')
-                websocket.enableTrace(True)
-            else:
-                logger.info('Websocket tracing disabled, use --verbose flag to enable')
-                websocket.enableTrace(False)
-            self.ws = create_connection(host,
-                                        sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
-                                        class_=TunnelWebSocket,
-                                        header=basic_auth_header,
-                                        sslopt={'cert_reqs': ssl.CERT_NONE},
-                                        timeout=60 * 60,
-                                        enable_multithread=True)
-            logger.info('Websocket, connected status: %s', self.ws.connected)
+            # stop accepting once max_connections clients are connected, pending ones wait in the backlog
+            self._connection_slots.acquire()
+            try:
+                client, _address = self.sock.accept()
+            except OSError:
+                self._connection_slots.release()
+                logger.info('Stopped local server..')
+                return
+            client.settimeout(60 * 60)
             index = index + 1
             logger.info('Got debugger connection... index: %s', index)
-            debugger_thread = Thread(target=self._listen_to_client, args=(self.client, self.ws, index))
-            web_socket_thread = Thread(target=self._listen_to_web_socket, args=(self.client, self.ws, index))
-            debugger_thread.start()
+            # daemon threads, like the websocket one, so a connected client never holds up the exit
+            Thread(target=self._serve_connection, args=(client, basic_auth_string, index), daemon=True).start()
+
+    def _create_web_socket(self, basic_auth_string):
+        host = 'wss://{}{}'.format(self.remote_addr, '/AppServiceTunnel/Tunnel.ashx')
+        basic_auth_header = ['Authorization: Basic {}'.format(basic_auth_string)]
+        if self.instance is not None:
+            basic_auth_header.append('Cookie: ARRAffinity=' + self.instance)
+        return create_connection(host,
+                                 sockopt=((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),),
+                                 class_=TunnelWebSocket,
+                                 header=basic_auth_header,
+                                 sslopt={'cert_reqs': ssl.CERT_NONE},
+                                 timeout=60 * 60,
+                                 enable_multithread=True)
+
+    def _serve_connection(self, client, basic_auth_string, index):
+        stats = TunnelConnectionStats(index)
+        self._track_sockets(client)
+        ws = None
+        try:
+            start = time.time()
+            try:
+                ws = self._create_web_socket(basic_auth_string)
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.warning('Failed to open the websocket for connection %s: %s', index, ex)
+                client.close()
+                return
+            self._track_sockets(ws)
+            stats.connect_time = time.time() - start
+            logger.info('Websocket, connected status: %s, index: %s', ws.connected, index)
+            web_socket_thread = Thread(target=self._listen_to_web_socket, args=(client, ws, index, stats),
+                                       daemon=True)
             web_socket_thread.start()
             logger.info('Both debugger and websocket threads started...')
             logger.info('Successfully connected to local server..')
-            debugger_thread.join()
+            self._listen_to_client(client, ws, index, stats)
             web_socket_thread.join()
             logger.info('Both debugger and websocket threads stopped...')
-            logger.info('Stopped local server..')
+        finally:
+            self._untrack_sockets(client, ws)
+            stats.close()
+            self._connection_slots.release()
+
+    def _track_sockets(self, *sockets):
+        with self._open_sockets_lock:
+            self._open_sockets.update(sockets)
 
-    def _listen_to_web_socket(self, client, ws_socket, index):
+    def _untrack_sockets(self, *sockets):
+        with self._open_sockets_lock:
+            self._open_sockets.difference_update(sockets)
+
+    def _listen_to_web_socket(self, client, ws_socket, index, stats=None):
         try:
             while True:
                 logger.info('Waiting for websocket data, connection status: %s, index: %s', ws_socket.connected, index)
@@ -183,6 +227,8 @@ class TunnelServer:
                     response = data
                     logger.info('Sending to debugger, response: %s, index: %s', response, index)
                     client.sendall(response)
+                    if stats:
+                        stats.on_received(len(response))
                     logger.info('Done sending to debugger, index: %s', index)
                 else:
                     break
@@ -190,10 +236,10 @@ class TunnelServer:
             logger.info(ex)
         finally:
             logger.info('Client disconnected!, index: %s', index)
-            client.close()
+            self._close_client(client)
             ws_socket.close()
 
-    def _listen_to_client(self, client, ws_socket, index):
+    def _listen_to_client(self, client, ws_socket, index, stats=None):
         try:
             while True:
                 logger.info('Waiting for debugger data, index: %s', index)
@@ -204,6 +250,8 @@ class TunnelServer:
                     responseData = buf[0:nbytes]
                     logger.info('Sending to websocket, response data: %s, index: %s', responseData, index)
                     ws_socket.send_binary(responseData)
+                    if stats:
+                        stats.on_sent(nbytes)
                     logger.info('Done sending to websocket, index: %s', index)
                 else:
                     break
@@ -212,11 +260,86 @@ class TunnelServer:
             logger.warning("Connection Timed Out")
         finally:
             logger.info('Client disconnected %s', index)
-            client.close()
+            self._close_client(client)
             ws_socket.close()
 
+    def _close_client(self, client):
+        try:
+            # unlike close(), wakes up the other thread of the connection if it is blocked in recv
+            client.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        client.close()
+
     def start_server(self):
         self._listen()
 
     def get_port(self):
         return self.local_port
+
+    def stop_server(self):
+        try:
+            # wakes up the accept() of the listening thread
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+        # wakes up the threads of the connections still being served, blocked in recv for up to an hour; they
+        # close the sockets on their way out
+        with self._open_sockets_lock:
+            open_sockets = list(self._open_sockets)
+        for open_socket in open_sockets:
+            try:
+                if isinstance(open_socket, WebSocket):
+                    open_socket.abort()
+                else:
+                    open_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class TunnelConnectionStats:
+    """Byte and latency counters of a tunnel connection, logged with --verbose when it closes.
+
+    The round trip is the time from data sent to the websocket to the next data received from it, which for
+    request/response protocols like SSH is the latency the client sees.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.started = time.time()
+        self.connect_time = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        # only what close() reports, so a long lived connection doesn't keep every round trip
+        self.round_trips = 0
+        self.round_trip_total = 0.0
+        self.round_trip_max = 0.0
+        self._last_sent = None
+        self._lock = Lock()
+
+    def on_sent(self, nbytes):
+        with self._lock:
+            self.bytes_sent += nbytes
+            if self._last_sent is None:
+                self._last_sent = time.time()
+
+    def on_received(self, nbytes):
+        with self._lock:
+            self.bytes_received += nbytes
+            if self._last_sent is not None:
+                round_trip = time.time() - self._last_sent
+                self.round_trips += 1
+                self.round_trip_total += round_trip
+                self.round_trip_max = max(self.round_trip_max, round_trip)
+                self._last_sent = None
+
+    def close(self):
+        if self.round_trips:
+            round_trip = 'mean round trip {:.0f} ms, max {:.0f} ms'.format(
+                self.round_trip_total * 1000 / self.round_trips, self.round_trip_max * 1000)
+        else:
+            round_trip = 'no round trips'
+        logger.info('Connection %s closed after %.1f seconds: %d bytes sent, %d bytes received, websocket connected '
+                    'in %s, %s', self.index, time.time() - self.started, self.bytes_sent, self.bytes_received,
+                    '-' if self.connect_time is None else '{:.0f} ms'.format(self.connect_time * 1000), round_trip)
@@ -0,0 +1,230 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import math
+import os
+import re
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+SEARCH_INDEX_FILE = 'findIndex.json'
+SEARCH_INDEX_VERSION = 1
+MAX_RESULTS = 5
+
+# Weight of a term found in each field of a command
+COMMAND_WEIGHT = 8
+SUMMARY_WEIGHT = 3
+PARAMETER_WEIGHT = 2
+TEXT_WEIGHT = 1
+
+STOP_WORDS = {'a', 'an', 'and', 'az', 'by', 'do', 'for', 'how', 'i', 'in', 'is', 'it', 'my', 'of', 'on', 'or',
+              'the', 'to', 'use', 'with'}
+
+
+def tokenize(text):
+    """ Split text into normalized search terms: lower case words without stop words and plural 's'. """
+    terms = []
+    for word in re.findall(r'[a-z0-9]+', (text or '').lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class SearchIndex(object):
+    """An inverted index of the installed commands for `az find`.
+
+    The index is kept per source, the command module or extension that provides the commands, together with a
+    signature of the source. Only the sources whose signature changed are indexed again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.sources = {}
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == SEARCH_INDEX_VERSION:
+                self.sources = data['sources']
+        except (OSError, IOError, ValueError, KeyError):
+            self.sources = {}
+
+    def save(self):
+        try:
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': SEARCH_INDEX_VERSION, 'sources': self.sources}, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save the find index: %s", ex)
+
+    def get_signature(self, source):
+        return self.sources.get(source, {}).get('signature')
+
+    def update_source(self, source, signature, documents):
+        """ Index the documents of a source. A document is a dict with the command, summary, parameter names,
+        other help text and examples of a command, where examples are [title, snippet] pairs. """
+        postings = {}
+        for doc_id, doc in enumerate(documents):
+            weights = {}
+            fields = [(doc['command'], COMMAND_WEIGHT), (doc['summary'], SUMMARY_WEIGHT),
+                      (' '.join(doc['parameters']), PARAMETER_WEIGHT), (doc['text'], TEXT_WEIGHT)]
+            fields.extend((' '.join(example), TEXT_WEIGHT) for example in doc['examples'])
+            for text, weight in fields:
+                for term in set(tokenize(text)):
+                    weights[term] = weights.get(term, 0) + weight
+            for term, weight in weights.items():
+                postings.setdefault(term, []).append([doc_id, weight])
+        self.sources[source] = {
+            'signature': signature,
+            'documents': [[doc['command'], doc['summary'], doc['examples']] for doc in documents],
+            'postings': postings
+        }
+
+    def remove_source(self, source):
+        self.sources.pop(source, None)
+
+    def search(self, query, max_results=MAX_RESULTS):
+        """ Return the (command, summary, examples) of the commands matching the query, best match first. """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        doc_count = sum(len(source['documents']) for source in self.sources.values())
+        matches = {}
+        for term in terms:
+            postings = [(source, doc_id, weight) for source in self.sources.values()
+                        for doc_id, weight in source['postings'].get(term, [])]
+            if not postings:
+                continue
+            idf = math.log(1 + doc_count / len(postings))
+            for source, doc_id, weight in postings:
+                match = matches.setdefault((id(source), doc_id), [source['documents'][doc_id], 0.0, 0])
+                match[1] += weight * idf
+                match[2] += 1
+
+        phrase = ' '.join(terms)
+        results = []
+        for doc, score, matched in matches.values():
+            # prefer the commands that match every term of the query
+            score *= (matched / len(terms)) ** 2
+            if ' '.join(tokenize(doc[0])) == phrase:
+                score *= 2
+            results.append((-score, len(doc[0].split()), doc[0], doc))
+        results.sort(key=lambda r: r[:3])
+        return [r[3] for r in results[:max_results]]
+
+
+def _is_example_supported(example, profile):
+    supported = example.get('supported-profiles')
+    unsupported = example.get('unsupported-profiles')
+    if supported:
+        return profile in [p.strip() for p in supported.split(',')]
+    if unsupported:
+        return profile not in [p.strip() for p in unsupported.split(',')]
+    return True
+
+
+def _get_help_documents(command_names, profile):
+    import yaml
+    from knack.help_files import helps
+
+    documents = []
+    for command in sorted(command_names):
+        doc = {'command': command, 'summary': '', 'parameters': set(), 'text': '', 'examples': []}
+        try:
+            data = yaml.safe_load(helps[command]) if command in helps else None
+        except yaml.YAMLError as ex:
+            logger.debug("Failed to parse the help of '%s': %s", command, ex)
+            data = None
+        if isinstance(data, dict):
+            doc['summary'] = (data.get('short-summary') or '').strip()
+            text = [data.get('long-summary') or '']
+            for param in data.get('parameters') or []:
+                doc['parameters'].update((param.get('name') or '').split())
+                text.append(param.get('short-summary') or '')
+            for example in data.get('examples') or []:
+                if example.get('text') and _is_example_supported(example, profile):
+                    doc['examples'].append([(example.get('name') or '').strip(), example['text'].strip()])
+                    # the parameters used by the examples
+                    doc['parameters'].update(re.findall(r'--[a-z0-9-]+', example['text']))
+            doc['text'] = ' '.join(text)
+        doc['parameters'] = sorted(doc['parameters'])
+        documents.append(doc)
+    return documents
+
+
+def _get_source_signatures(cli_ctx, sources):
+    """ Return {source: signature}. Commands modules change with the CLI version, extensions with their own. """
+    from azure.cli.core import __version__
+    from azure.cli.core.extension import get_extensions, get_extension_modname
+
+    extension_versions = {}
+    for ext in get_extensions():
+        try:
+            extension_versions[get_extension_modname(ext.name, ext.path)] = ext.version
+        except Exception:  # pylint: disable=broad-except
+            pass
+    return {source: '{}/{}'.format(extension_versions.get(source, __version__), cli_ctx.cloud.profile)
+            for source in sources}
+
+
+def _get_indexed_sources(cli_ctx):  # pylint: disable=protected-access
+    """ Return the sources of the commands as recorded by the command index, or None if the index is outdated. """
+    from azure.cli.core import CommandIndex
+    command_index = CommandIndex(cli_ctx)
+    if command_index.INDEX[CommandIndex._COMMAND_INDEX_VERSION] != command_index.version or \
+            command_index.INDEX[CommandIndex._COMMAND_INDEX_CLOUD_PROFILE] != command_index.cloud_profile:
+        return None
+    return {source for sources in command_index.INDEX[CommandIndex._COMMAND_INDEX].values() for source in sources}
+
+
+def _load_command_table(cli_ctx):
+    from azure.cli.core import MainCommandsLoader
+    return MainCommandsLoader(cli_ctx).load_command_table([])
+
+
+def get_search_index(cli_ctx):
+    """ Load the search index of the installed commands and index the sources that changed since it was saved.
+
+    The command table is only loaded when the command index is outdated or a source changed, like after the CLI
+    or an extension was installed, updated or removed.
+    """
+    search_index = SearchIndex(os.path.join(cli_ctx.config.config_dir, SEARCH_INDEX_FILE))
+    search_index.load()
+
+    command_table = None
+    sources = _get_indexed_sources(cli_ctx)
+    if not sources:
+        command_table = _load_command_table(cli_ctx)
+        sources = {command.loader.__module__ for command in command_table.values()}
+    signatures = _get_source_signatures(cli_ctx, sources)
+    stale_sources = {s for s in sources if search_index.get_signature(s) != signatures[s]}
+    removed_sources = set(search_index.sources) - sources
+    if not stale_sources and not removed_sources:
+        return search_index
+
+    if stale_sources:
+        logger.debug("Indexing the commands of %s", ', '.join(sorted(stale_sources)))
+        if command_table is None:
+            command_table = _load_command_table(cli_ctx)
+        source_commands = {source: [] for source in stale_sources}
+        for name, command in command_table.items():
+            source = command.loader.__module__
+            if source in source_commands:
+                source_commands[source].append(name)
+        for source, command_names in source_commands.items():
+            search_index.update_source(source, signatures[source],
+                                       _get_help_documents(command_names, cli_ctx.cloud.profile))
+    for source in removed_sources:
+        search_index.remove_source(source)
+    search_index.save()
+    return search_index
@@ -26,45 +26,79 @@ WAIT_MESSAGE = ['Finding examples...']
 
 EXTENSION_NAME = 'find'
 
+# seconds to wait for the online examples
+ALADDIN_TIMEOUT = 5
+
 
 Example = namedtuple("Example", "title snippet")
 
 
-def process_query(cli_term):
+def process_query(cmd, cli_term):
     if not cli_term:
         logger.error('Please provide a search term e.g. az find "vm"')
     else:
         print(random.choice(WAIT_MESSAGE), file=sys.stderr)
-        response = call_aladdin_service(cli_term)
-
-        if response.status_code != 200:
-            logger.error('Unexpected Error: If it persists, please file a bug.')
+        examples = get_local_examples(cmd.cli_ctx, cli_term)
+        has_pruned_answer = False
+        # the online service adds examples from the usage patterns of Azure CLI users
+        if cmd.cli_ctx.config.getboolean('find', 'use_online_service', fallback=True):
+            online_examples, has_pruned_answer = get_online_examples(cli_term)
+            snippets = {example.snippet for example in examples}
+            examples.extend(example for example in online_examples if example.snippet not in snippets)
+
+        if (platform.system() == 'Windows' and should_enable_styling()):
+            colorama.init(convert=True)
+        if not examples:
+            print("\nSorry I am not able to help with [" + cli_term + "]."
+                  "\nTry typing the beginning of a command e.g. " + style_message('az vm') + ".", file=sys.stderr)
         else:
-            if (platform.system() == 'Windows' and should_enable_styling()):
-                colorama.init(convert=True)
-            has_pruned_answer = False
-            answer_list = json.loads(response.content)
-            if not answer_list:
-                print("\nSorry I am not able to help with [" + cli_term + "]."
-                      "\nTry typing the beginning of a command e.g. " + style_message('az vm') + ".", file=sys.stderr)
-            else:
-                if answer_list[0]['source'] == 'pruned':
-                    has_pruned_answer = True
-                    answer_list.pop(0)
-                print("\nHere are the most common ways to use [" + cli_term + "]: \n", file=sys.stderr)
-
-                for answer in answer_list:
-                    cleaned_answer = clean_from_http_answer(answer)
-                    print(style_message(cleaned_answer.title))
-                    print(cleaned_answer.snippet + '\n')
-                if has_pruned_answer:
-                    print(style_message("More commands and examples are available in the latest version of the CLI. "
-                                        "Please update for the best experience.\n"))
+            print("\nHere are the most common ways to use [" + cli_term + "]: \n", file=sys.stderr)
+
+            for example in examples:
+                print(style_message(example.title))
+                print(example.snippet + '\n')
+            if has_pruned_answer:
+                print(style_message("More commands and examples are available in the latest version of the CLI. "
+                                    "Please update for the best experience.\n"))
     from azure.cli.core.util import show_updates_available
     show_updates_available(new_line_after=True)
     print(SURVEY_PROMPT)
 
 
+def get_local_examples(cli_ctx, cli_term):
+    """ Search the help of the installed commands, without network access. """
+    from azure.cli.command_modules.find._search_index import get_search_index, tokenize
+    terms = set(tokenize(cli_term))
+    examples = []
+    for command, summary, command_examples in get_search_index(cli_ctx).search(cli_term):
+        # the example of the command that matches the query best
+        best = max(command_examples, key=lambda e: len(terms.intersection(tokenize(' '.join(e)))), default=None)
+        if best:
+            examples.append(Example(best[0] or summary, best[1]))
+        else:
+            examples.append(Example(summary or command, 'az ' + command))
+    return examples
+
+
+def get_online_examples(cli_term):
+    """ Return the examples of the online service and whether newer examples were pruned from the answer. """
+    try:
+        response = call_aladdin_service(cli_term)
+    except requests.RequestException as ex:
+        logger.debug('The online examples are not available: %s', ex)
+        return [], False
+    if response.status_code != 200:
+        logger.debug('Unexpected status code from the online service: %s', response.status_code)
+        return [], False
+
+    has_pruned_answer = False
+    answer_list = json.loads(response.content)
+    if answer_list and answer_list[0]['source'] == 'pruned':
+        has_pruned_answer = True
+        answer_list.pop(0)
+    return [clean_from_http_answer(answer) for answer in answer_list], has_pruned_answer
+
+
 def get_generated_examples(cli_term):
     examples = []
     response = call_aladdin_service(cli_term)
@@ -128,7 +162,8 @@ def call_aladdin_service(query):
             'clientType': 'AzureCli',
             'context': json.dumps(context)
         },
-        headers=headers)
+        headers=headers,
+        timeout=ALADDIN_TIMEOUT)
 
     return response
 
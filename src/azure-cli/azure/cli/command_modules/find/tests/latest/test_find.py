@@ -4,12 +4,56 @@
 # --------------------------------------------------------------------------------------------
 
 import json
+import os
+import shutil
+import tempfile
 import unittest
 import mock
 import requests
 
-from azure.cli.command_modules.find.custom import (Example, call_aladdin_service,
+from azure.cli.core.mock import DummyCli
+from azure.cli.command_modules.find.custom import (Example, call_aladdin_service, get_local_examples,
                                                    get_generated_examples, clean_from_http_answer)
+from azure.cli.command_modules.find._search_index import SearchIndex, get_search_index, SEARCH_INDEX_FILE
+
+VM_HELP = {
+    'vm create': """
+        type: command
+        short-summary: Create an Azure Virtual Machine.
+        parameters:
+          - name: --admin-username
+            short-summary: Username for the VM.
+        examples:
+          - name: Create a default Ubuntu VM with automatic SSH authentication.
+            text: az vm create -n MyVm -g MyResourceGroup --image UbuntuLTS
+          - name: Create a VM with a managed identity.
+            text: az vm create -n MyVm -g MyResourceGroup --image centos --assign-identity
+    """,
+    'vm list': """
+        type: command
+        short-summary: List details of Virtual Machines.
+        examples:
+          - name: List all VMs.
+            text: az vm list
+    """,
+    'vm disk attach': """
+        type: command
+        short-summary: Attach a managed persistent disk to a VM.
+    """,
+}
+STORAGE_HELP = {
+    'storage account create': """
+        type: command
+        short-summary: Create a storage account.
+        examples:
+          - name: Create a storage account MyStorageAccount in resource group MyResourceGroup.
+            text: az storage account create -n MyStorageAccount -g MyResourceGroup --sku Standard_LRS
+    """,
+    'storage account list': """
+        type: command
+        short-summary: List storage accounts.
+    """,
+}
 
 
 def create_valid_http_response():
@@ -78,5 +122,84 @@ class FindCustomCommandTest(unittest.TestCase):
             self.assertEqual(0, len(examples))
 
 
+def _get_command_table(helps):
+    command_table = {}
+    for source, commands in helps.items():
+        loader = type('TestCommandsLoader', (), {'__module__': source})()
+        for name in commands:
+            command_table[name] = mock.MagicMock(loader=loader)
+    return command_table
+
+
+class FindLocalSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.cli_ctx = DummyCli()
+        self.cli_ctx.config.config_dir = self.config_dir
+        self.source_helps = {'azure.cli.command_modules.vm': VM_HELP, 'azure.cli.command_modules.storage': STORAGE_HELP}
+        patches = [
+            mock.patch.dict('knack.help_files.helps', dict(VM_HELP, **STORAGE_HELP)),
+            mock.patch('azure.cli.command_modules.find._search_index._get_indexed_sources', return_value=None),
+            mock.patch('azure.cli.command_modules.find._search_index._load_command_table',
+                       side_effect=lambda _: _get_command_table(self.source_helps))
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir)
+
+    def _search(self, query):
+        return [command for command, _, _ in get_search_index(self.cli_ctx).search(query)]
+
+    def test_search_ranking(self):
+        self.assertEqual(self._search('create vm')[0], 'vm create')
+        self.assertEqual(self._search('az vm list')[0], 'vm list')
+        self.assertEqual(self._search('how to list virtual machines')[0], 'vm list')
+        self.assertEqual(self._search('storage accounts')[:2], ['storage account create', 'storage account list'])
+        self.assertEqual(self._search('attach disk'), ['vm disk attach'])
+        self.assertEqual(self._search('admin-username'), ['vm create'])
+        self.assertEqual(self._search('cosmosdb'), [])
+
+    def test_get_local_examples(self):
+        examples = get_local_examples(self.cli_ctx, 'vm managed identity')
+        self.assertEqual(examples[0], Example('Create a VM with a managed identity.',
+                                              'az vm create -n MyVm -g MyResourceGroup --image centos '
+                                              '--assign-identity'))
+        # commands without examples show the command itself
+        examples = get_local_examples(self.cli_ctx, 'attach disk')
+        self.assertEqual(examples, [Example('Attach a managed persistent disk to a VM.', 'az vm disk attach')])
+
+    def test_search_index_rebuilds_changed_sources(self):
+        get_search_index(self.cli_ctx)
+        self.assertTrue(os.path.isfile(os.path.join(self.config_dir, SEARCH_INDEX_FILE)))
+
+        with mock.patch.object(SearchIndex, 'update_source', autospec=True) as update_source:
+            get_search_index(self.cli_ctx)
+            update_source.assert_not_called()
+
+            # an extension adds commands to a new source, only that source is indexed
+            self.source_helps['azext_vm_repair'] = {'vm disk attach': ''}
+            del self.source_helps['azure.cli.command_modules.storage']
+            search_index = get_search_index(self.cli_ctx)
+            self.assertEqual([c[0][1] for c in update_source.call_args_list], ['azext_vm_repair'])
+            self.assertNotIn('azure.cli.command_modules.storage', search_index.sources)
+
+    def test_process_query_offline(self):
+        from azure.cli.command_modules.find.custom import process_query
+        cmd = mock.MagicMock(cli_ctx=self.cli_ctx)
+        printed = []
+        with mock.patch.dict(os.environ, {'AZURE_FIND_USE_ONLINE_SERVICE': 'false'}), \
+                mock.patch('requests.get') as requests_get, \
+                mock.patch('azure.cli.command_modules.find.custom.print', create=True,
+                           side_effect=lambda *args, **kwargs: printed.append(args[0])), \
+                mock.patch('azure.cli.core.util.show_updates_available'):
+            process_query(cmd, 'create vm')
+        requests_get.assert_not_called()
+        self.assertIn('az vm create -n MyVm -g MyResourceGroup --image UbuntuLTS\n', printed)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -22,6 +22,25 @@ type: command
 short-summary: Begin a full backup of the HSM.
 """
 
+helps['keyvault backup-objects'] = """
+type: command
+short-summary: Back up the keys, secrets and certificates of a Key Vault into a local folder.
+long-summary: >
+    Every object is backed up into its own file, and recorded with the checksum of the file and the time the object
+    was last updated in the manifest.jsonl of the folder. The backups run concurrently. When run again with the same
+    folder, only the objects that are new or were updated, deleted or recreated since their backup are backed up, so
+    that an interrupted backup resumes where it stopped. The objects backed up earlier stay in the folder. The keys
+    and secrets of certificates are backed up with the certificates. With --include-deleted, a deleted object is
+    recovered to be backed up and deleted again right after. This resets its deletion date and scheduled purge date,
+    and the object is live in the vault in the meantime. An object left recovered by an interrupted backup is deleted
+    again by the next run.
+examples:
+  - name: Back up all the keys, secrets and certificates of a Key Vault.
+    text: az keyvault backup-objects --vault-name MyKeyVault --folder ./MyKeyVault
+  - name: Back up the secrets of a Key Vault, including the deleted ones that can be recovered.
+    text: az keyvault backup-objects --vault-name MyKeyVault --folder ./MyKeyVault --types secret --include-deleted
+"""
+
 helps['keyvault restore'] = """
 type: group
 short-summary: Manage full HSM restore.
@@ -32,6 +51,20 @@ type: command
 short-summary: Restore a full backup of a HSM.
 """
 
+helps['keyvault restore-objects'] = """
+type: command
+short-summary: Restore into a Key Vault the objects backed up with 'az keyvault backup-objects'.
+long-summary: >
+    The backup files are checked against the checksums of the manifest before being restored, and the restores run
+    concurrently. The objects restored are recorded in the manifest, so that an interrupted restore, or one that had
+    failures, resumes where it stopped. Once a restore into a vault completes without failures, the next restore
+    into it restores every object again. The objects that already exist in the vault are skipped. The objects that
+    were deleted when backed up are deleted again once restored.
+examples:
+  - name: Restore a backup into another Key Vault of the same subscription and geography.
+    text: az keyvault restore-objects --vault-name MyOtherKeyVault --folder ./MyKeyVault
+"""
+
 helps['keyvault certificate'] = """
 type: group
 short-summary: Manage certificates.
@@ -515,6 +515,22 @@ def load_arguments(self, _):
 
     # endregion
 
+    # region vault objects backup/restore
+    for item in ['backup-objects', 'restore-objects']:
+        with self.argument_context('keyvault {}'.format(item)) as c:
+            c.argument('vault_base_url', vault_name_type, type=get_vault_base_url_type(self.cli_ctx), id_part=None)
+            c.argument('folder', help='Local folder of the backup files and their manifest.')
+            c.argument('object_types', options_list=['--types'], nargs='+',
+                       arg_type=get_enum_type(['key', 'secret', 'certificate']),
+                       help='Space-separated types of the objects. Default to all of them.')
+            c.argument('concurrency', type=int, help='The maximum number of concurrent vault requests.')
+
+    with self.argument_context('keyvault backup-objects') as c:
+        c.argument('include_deleted', action='store_true',
+                   help='Also back up the deleted objects that can be recovered. They are recovered to be backed up '
+                        'and deleted again.')
+    # endregion
+
     # region KeyVault Storage Account
     with self.argument_context('keyvault storage', arg_group='Id') as c:
         c.argument('storage_account_name', options_list=['--name', '-n'],
@@ -290,6 +290,10 @@ def load_command_table(self, _):
             g.keyvault_custom('restore', 'restore_certificate',
                               doc_string_source=data_entity.operations_docs_tmpl.format('restore_certificate'))
 
+        with self.command_group('keyvault', data_entity.command_type, is_preview=True) as g:
+            g.keyvault_custom('backup-objects', 'backup_vault_objects')
+            g.keyvault_custom('restore-objects', 'restore_vault_objects')
+
     if data_api_version != '2016_10_01':
         with self.command_group('keyvault storage', data_entity.command_type) as g:
             g.keyvault_command('add', 'set_storage_account')
@@ -12,6 +12,7 @@ import os
 import re
 import struct
 import sys
+import threading
 import time
 import uuid
 
@@ -2054,6 +2055,324 @@ def full_restore(cmd, client, token, folder_to_restore, storage_resource_uri=Non
 # endregion
 
 
+# region vault objects backup/restore
+VAULT_BACKUP_MANIFEST = 'manifest.jsonl'
+VAULT_BACKUP_MANIFEST_VERSION = 1
+VAULT_BACKUP_OBJECT_TYPES = ['key', 'secret', 'certificate']
+DEFAULT_VAULT_BACKUP_CONCURRENCY = 8
+# a recovered or deleted object takes a while to be available, checked every RECOVER_POLL_INTERVAL seconds
+RECOVER_POLL_INTERVAL = 2
+RECOVER_POLL_RETRIES = 30
+
+
+class VaultBackupManifest(object):
+    """The manifest of a folder of vault object backups, one JSON record per line.
+
+    The first record is the vault that was backed up. A record is appended for every object backed up, with the file
+    and the checksum of its backup and the time the object was last updated, so that a backup run again skips the
+    objects that did not change since. A record is appended for every object restored into a vault, so that an
+    interrupted restore resumes with the objects that are not restored yet, and a restore completed without failures
+    is recorded so that the next restore into the vault starts over. A deleted object is recorded as recovering
+    while it is recovered to be backed up, until it is deleted again.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, VAULT_BACKUP_MANIFEST)
+        self.vault = None
+        self.objects = {}
+        # {(vault, object type, name): checksum of the backup restored}
+        self.restored = {}
+        self.recovering = set()
+        self._lock = threading.Lock()
+
+    def load(self):
+        """ Read the manifest. Return False if the folder has none. """
+        if not os.path.isfile(self.path):
+            return False
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        end = content.rfind(b'\n') + 1
+        if end < len(content):
+            # drop the record that was being written when the previous run was interrupted
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+        try:
+            for line in content[:end].decode('utf-8').splitlines():
+                self._add(json.loads(line))
+        except (ValueError, KeyError):
+            raise CLIError("The backup manifest '{}' is corrupted.".format(self.path))
+        if self.vault is None:
+            raise CLIError("The backup manifest '{}' is corrupted.".format(self.path))
+        return True
+
+    def create(self, vault_base_url):
+        if not os.path.isdir(self.folder):
+            os.makedirs(self.folder)
+        self.append({'version': VAULT_BACKUP_MANIFEST_VERSION, 'vault': vault_base_url})
+
+    def append(self, record):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            self._add(record)
+
+    def _add(self, record):
+        if 'version' in record:
+            if record['version'] != VAULT_BACKUP_MANIFEST_VERSION:
+                raise CLIError("The backup manifest '{}' has an unsupported version {}."
+                               .format(self.path, record['version']))
+            self.vault = record['vault']
+        elif 'restored' in record:
+            self.restored[(_normalize_vault_base_url(record['restored']), record['type'], record['name'])] = \
+                record.get('sha256')
+        elif 'restoreCompleted' in record:
+            vault = _normalize_vault_base_url(record['restoreCompleted'])
+            self.restored = {k: v for k, v in self.restored.items() if k[0] != vault}
+        elif 'recovering' in record:
+            if record['recovering']:
+                self.recovering.add((record['type'], record['name']))
+            else:
+                self.recovering.discard((record['type'], record['name']))
+        else:
+            self.objects[(record['type'], record['name'])] = record
+
+    def get_file_path(self, record):
+        return os.path.join(self.folder, *record['file'].split('/'))
+
+    def is_backed_up(self, object_type, name, deleted, updated):
+        """ Whether the object is recorded, in the same state and last updated at the same time, and its backup file
+        still matches the recorded checksum. """
+        record = self.objects.get((object_type, name))
+        if not record or updated is None or record.get('updated') != updated or record['deleted'] != deleted:
+            return False
+        try:
+            with open(self.get_file_path(record), 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest() == record['sha256']
+        except (OSError, IOError):
+            return False
+
+
+def _normalize_vault_base_url(vault_base_url):
+    return vault_base_url.rstrip('/').lower()
+
+
+def _get_vault_object_name(item):
+    return (getattr(item, 'kid', None) or item.id).split('/')[4]
+
+
+def _get_vault_object_updated(item):
+    updated = getattr(getattr(item, 'attributes', None), 'updated', None)
+    return updated.isoformat() if hasattr(updated, 'isoformat') else updated
+
+
+def _get_vault_error_message(ex):
+    try:
+        return ex.inner_exception.error.message
+    except AttributeError:
+        return str(ex)
+
+
+def _is_vault_object_found(client, vault_base_url, object_type, name, error_type, deleted=False):
+    try:
+        if deleted:
+            getattr(client, 'get_deleted_' + object_type)(vault_base_url, name)
+        else:
+            getattr(client, 'get_' + object_type)(vault_base_url, name, '')
+        return True
+    except error_type as ex:
+        if getattr(ex.response, 'status_code', None) != 404:
+            raise
+        return False
+
+
+def _wait_for_vault_object(client, vault_base_url, object_type, name, error_type, deleted=False):
+    """ Wait until a recovered object is available, or a deleted one is listed as deleted. """
+    for _ in range(RECOVER_POLL_RETRIES):
+        if _is_vault_object_found(client, vault_base_url, object_type, name, error_type, deleted):
+            return
+        time.sleep(RECOVER_POLL_INTERVAL)
+    raise CLIError("The {} '{}' was not {} in time.".format(object_type, name, 'deleted' if deleted else 'recovered'))
+
+
+def _delete_recovered_vault_object(client, manifest, vault_base_url, object_type, name, error_type, wait=True):
+    """ Delete an object recovered to be backed up, once it is available, and clear its recovering record. """
+    if wait:
+        _wait_for_vault_object(client, vault_base_url, object_type, name, error_type)
+    getattr(client, 'delete_' + object_type)(vault_base_url, name)
+    manifest.append({'type': object_type, 'name': name, 'recovering': False})
+
+
+def _delete_vault_objects_left_recovered(client, manifest, vault_base_url, error_type):
+    """ Delete again the objects an interrupted backup recovered, before the objects of the vault are listed. """
+    for object_type, name in sorted(manifest.recovering):
+        if _is_vault_object_found(client, vault_base_url, object_type, name, error_type, deleted=True):
+            # the object was not recovered, or was deleted again
+            manifest.append({'type': object_type, 'name': name, 'recovering': False})
+            continue
+        logger.warning("Deleting the %s '%s' again, it was recovered by an interrupted backup.", object_type, name)
+        _delete_recovered_vault_object(client, manifest, vault_base_url, object_type, name, error_type)
+        _wait_for_vault_object(client, vault_base_url, object_type, name, error_type, deleted=True)
+
+
+def _run_vault_object_operations(executor, operation, objects, manifest, action, error_types):
+    """ Run `operation` for every (object type, name, ...) in `objects` and append the record it returns to the
+    manifest as soon as it completes. Return the objects that failed. """
+    from concurrent.futures import as_completed
+
+    futures = {executor.submit(operation, obj): obj for obj in objects}
+    failed = []
+    try:
+        for future in as_completed(futures):
+            try:
+                manifest.append(future.result())
+            except error_types as ex:
+                object_type, name = futures[future][:2]
+                message = _get_vault_error_message(ex)
+                logger.warning("Failed to %s %s '%s': %s", action, object_type, name, message)
+                failed.append({'type': object_type, 'name': name, 'error': message})
+    except KeyboardInterrupt:
+        # the operations that completed are in the manifest, the next run resumes from there
+        for future in futures:
+            future.cancel()
+        raise
+    if failed:
+        logger.warning("%d of %d object(s) could not be processed.", len(failed), len(objects))
+    return failed
+
+
+def backup_vault_objects(cmd, client, vault_base_url, folder, object_types=None, include_deleted=False,
+                         concurrency=DEFAULT_VAULT_BACKUP_CONCURRENCY):
+    from concurrent.futures import ThreadPoolExecutor
+    from msrest.exceptions import ClientRequestError
+
+    KeyVaultErrorException = cmd.get_models('KeyVaultErrorException', resource_type=ResourceType.DATA_KEYVAULT)
+    if concurrency < 1:
+        raise InvalidArgumentValueError('--concurrency must be at least 1.')
+    object_types = object_types or VAULT_BACKUP_OBJECT_TYPES
+
+    manifest = VaultBackupManifest(folder)
+    if not manifest.load():
+        manifest.create(vault_base_url)
+    elif _normalize_vault_base_url(manifest.vault) != _normalize_vault_base_url(vault_base_url):
+        raise InvalidArgumentValueError("The folder '{}' holds a backup of '{}'. Use another folder."
+                                        .format(folder, manifest.vault))
+    for object_type in object_types:
+        directory = os.path.join(folder, object_type + 's')
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+    _delete_vault_objects_left_recovered(client, manifest, vault_base_url, KeyVaultErrorException)
+
+    def _list(kind):
+        object_type, deleted = kind
+        list_method = getattr(client, ('get_deleted_{}s' if deleted else 'get_{}s').format(object_type))
+        try:
+            # the keys and secrets managed by certificates are backed up with the certificates
+            return [(object_type, _get_vault_object_name(item), deleted, _get_vault_object_updated(item))
+                    for item in list_method(vault_base_url) if not getattr(item, 'managed', None)], None
+        except (KeyVaultErrorException, ClientRequestError) as ex:
+            # e.g. the deleted objects of a vault without soft-delete
+            message = _get_vault_error_message(ex)
+            logger.warning("Failed to list the %s%ss: %s", 'deleted ' if deleted else '', object_type, message)
+            return [], {'type': object_type, 'deleted': deleted, 'error': message}
+
+    def _backup(obj):
+        object_type, name, deleted, updated = obj
+        if not deleted:
+            backup = getattr(client, 'backup_' + object_type)(vault_base_url, name).value
+        else:
+            # deleted objects can only be backed up once recovered. They are deleted again whatever happens, and the
+            # recovering record has the next run delete them should this one be interrupted in between.
+            manifest.append({'type': object_type, 'name': name, 'recovering': True})
+            getattr(client, 'recover_deleted_' + object_type)(vault_base_url, name)
+            available = False
+            try:
+                _wait_for_vault_object(client, vault_base_url, object_type, name, KeyVaultErrorException)
+                available = True
+                backup = getattr(client, 'backup_' + object_type)(vault_base_url, name).value
+            finally:
+                _delete_recovered_vault_object(client, manifest, vault_base_url, object_type, name,
+                                               KeyVaultErrorException, wait=not available)
+        record = {'type': object_type, 'name': name, 'deleted': deleted, 'updated': updated,
+                  'file': '{}s/{}.blob'.format(object_type, name),
+                  'size': len(backup), 'sha256': hashlib.sha256(backup).hexdigest()}
+        file_path = manifest.get_file_path(record)
+        with open(file_path + '.tmp', 'wb') as f:
+            f.write(backup)
+        os.replace(file_path + '.tmp', file_path)
+        return record
+
+    kinds = [(object_type, deleted) for object_type in object_types
+             for deleted in ([False, True] if include_deleted else [False])]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        listings = list(executor.map(_list, kinds))
+        objects = [obj for objs, _ in listings for obj in objs]
+        pending = [obj for obj in objects if not manifest.is_backed_up(*obj)]
+        failed = _run_vault_object_operations(executor, _backup, pending, manifest, 'back up',
+                                              (KeyVaultErrorException, ClientRequestError, CLIError, OSError))
+    return {
+        'manifest': manifest.path,
+        'backedUp': len(pending) - len(failed),
+        'skipped': len(objects) - len(pending),
+        'failed': [error for _, error in listings if error] + failed
+    }
+
+
+def restore_vault_objects(cmd, client, vault_base_url, folder, object_types=None,
+                          concurrency=DEFAULT_VAULT_BACKUP_CONCURRENCY):
+    from concurrent.futures import ThreadPoolExecutor
+    from msrest.exceptions import ClientRequestError
+
+    KeyVaultErrorException = cmd.get_models('KeyVaultErrorException', resource_type=ResourceType.DATA_KEYVAULT)
+    if concurrency < 1:
+        raise InvalidArgumentValueError('--concurrency must be at least 1.')
+    object_types = object_types or VAULT_BACKUP_OBJECT_TYPES
+
+    manifest = VaultBackupManifest(folder)
+    if not manifest.load():
+        raise InvalidArgumentValueError("No backup manifest found in '{}'.".format(folder))
+    vault = _normalize_vault_base_url(vault_base_url)
+    objects = [(object_type, name, record) for (object_type, name), record in manifest.objects.items()
+               if object_type in object_types]
+    # the objects backed up again since they were restored are restored again
+    pending = [obj for obj in objects if manifest.restored.get((vault, obj[0], obj[1]), '') != obj[2]['sha256']]
+    existing = []
+
+    def _restore(obj):
+        object_type, name, record = obj
+        with open(manifest.get_file_path(record), 'rb') as f:
+            backup = f.read()
+        if hashlib.sha256(backup).hexdigest() != record['sha256']:
+            raise CLIError("The checksum of '{}' does not match the manifest.".format(record['file']))
+        try:
+            getattr(client, 'restore_' + object_type)(vault_base_url, backup)
+        except KeyVaultErrorException as ex:
+            if getattr(ex.response, 'status_code', None) != 409:
+                raise
+            # the object is already in the vault, e.g. restored by an earlier restore
+            logger.info("The %s '%s' already exists and is not restored: %s", object_type, name,
+                        _get_vault_error_message(ex))
+            existing.append(obj)
+        else:
+            if record.get('deleted'):
+                getattr(client, 'delete_' + object_type)(vault_base_url, name)
+        return {'restored': vault_base_url, 'type': object_type, 'name': name, 'sha256': record['sha256']}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        failed = _run_vault_object_operations(executor, _restore, pending, manifest, 'restore',
+                                              (KeyVaultErrorException, ClientRequestError, CLIError, OSError))
+    if not failed:
+        # the next restore into the vault restores every object again, like after the vault was purged
+        manifest.append({'restoreCompleted': vault_base_url})
+    return {
+        'manifest': manifest.path,
+        'restored': len(pending) - len(failed) - len(existing),
+        'skipped': len(objects) - len(pending) + len(existing),
+        'failed': failed
+    }
+# endregion
+
+
 # region security domain
 def security_domain_init_recovery(client, hsm_name, sd_exchange_key,
                                   identifier=None):  # pylint: disable=unused-argument
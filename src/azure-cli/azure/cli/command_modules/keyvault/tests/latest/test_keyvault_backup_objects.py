@@ -0,0 +1,354 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+import mock
+
+from azure.cli.core.azclierror import InvalidArgumentValueError
+from azure.cli.command_modules.keyvault import custom
+from azure.cli.command_modules.keyvault.custom import (backup_vault_objects, restore_vault_objects,
+                                                       VAULT_BACKUP_MANIFEST)
+
+
+class FakeVaultError(Exception):
+
+    def __init__(self, status_code, message):
+        super(FakeVaultError, self).__init__(message)
+        self.response = SimpleNamespace(status_code=status_code)
+
+
+class FakeVaultClient(object):
+    """ An in-memory vault with the operations of the data plane client used by the backup and restore. """
+
+    def __init__(self, vault_base_url):
+        self.vault_base_url = vault_base_url
+        self.objects = {'key': {}, 'secret': {}, 'certificate': {}}
+        self.deleted = {'key': {}, 'secret': {}, 'certificate': {}}
+        # the last update time of the objects, 0 when not set
+        self.updated = {}
+        self.calls = []
+        self.failing = set()
+        self.failing_deletes = set()
+        self.recovering = set()
+        self.soft_delete = True
+        self.active = self.max_active = 0
+        self.lock = threading.Lock()
+
+    def add(self, object_type, name, managed=False, deleted=False):
+        (self.deleted if deleted else self.objects)[object_type][name] = managed
+        self.update(object_type, name)
+
+    def update(self, object_type, name):
+        self.updated[(object_type, name)] = self.updated.get((object_type, name), 0) + 1
+
+    def __getattr__(self, method):
+        for operation in ['get_deleted', 'recover_deleted', 'backup', 'restore', 'delete', 'get']:
+            if method.startswith(operation + '_'):
+                object_type = method[len(operation) + 1:]
+                if object_type.endswith('s'):
+                    operation, object_type = 'list_deleted' if operation == 'get_deleted' else 'list', object_type[:-1]
+                return lambda vault_base_url, *args: self._call(operation, object_type, vault_base_url, *args)
+        raise AttributeError(method)
+
+    def _call(self, operation, object_type, vault_base_url, name=None, *_):
+        assert vault_base_url == self.vault_base_url
+        with self.lock:
+            self.calls.append((operation, object_type, name))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.01)
+            with self.lock:
+                return getattr(self, '_' + operation)(object_type, name)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def _item(self, object_type, name, managed):
+        url = '{}/{}s/{}'.format(self.vault_base_url, object_type, name)
+        attributes = SimpleNamespace(updated=datetime.datetime.fromtimestamp(
+            1600000000 + self.updated.get((object_type, name), 0), datetime.timezone.utc))
+        if object_type == 'key':
+            return SimpleNamespace(kid=url, managed=managed, attributes=attributes)
+        return SimpleNamespace(id=url, managed=managed, attributes=attributes)
+
+    def _list(self, object_type, _):
+        return [self._item(object_type, name, managed) for name, managed in self.objects[object_type].items()]
+
+    def _list_deleted(self, object_type, _):
+        if not self.soft_delete:
+            raise FakeVaultError(400, 'Soft delete is not enabled')
+        return [self._item(object_type, name, managed) for name, managed in self.deleted[object_type].items()]
+
+    def _recover_deleted(self, object_type, name):
+        self.objects[object_type][name] = self.deleted[object_type].pop(name)
+        self.recovering.add((object_type, name))
+
+    def _get(self, object_type, name):
+        if (object_type, name) in self.recovering:
+            # not available right after the recovery
+            self.recovering.remove((object_type, name))
+            raise FakeVaultError(404, 'Not found')
+        if name not in self.objects[object_type]:
+            raise FakeVaultError(404, 'Not found')
+        return self._item(object_type, name, False)
+
+    def _get_deleted(self, object_type, name):
+        if name not in self.deleted[object_type]:
+            raise FakeVaultError(404, 'Not found')
+        return self._item(object_type, name, False)
+
+    def _delete(self, object_type, name):
+        if name in self.failing_deletes:
+            self.failing_deletes.remove(name)
+            raise FakeVaultError(500, 'Delete of {} failed'.format(name))
+        self.deleted[object_type][name] = self.objects[object_type].pop(name)
+
+    def _backup(self, object_type, name):
+        if name in self.failing:
+            raise FakeVaultError(500, 'Backup of {} failed'.format(name))
+        # the backup of each version differs
+        version = self.updated.get((object_type, name), 0)
+        return SimpleNamespace(value='{}/{}/{}'.format(object_type, name, version).encode())
+
+    def _restore(self, object_type, data):
+        restored_type, name = data.decode().split('/')[:2]
+        assert restored_type == object_type
+        if name in self.failing:
+            raise FakeVaultError(500, 'Restore of {} failed'.format(name))
+        if name in self.objects[object_type]:
+            raise FakeVaultError(409, 'Conflict')
+        self.objects[object_type][name] = False
+        return self._item(object_type, name, False)
+
+
+class VaultObjectsBackupTests(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = os.path.join(tempfile.mkdtemp(), 'backup')
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.folder))
+        self.cmd = mock.MagicMock()
+        self.cmd.get_models.return_value = FakeVaultError
+        self.source = FakeVaultClient('https://source.vault.azure.net')
+        for i in range(10):
+            self.source.add('key', 'key{}'.format(i))
+            self.source.add('secret', 'secret{}'.format(i))
+        # the key and the secret of a certificate are backed up with the certificate
+        self.source.add('certificate', 'cert')
+        self.source.add('key', 'cert', managed=True)
+        self.source.add('secret', 'cert', managed=True)
+        self.source.add('secret', 'old', deleted=True)
+        patcher = mock.patch.object(custom, 'RECOVER_POLL_INTERVAL', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _backup(self, client=None, **kwargs):
+        client = client or self.source
+        return backup_vault_objects(self.cmd, client, client.vault_base_url, self.folder, **kwargs)
+
+    def _restore(self, client, **kwargs):
+        return restore_vault_objects(self.cmd, client, client.vault_base_url, self.folder, **kwargs)
+
+    def _read_manifest(self):
+        with open(os.path.join(self.folder, VAULT_BACKUP_MANIFEST)) as f:
+            return [json.loads(line) for line in f]
+
+    def _backed_up(self):
+        return sorted(call[2] for call in self.source.calls if call[0] == 'backup')
+
+    def test_backup_vault_objects(self):
+        result = self._backup(concurrency=4)
+        self.assertEqual(result['backedUp'], 21)
+        self.assertEqual((result['skipped'], result['failed']), (0, []))
+        self.assertTrue(1 < self.source.max_active <= 4)
+
+        manifest = self._read_manifest()
+        self.assertEqual(manifest[0], {'version': 1, 'vault': 'https://source.vault.azure.net'})
+        records = {(r['type'], r['name']): r for r in manifest[1:]}
+        self.assertEqual(len(records), 21)
+        self.assertNotIn(('key', 'cert'), records)
+        self.assertNotIn(('secret', 'old'), records)
+        record = records[('certificate', 'cert')]
+        self.assertEqual(record['file'], 'certificates/cert.blob')
+        with open(os.path.join(self.folder, 'certificates', 'cert.blob'), 'rb') as f:
+            content = f.read()
+        self.assertEqual(content, b'certificate/cert/1')
+        self.assertEqual((record['size'], record['sha256']), (len(content), hashlib.sha256(content).hexdigest()))
+
+        # only the deleted secret is backed up, it is recovered and deleted again
+        self.source.calls = []
+        result = self._backup(object_types=['secret'], include_deleted=True)
+        self.assertEqual((result['backedUp'], result['skipped']), (1, 10))
+        self.assertEqual([c for c in self.source.calls if c[2] == 'old'],
+                         [('recover_deleted', 'secret', 'old'), ('get', 'secret', 'old'), ('get', 'secret', 'old'),
+                          ('backup', 'secret', 'old'), ('delete', 'secret', 'old')])
+        self.assertIn('old', self.source.deleted['secret'])
+        self.assertTrue(self._read_manifest()[-1]['deleted'])
+
+        other = FakeVaultClient('https://other.vault.azure.net')
+        with self.assertRaisesRegex(InvalidArgumentValueError, 'holds a backup of'):
+            self._backup(other)
+
+    def test_backup_vault_objects_resumes(self):
+        self.source.failing = {'key3', 'secret5'}
+        result = self._backup()
+        self.assertEqual(result['backedUp'], 19)
+        self.assertEqual(sorted(f['name'] for f in result['failed']), ['key3', 'secret5'])
+
+        # a changed backup file and a record interrupted while being written
+        with open(os.path.join(self.folder, 'keys', 'key1.blob'), 'wb') as f:
+            f.write(b'changed')
+        with open(os.path.join(self.folder, VAULT_BACKUP_MANIFEST), 'a') as f:
+            f.write('{"type":"key","name":"ke')
+
+        self.source.failing = set()
+        self.source.calls = []
+        result = self._backup()
+        self.assertEqual((result['backedUp'], result['skipped'], result['failed']), (3, 18, []))
+        self.assertEqual(self._backed_up(), ['key1', 'key3', 'secret5'])
+        self.assertEqual(len(self._read_manifest()), 1 + 19 + 3)
+
+        self.source.calls = []
+        self.assertEqual(self._backup()['backedUp'], 0)
+        self.assertEqual(self._backed_up(), [])
+
+    def test_backup_vault_objects_changed_since(self):
+        self._backup(include_deleted=True)
+        records = {(r['type'], r['name']): r for r in self._read_manifest()[1:]}
+        self.assertEqual(records[('key', 'key1')]['updated'], '2020-09-13T12:26:41+00:00')
+
+        # a new version, an object deleted and one recreated since the backup
+        self.source.update('key', 'key1')
+        self.source.deleted['secret']['secret2'] = self.source.objects['secret'].pop('secret2')
+        self.source.deleted['secret'].pop('old')
+        self.source.add('secret', 'old')
+        self.source.calls = []
+        result = self._backup(include_deleted=True)
+        self.assertEqual((result['backedUp'], result['skipped'], result['failed']), (3, 19, []))
+        self.assertEqual(self._backed_up(), ['key1', 'old', 'secret2'])
+        records = {(r['type'], r['name']): r for r in self._read_manifest()[1:] if 'file' in r}
+        self.assertEqual((records[('secret', 'old')]['deleted'], records[('secret', 'secret2')]['deleted']),
+                         (False, True))
+
+        self.source.calls = []
+        self.assertEqual(self._backup(include_deleted=True)['backedUp'], 0)
+
+    def test_backup_vault_objects_deletes_recovered_objects(self):
+        # the backup of a recovered object fails, it is deleted again all the same
+        self.source.failing = {'old'}
+        result = self._backup(object_types=['secret'], include_deleted=True)
+        self.assertEqual([f['name'] for f in result['failed']], ['old'])
+        self.assertIn('old', self.source.deleted['secret'])
+
+        # the delete fails after the backup, like a run interrupted between the two
+        self.source.failing = set()
+        self.source.failing_deletes = {'old'}
+        result = self._backup(object_types=['secret'], include_deleted=True)
+        self.assertEqual([f['name'] for f in result['failed']], ['old'])
+        self.assertIn('old', self.source.objects['secret'])
+        self.assertEqual(self._read_manifest()[-1], {'type': 'secret', 'name': 'old', 'recovering': True})
+
+        # the next run deletes the object again before listing the objects, and backs it up as deleted
+        self.source.calls = []
+        with mock.patch.object(custom.logger, 'warning') as warning_mock:
+            result = self._backup(object_types=['secret'])
+        self.assertEqual((result['backedUp'], result['skipped'], result['failed']), (0, 10, []))
+        self.assertIn('interrupted backup', warning_mock.call_args[0][0])
+        self.assertEqual(self.source.calls[:4], [('get_deleted', 'secret', 'old'), ('get', 'secret', 'old'),
+                                                 ('delete', 'secret', 'old'), ('get_deleted', 'secret', 'old')])
+        self.assertNotIn('old', self.source.objects['secret'])
+        result = self._backup(object_types=['secret'], include_deleted=True)
+        self.assertEqual((result['backedUp'], result['failed']), (1, []))
+        self.assertIn('old', self.source.deleted['secret'])
+        records = [r for r in self._read_manifest() if r.get('name') == 'old']
+        self.assertEqual(records[-1]['deleted'], True)
+        self.assertFalse([r for r in records if r.get('deleted') is False])
+
+    def test_backup_vault_objects_without_soft_delete(self):
+        self.source.soft_delete = False
+        result = self._backup(include_deleted=True)
+        self.assertEqual(result['backedUp'], 21)
+        self.assertEqual(result['failed'], [
+            {'type': t, 'deleted': True, 'error': 'Soft delete is not enabled'}
+            for t in ['key', 'secret', 'certificate']])
+
+    def test_restore_vault_objects(self):
+        self._backup(include_deleted=True)
+        target = FakeVaultClient('https://target.vault.azure.net')
+        target.failing = {'secret2'}
+        result = self._restore(target, concurrency=3)
+        self.assertEqual(result['restored'], 21)
+        self.assertEqual([f['name'] for f in result['failed']], ['secret2'])
+        self.assertTrue(1 < target.max_active <= 3)
+        # the secret deleted in the source is deleted in the target
+        self.assertEqual(list(target.deleted['secret']), ['old'])
+
+        target.failing = set()
+        target.calls = []
+        result = self._restore(target)
+        self.assertEqual((result['restored'], result['skipped'], result['failed']), (1, 21, []))
+        self.assertEqual(target.calls, [('restore', 'secret', b'secret/secret2/1')])
+        self.assertEqual(sorted(target.objects['key']), ['key{}'.format(i) for i in range(10)])
+        self.assertEqual(sorted(target.objects['secret']), ['secret{}'.format(i) for i in range(10)])
+        self.assertEqual(list(target.objects['certificate']), ['cert'])
+
+        # a corrupted backup file is not restored
+        with open(os.path.join(self.folder, 'keys', 'key1.blob'), 'wb') as f:
+            f.write(b'key/key2/1')
+        other = FakeVaultClient('https://other.vault.azure.net')
+        result = self._restore(other, object_types=['key'])
+        self.assertEqual(result['restored'], 9)
+        self.assertEqual(result['failed'][0]['name'], 'key1')
+        self.assertIn('checksum', result['failed'][0]['error'])
+
+        self.folder = os.path.join(self.folder, 'missing')
+        with self.assertRaisesRegex(InvalidArgumentValueError, 'No backup manifest'):
+            self._restore(other)
+
+    def test_restore_vault_objects_again(self):
+        self._backup()
+        target = FakeVaultClient('https://target.vault.azure.net')
+        result = self._restore(target, object_types=['key'])
+        self.assertEqual((result['restored'], result['skipped'], result['failed']), (10, 0, []))
+        self.assertEqual(self._read_manifest()[-1], {'restoreCompleted': 'https://target.vault.azure.net'})
+
+        # a completed restore starts over, the objects already in the vault are skipped
+        target.calls = []
+        result = self._restore(target, object_types=['key'])
+        self.assertEqual((result['restored'], result['skipped'], result['failed']), (0, 10, []))
+        self.assertEqual(len(target.calls), 10)
+
+        # the restore after the vault was purged restores everything again
+        target.objects['key'].clear()
+        result = self._restore(target, object_types=['key'])
+        self.assertEqual((result['restored'], result['skipped'], result['failed']), (10, 0, []))
+        self.assertEqual(sorted(target.objects['key']), ['key{}'.format(i) for i in range(10)])
+
+        # an object backed up again since it was restored is restored again
+        target.failing = {'key4'}
+        target.objects['key'].pop('key4')
+        self.assertEqual(len(self._restore(target, object_types=['key'])['failed']), 1)
+        self.source.update('key', 'key2')
+        self._backup(object_types=['key'])
+        target.objects['key'].pop('key2')
+        target.failing = set()
+        target.calls = []
+        result = self._restore(target, object_types=['key'])
+        self.assertEqual((result['restored'], result['skipped'], result['failed']), (2, 8, []))
+        self.assertEqual(sorted(c[2] for c in target.calls), [b'key/key2/2', b'key/key4/1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -90,12 +90,7 @@ def get_period_type(as_timedelta=False):
 class MetricAlertConditionAction(argparse._AppendAction):
 
     def __call__(self, parser, namespace, values, option_string=None):
-        # antlr4 is not available everywhere, restrict the import scope so that commands
-        # that do not need it don't fail when it is absent
-        import antlr4
-
-        from azure.cli.command_modules.monitor.grammar.metric_alert import (
-            MetricAlertConditionLexer, MetricAlertConditionParser, MetricAlertConditionValidator)
+        from azure.cli.command_modules.monitor.grammar import parse_metric_alert_condition
 
         usage = 'usage error: --condition {avg,min,max,total,count} [NAMESPACE.]METRIC {=,!=,>,>=,<,<=} THRESHOLD\n' \
                 '                         [where DIMENSION {includes,excludes} VALUE [or VALUE ...]\n' \
@@ -103,16 +98,8 @@ class MetricAlertConditionAction(argparse._AppendAction):
 
         string_val = ' '.join(values)
 
-        lexer = MetricAlertConditionLexer(antlr4.InputStream(string_val))
-        stream = antlr4.CommonTokenStream(lexer)
-        parser = MetricAlertConditionParser(stream)
-        tree = parser.expression()
-
         try:
-            validator = MetricAlertConditionValidator()
-            walker = antlr4.ParseTreeWalker()
-            walker.walk(validator, tree)
-            metric_condition = validator.result()
+            metric_condition = parse_metric_alert_condition(string_val)
             for item in ['time_aggregation', 'metric_name', 'threshold', 'operator']:
                 if not getattr(metric_condition, item, None):
                     raise CLIError(usage)
@@ -234,12 +221,7 @@ class AutoscaleRemoveAction(argparse._AppendAction):
 
 class AutoscaleConditionAction(argparse.Action):  # pylint: disable=protected-access
     def __call__(self, parser, namespace, values, option_string=None):
-        # antlr4 is not available everywhere, restrict the import scope so that commands
-        # that do not need it don't fail when it is absent
-        import antlr4
-
-        from azure.cli.command_modules.monitor.grammar.autoscale import (
-            AutoscaleConditionLexer, AutoscaleConditionParser, AutoscaleConditionValidator)
+        from azure.cli.command_modules.monitor.grammar import parse_autoscale_condition
 
         # pylint: disable=line-too-long
         usage = 'usage error: --condition ["NAMESPACE"] METRIC {==,!=,>,>=,<,<=} THRESHOLD {avg,min,max,total,count} PERIOD\n' \
@@ -248,16 +230,8 @@ class AutoscaleConditionAction(argparse.Action):  # pylint: disable=protected-ac
 
         string_val = ' '.join(values)
 
-        lexer = AutoscaleConditionLexer(antlr4.InputStream(string_val))
-        stream = antlr4.CommonTokenStream(lexer)
-        parser = AutoscaleConditionParser(stream)
-        tree = parser.expression()
-
         try:
-            validator = AutoscaleConditionValidator()
-            walker = antlr4.ParseTreeWalker()
-            walker.walk(validator, tree)
-            autoscale_condition = validator.result()
+            autoscale_condition = parse_autoscale_condition(string_val)
             for item in ['time_aggregation', 'metric_name', 'threshold', 'operator', 'time_window']:
                 if not getattr(autoscale_condition, item, None):
                     raise CLIError(usage)
@@ -2,3 +2,50 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+
+import copy
+from functools import lru_cache
+
+# Scripts creating many rules tend to repeat the same few conditions
+CONDITION_CACHE_SIZE = 512
+
+
+def parse_metric_alert_condition(text):
+    """ Return the MetricCriteria of a --condition of `az monitor metrics alert`.
+
+    Parsed conditions are memoized by their text, the caller gets its own copy. Raises AttributeError, TypeError or
+    KeyError when the condition is not valid.
+    """
+    return copy.deepcopy(_parse_metric_alert_condition(text))
+
+
+def parse_autoscale_condition(text):
+    """ Return the MetricTrigger of a --condition of `az monitor autoscale rule`, see parse_metric_alert_condition. """
+    return copy.deepcopy(_parse_autoscale_condition(text))
+
+
+@lru_cache(maxsize=CONDITION_CACHE_SIZE)
+def _parse_metric_alert_condition(text):
+    from .metric_alert import MetricAlertConditionLexer, MetricAlertConditionParser, MetricAlertConditionValidator
+    return _parse(text, MetricAlertConditionLexer, MetricAlertConditionParser, MetricAlertConditionValidator())
+
+
+@lru_cache(maxsize=CONDITION_CACHE_SIZE)
+def _parse_autoscale_condition(text):
+    from .autoscale import AutoscaleConditionLexer, AutoscaleConditionParser, AutoscaleConditionValidator
+    return _parse(text, AutoscaleConditionLexer, AutoscaleConditionParser, AutoscaleConditionValidator())
+
+
+def _parse(text, lexer_type, parser_type, validator):
+    # antlr4 is not available everywhere, restrict the import scope so that commands
+    # that do not need it don't fail when it is absent
+    import antlr4
+
+    lexer = lexer_type(antlr4.InputStream(text))
+    stream = antlr4.CommonTokenStream(lexer)
+    parser = parser_type(stream)
+    tree = parser.expression()
+
+    walker = antlr4.ParseTreeWalker()
+    walker.walk(validator, tree)
+    return validator.result()
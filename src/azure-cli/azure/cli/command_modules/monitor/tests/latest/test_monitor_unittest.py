@@ -157,6 +157,22 @@ class MonitorMetricAlertActionTest(unittest.TestCase):
         self.check_condition(ns, 'Average', None, 'SuccessE2ELatenc,|y', 'GreaterThan', '250')
         self.check_dimension(ns, 0, 'ApiName', 'Include', ['Get|,%_Blob', 'PutB,_lob'])
 
+    def test_monitor_metric_alert_condition_action_memoized(self):
+        from azure.cli.command_modules.monitor import grammar
+
+        with mock.patch.object(grammar, '_parse', wraps=grammar._parse) as parse_mock:
+            first, second = self._build_namespace(), self._build_namespace()
+            self.call_condition(first, 'avg Memoized Percent > 90 where ApiName includes GetBlob')
+            self.call_condition(second, 'avg Memoized Percent > 90 where ApiName includes GetBlob')
+            self.assertEqual(parse_mock.call_count, 1)
+
+        # every argument gets its own copy of the condition, they are changed when the alert is created
+        first.condition[0].name = 'cond1'
+        first.condition[0].dimensions[0].values.append('PutBlob')
+        self.check_condition(second, 'Average', None, 'Memoized Percent', 'GreaterThan', '90')
+        self.assertEqual(second.condition[0].name, '')
+        self.check_dimension(second, 0, 'ApiName', 'Include', ['GetBlob'])
+
 
 class MonitorAutoscaleActionTest(unittest.TestCase):
 
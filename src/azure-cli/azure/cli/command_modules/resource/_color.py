@@ -7,7 +7,7 @@ from enum import Enum
 from collections import deque
 
 
-class Color(Enum):
+class Color(str, Enum):
     ORANGE = "\033[38;5;208m"
     GREEN = "\033[38;5;77m"
     PURPLE = "\033[38;5;141m"
@@ -32,7 +32,7 @@ class ColoredStringBuilder:
         if color:
             self._push_color(color)
 
-        self._contents.append(str(value))
+        self._contents.append(value if isinstance(value, str) else str(value))
 
         if color:
             self._pop_color()
@@ -52,14 +52,14 @@ class ColoredStringBuilder:
             return
 
         self._colors.append(color)
-        self._contents.append(str(color))
+        self._contents.append(color)
 
     def _pop_color(self):
         if not self._enable_color:
             return
 
         self._colors.pop()
-        self._contents.append(str(self._colors[-1] if self._colors else Color.RESET))
+        self._contents.append(self._colors[-1] if self._colors else Color.RESET)
 
     # pylint: disable=protected-access
     class ColorScope:
@@ -72,3 +72,25 @@ class ColoredStringBuilder:
 
         def __exit__(self, *args):
             self._colored_string_builder._pop_color()
+
+
+class ColoredStreamWriter(ColoredStringBuilder):
+    """A ColoredStringBuilder that writes its contents to a stream line by line, in chunks, instead of holding
+    the whole output in memory."""
+
+    def __init__(self, stream, enable_color=True, chunk_size=4096):
+        super().__init__(enable_color)
+        self._stream = stream
+        self._chunk_size = chunk_size
+
+    def append_line(self, value="", color=None):
+        super().append_line(value, color)
+
+        if len(self._contents) >= self._chunk_size:
+            self.flush()
+
+        return self
+
+    def flush(self):
+        self._stream.write("".join(self._contents))
+        self._contents = []
@@ -8,7 +8,7 @@ from itertools import groupby
 from azure.mgmt.resource.resources.models import ChangeType, PropertyChangeType
 
 from ._symbol import Symbol
-from ._color import Color, ColoredStringBuilder
+from ._color import Color, ColoredStringBuilder, ColoredStreamWriter
 from ._utils import split_resource_id
 
 _change_type_to_color = {
@@ -62,11 +62,22 @@ _property_change_type_to_weight = {
 
 def format_what_if_operation_result(what_if_operation_result, enable_color=True):
     builder = ColoredStringBuilder(enable_color)
+    _format_what_if_operation_result(builder, what_if_operation_result)
+    return builder.build()
+
+
+def write_what_if_operation_result(what_if_operation_result, stream, enable_color=True):
+    """Write the formatted result to the stream as it is formatted, without building the whole output first."""
+    writer = ColoredStreamWriter(stream, enable_color)
+    _format_what_if_operation_result(writer, what_if_operation_result)
+    writer.flush()
+
+
+def _format_what_if_operation_result(builder, what_if_operation_result):
     _format_noise_notice(builder)
     _format_change_type_legend(builder, what_if_operation_result.changes)
     _format_resource_changes(builder, what_if_operation_result.changes)
     _format_resource_changes_stats(builder, what_if_operation_result.changes)
-    return builder.build()
 
 
 def _format_noise_notice(builder):
@@ -169,10 +180,12 @@ def _format_resource_changes_in_scope(builder, scope, resource_changes_in_scope)
         key=lambda x: (_change_type_to_weight[x.change_type], _get_relative_resource_id(x)),
     )
 
+    last_resource_change = sorted_resource_changes[-1]
+
     for change_type, resource_changes in groupby(sorted_resource_changes, lambda x: x.change_type):
         with builder.new_color_scope(_change_type_to_color[change_type]):
             for resource_change in resource_changes:
-                is_last = resource_change == sorted_resource_changes[-1]
+                is_last = resource_change is last_resource_change
                 _format_resource_change(builder, resource_change, is_last)
 
 
@@ -315,7 +328,7 @@ def _format_property_modify(builder, before, after, children, indent_level):
         # Space before =>
         if _is_non_empty_object(before):
             builder.append_line()
-            _format_indent(indent_level)
+            _format_indent(builder, indent_level)
         else:
             builder.append(Symbol.WHITE_SPACE)
 
@@ -400,15 +413,18 @@ def format_json(value, enable_color=True):
     return builder.build()
 
 
-def _format_json(builder, value, path="", max_path_length=0, indent_level=0):
+def _format_json(builder, value, path="", max_path_length=0, indent_level=0, path_widths=None):
+    if path_widths is None:
+        path_widths = _get_path_widths(value)
+
     if _is_leaf(value):
         _format_json_path(builder, path, max_path_length - len(path) + 1, indent_level)
         _format_leaf(builder, value)
     elif _is_non_empty_array(value):
         _format_json_path(builder, path, 1, indent_level)
-        _format_non_empty_array(builder, value, indent_level)
+        _format_non_empty_array(builder, value, indent_level, path_widths)
     elif _is_non_empty_object(value):
-        _format_non_empty_object(builder, value, path, max_path_length, indent_level)
+        _format_non_empty_object(builder, value, path, max_path_length, indent_level, path_widths)
     else:
         raise ValueError(f"Invalid JSON value: {value}")
 
@@ -424,19 +440,19 @@ def _format_leaf(builder, value):
         builder.append(value)
 
 
-def _format_non_empty_array(builder, value, indent_level):
+def _format_non_empty_array(builder, value, indent_level, path_widths):
     builder.append(Symbol.LEFT_SQUARE_BRACKET, Color.RESET).append_line()
 
-    max_path_length = _get_max_path_length_from_array(value)
+    max_path_length = path_widths[id(value)]
 
     for index, child_value in enumerate(value):
         child_path = str(index)
 
         if _is_non_empty_object(child_value):
             _format_json_path(builder, child_path, 0, indent_level + 1)
-            _format_non_empty_object(builder, child_value, indent_level=indent_level + 1)
+            _format_non_empty_object(builder, child_value, indent_level=indent_level + 1, path_widths=path_widths)
         else:
-            _format_json(builder, child_value, child_path, max_path_length, indent_level + 1)
+            _format_json(builder, child_value, child_path, max_path_length, indent_level + 1, path_widths)
 
         builder.append_line()
 
@@ -444,18 +460,18 @@ def _format_non_empty_array(builder, value, indent_level):
     builder.append(Symbol.RIGHT_SQUARE_BRACKET, Color.RESET)
 
 
-def _format_non_empty_object(builder, value, path=None, max_path_length=0, indent_level=0):
+def _format_non_empty_object(builder, value, path=None, max_path_length=0, indent_level=0, path_widths=None):
     is_root = not path
 
     if not path:
         # root object.
         builder.append_line().append_line()
-        max_path_length = _get_max_path_length_from_object(value)
+        max_path_length = path_widths[id(value)]
         indent_level += 1
 
     for child_path, child_value in value.items():
         child_path = child_path if is_root else f"{path}{Symbol.DOT}{child_path}"
-        _format_json(builder, child_value, child_path, max_path_length, indent_level)
+        _format_json(builder, child_value, child_path, max_path_length, indent_level, path_widths)
 
         # if _is_non_empty_array(child_value) or _is_leaf(child_value):
         if not _is_non_empty_object(child_value):
@@ -491,51 +507,64 @@ def _format_indent(builder, indent_level=1):
     builder.append(str(Symbol.WHITE_SPACE) * 2 * indent_level)
 
 
-def _get_max_path_length_from_array(value):
-    maxLengthIndex = 0
+def _get_path_widths(value, path_widths=None):
+    """
+    Return {id(v): max path length} of value and every non-empty array and object nested in it, in one pass.
+    The max path length of an array is the length of its last leaf index, the one of an object is the length of
+    the longest path of its flattened leaves.
+    """
+    if path_widths is None:
+        path_widths = {}
 
-    for index, child_value in enumerate(value):
-        if _is_leaf(child_value):
-            maxLengthIndex = index
-
-    return len(str(maxLengthIndex))
-
-
-def _get_max_path_length_from_object(value):
-    max_path_length = 0
-
-    for key, child_value in value.items():
-        if _is_non_empty_array(child_value):
-            # Ignoring array paths to avoid long padding like this:
-            #
-            #   short.path:                   "foo"
-            #   another.short.path:           "bar"
-            #   very.very.long.path.to.array: [
-            #     ...
-            #   ]
-            #   path.after.array:             "foobar"
-            #
-            # The following is what we want:
-            #
-            #   short.path:         "foo"
-            #   another.short.path: "bar"
-            #   very.very.long.path.to.array: [
-            #     ...
-            #   ]
-            #   path.after.array:   "foobar"
-            #
-            continue
-
-        current_path_length = (
-            # Add one for dot.
-            len(key) + 1 + _get_max_path_length_from_object(child_value)
-            if _is_non_empty_object(child_value)
-            else len(key)
-        )
+    if _is_non_empty_array(value):
+        max_length_index = 0
+
+        for index, child_value in enumerate(value):
+            if _is_leaf(child_value):
+                max_length_index = index
+            else:
+                _get_path_widths(child_value, path_widths)
+
+        path_widths[id(value)] = len(str(max_length_index))
+
+    elif _is_non_empty_object(value):
+        max_path_length = 0
+
+        for key, child_value in value.items():
+            if _is_non_empty_array(child_value):
+                # Ignoring array paths to avoid long padding like this:
+                #
+                #   short.path:                   "foo"
+                #   another.short.path:           "bar"
+                #   very.very.long.path.to.array: [
+                #     ...
+                #   ]
+                #   path.after.array:             "foobar"
+                #
+                # The following is what we want:
+                #
+                #   short.path:         "foo"
+                #   another.short.path: "bar"
+                #   very.very.long.path.to.array: [
+                #     ...
+                #   ]
+                #   path.after.array:   "foobar"
+                #
+                _get_path_widths(child_value, path_widths)
+                continue
+
+            current_path_length = (
+                # Add one for dot.
+                len(key) + 1 + _get_path_widths(child_value, path_widths)[id(child_value)]
+                if _is_non_empty_object(child_value)
+                else len(key)
+            )
+
+            max_path_length = max(max_path_length, current_path_length)
 
-        max_path_length = max(max_path_length, current_path_length)
+        path_widths[id(value)] = max_path_length
 
-    return max_path_length
+    return path_widths
 
 
 def _is_leaf(value):
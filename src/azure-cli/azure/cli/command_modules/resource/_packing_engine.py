@@ -2,14 +2,24 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import hashlib
 import os
 import re
 import json
+import threading
+from knack.log import get_logger
 from knack.util import CLIError
 from azure.cli.core.util import read_file_content, shell_safe_json_parse
-from azure.cli.command_modules.resource.custom import _remove_comments_from_json
 from azure.cli.core.profiles import ResourceType, get_sdk
 
+logger = get_logger(__name__)
+
+PACK_MAX_CONCURRENCY = 8
+PACK_CACHE_DIR = 'templateSpecPackCache'
+# Bump when the processing of the templates changes, to ignore the entries cached by previous versions
+PACK_CACHE_VERSION = 1
+PACK_CACHE_MAX_ENTRIES = 500
+
 
 class PackagedTemplate():  # pylint: disable=too-few-public-methods
     def __init__(self, template, artifacts):
@@ -54,74 +64,181 @@ def pack(cmd, template_file):
     """
     root_template_file_path = os.path.abspath(template_file)
     context = PackingContext(os.path.dirname(root_template_file_path))
-    template_content = read_file_content(template_file)
-    template_json = json.loads(json.dumps(process_template(template_content)))
-    _pack_artifacts(cmd, root_template_file_path, context)
+    templates = _load_templates(cmd, root_template_file_path, context)
+    template_json = templates[_get_template_key(root_template_file_path)][1]
+    _pack_artifacts(cmd, root_template_file_path, context, templates)
     return PackagedTemplate(template_json, getattr(context, 'Artifact'))
 
 
-def _pack_artifacts(cmd, template_abs_file_path, context):
+def _get_template_key(abs_file_path):
+    return os.path.normcase(os.path.realpath(abs_file_path))
+
+
+def _load_templates(cmd, root_template_file_path, context):
+    """
+    Loads the root template and every template it links to, transitively. Each file is loaded once,
+    whatever the number of templates linking to it, and the files linked from the same level of the
+    graph are loaded concurrently.
+
+    :return: {template key: (absolute path, template, [absolute paths of the linked templates])}
     """
-    Recursively packs the specified template and its referenced artifacts and
+    from concurrent.futures import ThreadPoolExecutor
+
+    cache = _PackCache(cmd.cli_ctx)
+    templates = {}
+    pending = [root_template_file_path]
+    with ThreadPoolExecutor(max_workers=PACK_MAX_CONCURRENCY) as executor:
+        while pending:
+            entries = list(executor.map(lambda path: _load_template(cmd, path, cache), pending))
+            linked_paths = []
+            for path, entry in zip(pending, entries):
+                links = [_resolve_template_link(path, relative_path, context)
+                         for relative_path in entry['links'] if relative_path]
+                templates[_get_template_key(path)] = (path, entry['template'], links)
+                linked_paths.extend(links)
+            pending = []
+            for path in linked_paths:
+                key = _get_template_key(path)
+                if key not in templates:
+                    templates[key] = None
+                    pending.append(path)
+    cache.prune()
+    return templates
+
+
+def _load_template(cmd, template_abs_file_path, cache):
+    """
+    Returns {'template': <template json>, 'links': [<relativePath of the linked templates>]} of a template file,
+    from the pack cache when a file with the same content was packed before.
+    """
+    template_content = read_file_content(template_abs_file_path)
+    key = hashlib.sha256('{}\n{}'.format(PACK_CACHE_VERSION, template_content).encode('utf-8')).hexdigest()
+    entry = cache.get(key)
+    if entry is None:
+        template_json = json.loads(json.dumps(process_template(template_content, file_path=template_abs_file_path)))
+        template_link_to_artifact_objs = _get_template_links_to_artifacts(cmd, template_json, includeNested=True)
+        entry = {
+            'template': template_json,
+            'links': [str(template_link_obj['relativePath']) for template_link_obj in template_link_to_artifact_objs]
+        }
+        cache.put(key, entry)
+    return entry
+
+
+def _resolve_template_link(template_abs_file_path, relative_path, context):
+    # This is a templateLink to a local template... Get the absolute path of the
+    # template based on its relative path from the current template directory and
+    # make sure it exists:
+
+    abs_local_path = os.path.abspath(os.path.join(os.path.dirname(template_abs_file_path), relative_path))
+    if not os.path.isfile(abs_local_path):
+        raise CLIError('File ' + abs_local_path + 'not found.')
+
+    # Let's make sure we're not referencing a file outside of our root directory
+    # hierarchy. We won't allow such references for security purposes:
+
+    root_directory = getattr(context, 'RootTemplateDirectory')
+    if os.path.commonpath([root_directory]) != os.path.commonpath([root_directory, abs_local_path]):
+        raise CLIError('Unable to handle the reference to file ' + abs_local_path + 'from ' +
+                       template_abs_file_path + 'because it exists outside of the root template directory of ' +
+                       getattr(context, 'RootTemplateDirectory'))
+    return abs_local_path
+
+
+def _pack_artifacts(cmd, template_abs_file_path, context, templates, packed=None):
+    """
+    Recursively packs the templates referenced by the specified template and
      adds the artifacts to the current packing context.
 
     :param template_abs_file_path: The path to the template spec .json file to pack.
     :type template_abs_file_path : str
     :param context : The packing context of the current packing operation
     :type content : PackingContext
-    :param artifactableTemplateObj : The packagable template object
-    :type artifactableTemplateObj : JSON
+    :param templates : The templates loaded by _load_templates
+    :type templates : dict
+    :param packed : The keys of the templates already packed
+    :type packed : set
     """
+    TemplateSpecTemplateArtifact = get_sdk(cmd.cli_ctx, ResourceType.MGMT_RESOURCE_TEMPLATESPECS,
+                                           'TemplateSpecTemplateArtifact', mod='models')
+    if packed is None:
+        packed = {_get_template_key(template_abs_file_path)}
     original_directory = getattr(context, 'CurrentDirectory')
     try:
         context.CurrentDirectory = os.path.dirname(template_abs_file_path)
-        template_content = read_file_content(template_abs_file_path)
-        artifactable_template_obj = _remove_comments_from_json(template_content)
-        template_link_to_artifact_objs = _get_template_links_to_artifacts(cmd, artifactable_template_obj,
-                                                                          includeNested=True)
-
-        for template_link_obj in template_link_to_artifact_objs:
-            relative_path = str(template_link_obj['relativePath'])
-            if not relative_path:
-                continue
-            # This is a templateLink to a local template... Get the absolute path of the
-            # template based on its relative path from the current template directory and
-            # make sure it exists:
-
-            abs_local_path = os.path.join(getattr(context, 'CurrentDirectory'), relative_path)
-            if not os.path.isfile(abs_local_path):
-                raise CLIError('File ' + abs_local_path + 'not found.')
-
-            # Let's make sure we're not referencing a file outside of our root directory
-            # hierarchy. We won't allow such references for security purposes:
+        for abs_local_path in templates[_get_template_key(template_abs_file_path)][2]:
+            # If we haven't already processed that template into an artifact elsewhere,
+            # we'll do so here, after the templates it references...
 
-            if(not os.path.commonpath([getattr(context, 'RootTemplateDirectory')]) ==
-               os.path.commonpath([getattr(context, 'RootTemplateDirectory'), abs_local_path])):
-                raise CLIError('Unable to handle the reference to file ' + abs_local_path + 'from ' +
-                               template_abs_file_path + 'because it exists outside of the root template directory of ' +
-                               getattr(context, 'RootTemplateDirectory'))
-
-            # Convert the template relative path to one that is relative to our root
-            # directory path, and then if we haven't already processed that template into
-            # an artifact elsewhere, we'll do so here...
+            key = _get_template_key(abs_local_path)
+            if key in packed:
+                continue
+            packed.add(key)
+            _pack_artifacts(cmd, abs_local_path, context, templates, packed)
 
+            # Convert the template path to one that is relative to our root directory path
             as_relative_path = _absolute_to_relative_path(getattr(context, 'RootTemplateDirectory'), abs_local_path)
-            for prev_added_artifact in getattr(context, 'Artifact'):
-                prev_added_artifact = os.path.join(getattr(context, 'RootTemplateDirectory'),
-                                                   getattr(prev_added_artifact, 'path'))
-                if os.path.samefile(prev_added_artifact, abs_local_path):
-                    continue
-            _pack_artifacts(cmd, abs_local_path, context)
-            TemplateSpecTemplateArtifact = get_sdk(cmd.cli_ctx, ResourceType.MGMT_RESOURCE_TEMPLATESPECS,
-                                                   'TemplateSpecTemplateArtifact', mod='models')
-            template_content = read_file_content(abs_local_path)
-            template_json = json.loads(json.dumps(process_template(template_content)))
-            artifact = TemplateSpecTemplateArtifact(path=as_relative_path, template=template_json)
+            artifact = TemplateSpecTemplateArtifact(path=as_relative_path, template=templates[key][1])
             context.Artifact.append(artifact)
     finally:
         context.CurrentDirectory = original_directory
 
 
+class _PackCache():
+    """
+    The templates and links of the files packed before, keyed by the hash of the file content, in the
+    templateSpecPackCache folder of the config directory. Only the least recently used entries are kept.
+    Disable with `az config set resource.template_spec_pack_cache=false`.
+    """
+
+    def __init__(self, cli_ctx):
+        self.directory = None
+        self._added = False
+        if cli_ctx.config.getboolean('resource', 'template_spec_pack_cache', fallback=True):
+            self.directory = os.path.join(cli_ctx.config.config_dir, PACK_CACHE_DIR)
+
+    def get(self, key):
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, key + '.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+            return entry
+        except (OSError, IOError, ValueError):
+            return None
+
+    def put(self, key, entry):
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, key + '.json')
+        try:
+            from knack.util import ensure_dir
+            ensure_dir(self.directory)
+            tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            self._added = True
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save the template spec pack cache: %s", ex)
+
+    def prune(self):
+        if not self._added:
+            return
+        try:
+            paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                     if name.endswith('.json')]
+            if len(paths) <= PACK_CACHE_MAX_ENTRIES:
+                return
+            paths.sort(key=os.path.getmtime)
+            for path in paths[:len(paths) - PACK_CACHE_MAX_ENTRIES]:
+                os.remove(path)
+        except OSError as ex:
+            logger.debug("Failed to prune the template spec pack cache: %s", ex)
+
+
 def _get_deployment_resource_objects(cmd, template_obj, includeNested=False):
     immediate_deployment_resources = []
 
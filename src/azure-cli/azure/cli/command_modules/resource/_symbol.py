@@ -6,7 +6,7 @@
 from enum import Enum
 
 
-class Symbol(Enum):
+class Symbol(str, Enum):
     WHITE_SPACE = " "
     QUOTE = '"'
     COLON = ":"
@@ -15,6 +15,7 @@ import platform
 import re
 import ssl
 import sys
+import timeit
 import uuid
 import base64
 
@@ -44,10 +45,39 @@ from msrest.serialization import Serializer
 from msrest.pipeline import SansIOHTTPPolicy
 
 from ._validators import MSI_LOCAL_ID
-from ._formatters import format_what_if_operation_result
+from ._formatters import write_what_if_operation_result
 
 logger = get_logger(__name__)
 
+# The types of the resources that hold references to other resource types and have to be deleted first, e.g. a
+# virtual machine holds its network interfaces, which hold their virtual network and public IP addresses.
+DELETE_BEFORE_RESOURCE_TYPES = {
+    'microsoft.compute/virtualmachines': ('microsoft.network/networkinterfaces', 'microsoft.compute/disks',
+                                          'microsoft.compute/availabilitysets',
+                                          'microsoft.compute/proximityplacementgroups'),
+    'microsoft.compute/virtualmachinescalesets': ('microsoft.network/loadbalancers',
+                                                  'microsoft.network/virtualnetworks',
+                                                  'microsoft.network/networksecuritygroups',
+                                                  'microsoft.compute/proximityplacementgroups'),
+    'microsoft.compute/availabilitysets': ('microsoft.compute/proximityplacementgroups',),
+    'microsoft.network/networkinterfaces': ('microsoft.network/virtualnetworks', 'microsoft.network/publicipaddresses',
+                                            'microsoft.network/networksecuritygroups',
+                                            'microsoft.network/applicationsecuritygroups',
+                                            'microsoft.network/loadbalancers', 'microsoft.network/applicationgateways'),
+    'microsoft.network/privateendpoints': ('microsoft.network/virtualnetworks',),
+    'microsoft.network/loadbalancers': ('microsoft.network/publicipaddresses', 'microsoft.network/virtualnetworks'),
+    'microsoft.network/applicationgateways': ('microsoft.network/publicipaddresses',
+                                              'microsoft.network/virtualnetworks'),
+    'microsoft.network/virtualnetworkgateways': ('microsoft.network/publicipaddresses',
+                                                 'microsoft.network/virtualnetworks'),
+    'microsoft.network/bastionhosts': ('microsoft.network/publicipaddresses', 'microsoft.network/virtualnetworks'),
+    'microsoft.network/azurefirewalls': ('microsoft.network/publicipaddresses', 'microsoft.network/virtualnetworks'),
+    'microsoft.network/virtualnetworks': ('microsoft.network/networksecuritygroups', 'microsoft.network/routetables',
+                                          'microsoft.network/natgateways'),
+    'microsoft.network/natgateways': ('microsoft.network/publicipaddresses',),
+    'microsoft.web/sites': ('microsoft.web/serverfarms',),
+}
+
 
 def _build_resource_id(**kwargs):
     from msrestazure.tools import resource_id as resource_id_from_dict
@@ -825,7 +855,8 @@ def _what_if_deploy_arm_template_core(cli_ctx, what_if_poller, no_pretty_print,
                 from ._win_vt import enable_vt_mode
                 enable_vt_mode()
 
-        print(format_what_if_operation_result(what_if_result, cli_ctx.enable_color))
+        write_what_if_operation_result(what_if_result, sys.stdout, cli_ctx.enable_color)
+        print()
     finally:
         if cli_ctx.enable_color:
             from colorama import init
@@ -1602,7 +1633,8 @@ def delete_resource(cmd, resource_ids=None, resource_group_name=None,
     """
     Deletes the given resource(s).
     This function allows deletion of ids with dependencies on one another.
-    This is done with multiple passes through the given ids.
+    The resources are deleted in waves: the resources nothing else depends on first, concurrently, then the
+    resources they depended on. Deletions failing on a dependency that wasn't known are retried in a later wave.
     """
     parsed_ids = _get_parsed_resource_ids(resource_ids) or [_create_parsed_id(cmd.cli_ctx,
                                                                               resource_group_name,
@@ -1612,35 +1644,54 @@ def delete_resource(cmd, resource_ids=None, resource_group_name=None,
                                                                               resource_name)]
     to_be_deleted = [(_get_rsrc_util_from_parsed_id(cmd.cli_ctx, id_dict, api_version, latest_include_preview), id_dict)
                      for id_dict in parsed_ids]
+    depends_on = _plan_resource_deletion([id_dict.get('resource_id') or _build_resource_id(**id_dict)
+                                          for _, id_dict in to_be_deleted])
 
-    results = []
     from msrestazure.azure_exceptions import CloudError
-    while to_be_deleted:
-        logger.debug("Start new loop to delete resources.")
+
+    results = [None] * len(to_be_deleted)
+    remaining = list(range(len(to_be_deleted)))
+    ignore_plan = False
+    wave = 0
+    while remaining:
+        # delete the resources whose dependents are all deleted. When nothing could be deleted, try every remaining
+        # resource once, as the original order of the resources may work better than the plan.
+        ready = [i for i in remaining if ignore_plan or not depends_on[i].intersection(remaining)] or remaining
+        wave += 1
+        logger.debug("Start wave %d to delete %d resources.", wave, len(ready))
+        start_time = timeit.default_timer()
+        deleted = []
+
+        # start all the deletions of the wave before waiting for any, they run side by side
         operations = []
-        failed_to_delete = []
-        for rsrc_utils, id_dict in to_be_deleted:
+        for index in ready:
+            rsrc_utils, id_dict = to_be_deleted[index]
             try:
-                operations.append(rsrc_utils.delete())
+                operations.append((index, rsrc_utils.delete()))
                 resource = _build_resource_id(**id_dict) or resource_name
                 logger.debug("deleting %s", resource)
             except CloudError as e:
-                # request to delete failed, add parsed id dict back to queue
+                # request to delete failed, keep the parsed id dict for a later wave
                 id_dict['exception'] = str(e)
-                failed_to_delete.append((rsrc_utils, id_dict))
-        to_be_deleted = failed_to_delete
+        for index, operation in operations:
+            try:
+                results[index] = operation.result()
+                deleted.append(index)
+            except CloudError as e:
+                to_be_deleted[index][1]['exception'] = str(e)
+        logger.info("Wave %d deleted %d of %d resources in %.1f seconds.",
+                    wave, len(deleted), len(ready), timeit.default_timer() - start_time)
 
+        remaining = [i for i in remaining if i not in deleted]
         # stop deleting if none deletable
-        if not operations:
+        if not deleted and (ignore_plan or len(ready) == len(remaining)):
             break
+        ignore_plan = not deleted
 
-        # all operations return result before next pass
-        for operation in operations:
-            results.append(operation.result())
-
-    if to_be_deleted:
+    if remaining:
         error_msg_builder = ['Some resources failed to be deleted (run with `--verbose` for more information):']
-        for _, id_dict in to_be_deleted:
+        for i in remaining:
+            id_dict = to_be_deleted[i][1]
             logger.info(id_dict['exception'])
             resource_id = _build_resource_id(**id_dict) or id_dict['resource_id']
             error_msg_builder.append(resource_id)
@@ -1649,6 +1700,36 @@ def delete_resource(cmd, resource_ids=None, resource_group_name=None,
     return _single_or_collection(results)
 
 
+def _plan_resource_deletion(resource_ids):
+    """ Return, for each resource id, the positions of the resources that must be deleted before it: its child
+    resources and the resources known to reference it, see DELETE_BEFORE_RESOURCE_TYPES. The rules of a resource
+    type apply to its child resources too, like the subnets of a virtual network, and only to the resources of the
+    same resource group. A reference across resource groups is left to the retry of a failed delete. """
+    resources = []
+    for resource_id in resource_ids:
+        if resource_id and is_valid_resource_id(resource_id):
+            parts = parse_resource_id(resource_id)
+            resource_type = '{}/{}'.format(parts.get('namespace'), parts.get('type')).lower()
+            resource_group = '{}/{}'.format(parts.get('subscription'), parts.get('resource_group')).lower()
+            resources.append((resource_id.lower().rstrip('/'), resource_type, resource_group))
+        else:
+            resources.append((None, None, None))
+
+    depends_on = [set() for _ in resources]
+    for i, (resource_id, resource_type, resource_group) in enumerate(resources):
+        if not resource_id:
+            continue
+        referenced_types = DELETE_BEFORE_RESOURCE_TYPES.get(resource_type, ())
+        for j, (other_id, other_type, other_group) in enumerate(resources):
+            if i == j or not other_id:
+                continue
+            if resource_id.startswith(other_id + '/') or \
+                    other_type in referenced_types and other_group == resource_group:
+                # the parent of a child resource, or a resource referenced by this one, is deleted after it
+                depends_on[j].add(i)
+    return depends_on
+
+
 # pylint: unused-argument
 def update_resource(cmd, parameters, resource_ids=None,
                     resource_group_name=None, resource_provider_namespace=None,
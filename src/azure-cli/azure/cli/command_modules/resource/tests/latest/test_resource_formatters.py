@@ -3,6 +3,7 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import io
 import unittest
 
 from azure.cli.core.profiles import ResourceType
@@ -11,7 +12,9 @@ from azure.cli.core import AzCommandsLoader
 from azure.cli.core.commands import AzCliCommand
 
 from azure.cli.command_modules.resource._color import Color, ColoredStringBuilder
-from azure.cli.command_modules.resource._formatters import format_json, format_what_if_operation_result
+from azure.cli.command_modules.resource._formatters import (
+    format_json, format_what_if_operation_result, write_what_if_operation_result
+)
 
 
 cli_ctx = DummyCli()
@@ -474,3 +477,57 @@ Scope: /subscriptions/00000000-0000-0000-0000-000000000001/resourceGroups/rg1
         result = format_what_if_operation_result(WhatIfOperationResult(changes=changes), False)
 
         self.assertIn(expected, result)
+
+    def test_property_modify_from_object(self):
+        changes = [
+            WhatIfChange(
+                resource_id="subscriptions/00000000-0000-0000-0000-000000000001/resourceGroups/rg1/providers/p1/foo",
+                change_type=ChangeType.modify,
+                delta=[
+                    WhatIfPropertyChange(
+                        path="tags", property_change_type=PropertyChangeType.modify, before={"env": "test"}, after="",
+                    ),
+                ],
+            ),
+        ]
+
+        expected = """
+  ~ p1/foo
+    ~ tags:
+
+        env: "test"
+
+      => ""
+"""
+
+        result = format_what_if_operation_result(WhatIfOperationResult(changes=changes), False)
+
+        self.assertIn(expected, result)
+
+    def test_write_what_if_operation_result(self):
+        changes = [
+            WhatIfChange(
+                resource_id=f"subscriptions/00000000-0000-0000-0000-000000000001/resourceGroups/rg{i % 3}/"
+                f"providers/p1/foo{i}",
+                change_type=change_type,
+                before={"apiVersion": "2020-04-01", "name": f"foo{i}", "values": [1, {"nested": True}]},
+                after={"apiVersion": "2020-06-01", "name": f"foo{i}"},
+                delta=[
+                    WhatIfPropertyChange(
+                        path="apiVersion",
+                        property_change_type=PropertyChangeType.modify,
+                        before="2020-04-01",
+                        after="2020-06-01",
+                    ),
+                ],
+            )
+            for i, change_type in enumerate([ChangeType.create, ChangeType.delete, ChangeType.modify] * 100)
+        ]
+        result = WhatIfOperationResult(changes=changes)
+
+        for enable_color in (True, False):
+            with self.subTest(enable_color=enable_color):
+                stream = io.StringIO()
+                write_what_if_operation_result(result, stream, enable_color)
+
+                self.assertEqual(stream.getvalue(), format_what_if_operation_result(result, enable_color))
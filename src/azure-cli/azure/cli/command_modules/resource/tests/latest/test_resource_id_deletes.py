@@ -2,9 +2,30 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import json
 import os
+import threading
+import time
 import unittest
+
+import mock
+import requests
+from knack.util import CLIError
+from msrestazure.azure_exceptions import CloudError
+
 from azure.cli.testsdk import ScenarioTest, JMESPathCheck, ResourceGroupPreparer, live_only
+from azure.cli.command_modules.resource.custom import delete_resource
+
+RG_ID = '/subscriptions/00000000-0000-0000-0000-000000000000/resourceGroups/rg1/providers/'
+VM = RG_ID + 'Microsoft.Compute/virtualMachines/vm1'
+OS_DISK = RG_ID + 'Microsoft.Compute/disks/vm1_OsDisk'
+NIC = RG_ID + 'Microsoft.Network/networkInterfaces/vm1VMNic'
+PUBLIC_IP = RG_ID + 'Microsoft.Network/publicIPAddresses/vm1PublicIP'
+NSG = RG_ID + 'Microsoft.Network/networkSecurityGroups/vm1NSG'
+VNET = RG_ID + 'Microsoft.Network/virtualNetworks/vm1VNET'
+SUBNET = VNET + '/subnets/vm1Subnet'
+WEBAPP = RG_ID + 'Microsoft.Web/sites/app1'
+STORAGE = RG_ID + 'Microsoft.Storage/storageAccounts/store1'
 
 
 @live_only()
@@ -25,5 +46,112 @@ class ResourceDeleteTests(ScenarioTest):
         self.cmd('resource wait --ids {} --deleted --timeout 300'.format(''.join(rsrc_list)))
 
 
+class _FakeResources(object):
+    """Resources whose deletion fails while a resource referencing them or a child resource still exists."""
+
+    def __init__(self, references, delay=0.05):
+        self.references = references
+        self.existing = set(references)
+        self.delay = delay
+        self.in_progress = 0
+        self.max_in_progress = 0
+        self.deleted = []
+        self._lock = threading.Lock()
+
+    def get_rsrc_utils(self, cli_ctx, parsed_id, api_version, latest_include_preview=False):
+        return mock.Mock(delete=lambda: self._begin_delete(parsed_id['resource_id']))
+
+    def _begin_delete(self, resource_id):
+        """ Like a long running operation, the request fails right away and the deletion completes later. """
+        with self._lock:
+            users = [r for r in self.existing if resource_id in self.references[r] or r.startswith(resource_id + '/')]
+            if users:
+                response = requests.Response()
+                response.status_code = 400
+                response.headers['Content-Type'] = 'application/json'
+                response._content = json.dumps({'error': {'code': 'InUse', 'message': '{} is used by {}'.format(
+                    resource_id, users)}}).encode()
+                raise CloudError(response)
+            self.in_progress += 1
+            self.max_in_progress = max(self.max_in_progress, self.in_progress)
+        operation = threading.Thread(target=self._delete, args=(resource_id,))
+        operation.start()
+        return mock.Mock(result=operation.join)
+
+    def _delete(self, resource_id):
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_progress -= 1
+            self.existing.remove(resource_id)
+            self.deleted.append(resource_id)
+
+
+class ResourceDeleteWavesTests(unittest.TestCase):
+
+    def _delete(self, resources, resource_ids):
+        with mock.patch('azure.cli.command_modules.resource.custom._get_rsrc_util_from_parsed_id',
+                        resources.get_rsrc_utils), \
+                mock.patch('azure.cli.command_modules.resource.custom.logger') as logger_mock:
+            delete_resource(mock.MagicMock(), resource_ids=resource_ids)
+        return [c[0][1:] for c in logger_mock.info.call_args_list if c[0][0].startswith('Wave')]
+
+    def test_delete_resources_in_dependency_waves(self):
+        # the resources of a VM plus an unrelated web app, listed in the order `az resource list` could return them
+        resources = _FakeResources({
+            VM: [NIC, OS_DISK], OS_DISK: [], NIC: [SUBNET, PUBLIC_IP, NSG], PUBLIC_IP: [], NSG: [],
+            VNET: [], SUBNET: [NSG], WEBAPP: [],
+        })
+        resource_ids = [VNET, NSG, PUBLIC_IP, SUBNET, NIC, OS_DISK, VM, WEBAPP]
+        waves = self._delete(resources, resource_ids)
+
+        self.assertEqual(resources.existing, set())
+        # a wave per level of the dependencies, none failed
+        self.assertEqual([(wave, deleted, ready) for wave, deleted, ready, _ in waves],
+                         [(1, 2, 2), (2, 2, 2), (3, 2, 2), (4, 1, 1), (5, 1, 1)])
+        self.assertEqual(set(resources.deleted[:2]), {VM, WEBAPP})
+        self.assertEqual(resources.deleted[-1], NSG)
+        self.assertGreater(resources.max_in_progress, 1)
+
+    def test_delete_independent_resources_at_once(self):
+        accounts = ['{}{}'.format(STORAGE, i) for i in range(25)]
+        resources = _FakeResources({account: [] for account in accounts})
+        waves = self._delete(resources, accounts)
+
+        self.assertEqual(resources.existing, set())
+        self.assertEqual([(wave, deleted, ready) for wave, deleted, ready, _ in waves], [(1, 25, 25)])
+        self.assertEqual(resources.max_in_progress, 25)
+
+    def test_delete_resources_of_other_groups_at_once(self):
+        # the type rules only order the resources of the same resource group and subscription
+        other_group = RG_ID.replace('/rg1/', '/rg2/')
+        other_subscription = RG_ID.replace('00000000-0000-0000-0000-000000000000',
+                                           '11111111-1111-1111-1111-111111111111')
+        unrelated = [other_group + 'Microsoft.Compute/disks/disk2',
+                     other_group + 'Microsoft.Network/networkInterfaces/nic2',
+                     other_subscription + 'Microsoft.Compute/disks/vm1_OsDisk']
+        resources = _FakeResources(dict({VM: [OS_DISK], OS_DISK: []}, **{r: [] for r in unrelated}))
+        waves = self._delete(resources, [VM, OS_DISK] + unrelated)
+
+        self.assertEqual(resources.existing, set())
+        self.assertEqual([(wave, deleted, ready) for wave, deleted, ready, _ in waves], [(1, 4, 4), (2, 1, 1)])
+        self.assertEqual(resources.deleted[-1], OS_DISK)
+
+    def test_delete_resources_retries_unknown_dependency(self):
+        # no rule orders a web app before a storage account, the first delete of the storage account fails
+        resources = _FakeResources({WEBAPP: [STORAGE], STORAGE: []})
+        waves = self._delete(resources, [STORAGE, WEBAPP])
+
+        self.assertEqual(resources.deleted, [WEBAPP, STORAGE])
+        self.assertEqual([(wave, deleted, ready) for wave, deleted, ready, _ in waves], [(1, 1, 2), (2, 1, 1)])
+
+    def test_delete_resources_reports_failures(self):
+        # a resource not in the list keeps the public IP address in use
+        resources = _FakeResources({NIC: [PUBLIC_IP], PUBLIC_IP: [], VM: []})
+        resources.existing.add(NIC)
+        with self.assertRaisesRegex(CLIError, 'vm1PublicIP'):
+            self._delete(resources, [PUBLIC_IP, VM])
+        self.assertEqual(resources.deleted, [VM])
+
+
 if __name__ == '__main__':
     unittest.main()
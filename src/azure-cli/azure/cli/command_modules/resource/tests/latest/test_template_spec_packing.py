@@ -0,0 +1,113 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from knack.util import CLIError
+from azure.cli.core.mock import DummyCli
+from azure.cli.command_modules.resource import _packing_engine
+from azure.cli.command_modules.resource._packing_engine import pack, PACK_CACHE_DIR
+
+
+def _template(*relative_paths, **kwargs):
+    resources = [{
+        'type': 'Microsoft.Resources/deployments',
+        'apiVersion': '2019-10-01',
+        'name': 'deployment{}'.format(i),
+        'properties': {'mode': 'Incremental', 'templateLink': {'relativePath': relative_path}}
+    } for i, relative_path in enumerate(relative_paths)]
+    resources.append({'type': 'Microsoft.Storage/storageAccounts', 'name': kwargs.get('name', 'storage')})
+    # templates may have comments
+    return '// linked templates\n' + json.dumps({'resources': resources}, indent=2)
+
+
+class TemplateSpecPackingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root_dir)
+        self.cmd = mock.MagicMock()
+        self.cmd.cli_ctx = DummyCli()
+        self.cmd.cli_ctx.config.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cmd.cli_ctx.config.config_dir)
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.root_dir, relative_path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def _write_tree(self):
+        # both linked templates reference the same shared template
+        self._write('nested/shared.json', _template(name='shared'))
+        self._write('nested/a.json', _template('shared.json', name='a'))
+        self._write('b.json', _template('nested/shared.json', name='b'))
+        return self._write('main.json', _template('nested/a.json', 'b.json', name='main'))
+
+    def _pack(self, template_file):
+        with mock.patch.object(_packing_engine, 'process_template', wraps=_packing_engine.process_template) as parse:
+            packed = pack(self.cmd, template_file)
+        return packed, [call[1]['file_path'] for call in parse.call_args_list]
+
+    def test_pack_parses_every_template_once(self):
+        main = self._write_tree()
+        packed, parsed = self._pack(main)
+
+        self.assertEqual(packed.RootTemplate['resources'][-1]['name'], 'main')
+        self.assertEqual([a.path for a in packed.Artifacts],
+                         [os.path.join('nested', 'shared.json'), os.path.join('nested', 'a.json'), 'b.json'])
+        self.assertEqual([a.template['resources'][-1]['name'] for a in packed.Artifacts], ['shared', 'a', 'b'])
+        self.assertEqual(sorted(parsed), sorted(os.path.join(self.root_dir, p)
+                                                for p in ['main.json', 'nested/a.json', 'b.json', 'nested/shared.json']))
+
+    def test_pack_reuses_cached_templates(self):
+        main = self._write_tree()
+        expected, _ = self._pack(main)
+
+        packed, parsed = self._pack(main)
+        self.assertEqual(parsed, [])
+        self.assertEqual([(a.path, a.template) for a in packed.Artifacts],
+                         [(a.path, a.template) for a in expected.Artifacts])
+        self.assertEqual(packed.RootTemplate, expected.RootTemplate)
+
+        # only the changed template is parsed again
+        self._write('b.json', _template('nested/shared.json', name='b2'))
+        packed, parsed = self._pack(main)
+        self.assertEqual(parsed, [os.path.join(self.root_dir, 'b.json')])
+        self.assertEqual(packed.Artifacts[2].template['resources'][-1]['name'], 'b2')
+
+        with mock.patch.dict(os.environ, {'AZURE_RESOURCE_TEMPLATE_SPEC_PACK_CACHE': 'false'}):
+            _, parsed = self._pack(main)
+        self.assertEqual(len(parsed), 4)
+        self.assertEqual(len(os.listdir(os.path.join(self.cmd.cli_ctx.config.config_dir, PACK_CACHE_DIR))), 5)
+
+    def test_pack_links_in_a_cycle(self):
+        self._write('a.json', _template('b.json', name='a'))
+        self._write('b.json', _template('a.json', 'main.json', name='b'))
+        main = self._write('main.json', _template('a.json', name='main'))
+
+        packed, _ = self._pack(main)
+        self.assertEqual([a.path for a in packed.Artifacts], ['b.json', 'a.json'])
+
+    def test_pack_rejects_links_outside_of_root_directory(self):
+        self._write('other/outside.json', _template())
+        main = self._write('main/main.json', _template('../other/outside.json'))
+
+        with self.assertRaisesRegex(CLIError, 'outside of the root template directory'):
+            pack(self.cmd, main)
+        with self.assertRaisesRegex(CLIError, 'not found'):
+            pack(self.cmd, self._write('main/missing.json', _template('missing/a.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,6 +39,16 @@ logger = get_logger(__name__)
 
 # pylint: disable=too-many-lines
 
+ROLE_DEFINITION_CACHE_FILE = 'roleDefinitions.json'
+# seconds the role definitions of a scope are cached
+ROLE_DEFINITION_CACHE_TTL = 300
+GRAPH_OBJECT_CACHE_FILE = 'graphObjects.json'
+# seconds the names of resolved Graph objects are cached
+GRAPH_OBJECT_CACHE_TTL = 300
+# object ids per getObjectsByObjectIds request, and the requests sent at the same time
+GRAPH_OBJECT_IDS_PER_REQUEST = 1000
+GRAPH_OBJECT_MAX_REQUESTS = 4
+
 
 def list_role_definitions(cmd, name=None, resource_group_name=None, scope=None,
                           custom_role_only=False):
@@ -103,6 +113,7 @@ def _create_update_role_definition(cmd, role_definition, for_update):
     if not for_update and not role_definition.get('assignableScopes', None):
         raise CLIError("please provide 'assignableScopes'")
 
+    _RoleDefinitionCache(cmd.cli_ctx).clear()
     return worker.create_role_definition(definitions_client, role_name, role_id, role_definition)
 
 
@@ -112,6 +123,7 @@ def delete_role_definition(cmd, name, resource_group_name=None, scope=None,
     scope = _build_role_scope(resource_group_name, scope,
                               definitions_client.config.subscription_id)
     roles = _search_role_definitions(cmd.cli_ctx, definitions_client, name, [scope], custom_role_only)
+    _RoleDefinitionCache(cmd.cli_ctx).clear()
     for r in roles:
         definitions_client.delete(role_definition_id=r.name, scope=scope)
 
@@ -196,9 +208,11 @@ def list_role_assignments(cmd, assignee=None, role=None, resource_group_name=Non
         scope = _build_role_scope(resource_group_name, scope,
                                   definitions_client.config.subscription_id)
 
+    role_definition_cache = _RoleDefinitionCache(cmd.cli_ctx)
     assignments = _search_role_assignments(cmd.cli_ctx, assignments_client, definitions_client,
                                            scope, assignee, role,
-                                           include_inherited, include_groups)
+                                           include_inherited, include_groups,
+                                           role_definition_cache=role_definition_cache)
 
     results = todict(assignments) if assignments else []
     if include_classic_administrators:
@@ -210,10 +224,13 @@ def list_role_assignments(cmd, assignee=None, role=None, resource_group_name=Non
     # 1. fill in logic names to get things understandable.
     # (it's possible that associated roles and principals were deleted, and we just do nothing.)
     # 2. fill in role names
-    role_defs = list(definitions_client.list(
-        scope=scope or ('/subscriptions/' + definitions_client.config.subscription_id)))
     worker = MultiAPIAdaptor(cmd.cli_ctx)
-    role_dics = {i.id: worker.get_role_property(i, 'role_name') for i in role_defs}
+    role_scope = scope or ('/subscriptions/' + definitions_client.config.subscription_id)
+    role_dics = dict(role_definition_cache.get(definitions_client, role_scope))
+    if any(not i.get('roleDefinitionName') and worker.get_role_property(i, 'roleDefinitionId') not in role_dics
+           for i in results):
+        # a custom role may have been created elsewhere since the role definitions were cached
+        role_dics = dict(role_definition_cache.refresh(definitions_client, role_scope) or role_dics)
     for i in results:
         if not i.get('roleDefinitionName'):
             if role_dics.get(worker.get_role_property(i, 'roleDefinitionId')):
@@ -228,7 +245,7 @@ def list_role_assignments(cmd, assignee=None, role=None, resource_group_name=Non
 
     if principal_ids:
         try:
-            principals = _get_object_stubs(graph_client, principal_ids)
+            principals = _get_object_stubs(graph_client, principal_ids, cmd.cli_ctx)
             principal_dics = {i.object_id: _get_displayable_name(i) for i in principals}
 
             for i in [r for r in results if not r.get('principalName')]:
@@ -394,7 +411,7 @@ def list_role_assignment_change_logs(cmd, start_time=None, end_time=None):  # py
         principal_ids = {x['principalId'] for x in result if x['principalId']}
         if principal_ids:
             graph_client = _graph_client_factory(cmd.cli_ctx)
-            stubs = _get_object_stubs(graph_client, principal_ids)
+            stubs = _get_object_stubs(graph_client, principal_ids, cmd.cli_ctx)
             principal_dics = {i.object_id: _get_displayable_name(i) for i in stubs}
             if principal_dics:
                 for e in result:
@@ -430,7 +447,7 @@ def _backfill_assignments_for_co_admins(cli_ctx, auth_client, assignee=None):
     if assignee:  # apply assignee filter if applicable
         if is_guid(assignee):
             try:
-                result = _get_object_stubs(graph_client, [assignee])
+                result = _get_object_stubs(graph_client, [assignee], cli_ctx)
                 if not result:
                     return []
                 assignee = _get_displayable_name(result[0]).lower()
@@ -509,7 +526,8 @@ def delete_role_assignments(cmd, ids=None, assignee=None, role=None, resource_gr
 
 
 def _search_role_assignments(cli_ctx, assignments_client, definitions_client,
-                             scope, assignee, role, include_inherited, include_groups):
+                             scope, assignee, role, include_inherited, include_groups,
+                             role_definition_cache=None):
     assignee_object_id = None
     if assignee:
         assignee_object_id = _resolve_object_id(cli_ctx, assignee, fallback_to_object_id=True)
@@ -529,26 +547,226 @@ def _search_role_assignments(cli_ctx, assignments_client, definitions_client,
     else:
         assignments = list(assignments_client.list())
 
-    worker = MultiAPIAdaptor(cli_ctx)
     if assignments:
-        assignments = [a for a in assignments if (
-            not scope or
-            include_inherited and re.match(worker.get_role_property(a, 'scope'), scope, re.I) or
-            worker.get_role_property(a, 'scope').lower() == scope.lower()
-        )]
-
+        index = _RoleAssignmentIndex(cli_ctx, assignments)
+        role_id = None
         if role:
-            role_id = _resolve_role_id(role, scope, definitions_client)
-            assignments = [i for i in assignments if worker.get_role_property(i, 'role_definition_id') == role_id]
+            role_id = _resolve_role_id(role, scope, definitions_client, role_definition_cache)
+            if role_definition_cache and scope and not index.find(role_id=role_id) and \
+                    role_definition_cache.refresh(definitions_client, scope) is not None:
+                # the cached role may have been deleted or renamed elsewhere
+                role_id = _resolve_role_id(role, scope, definitions_client, role_definition_cache)
 
         # filter the assignee if "include_groups" is not provided because service side
         # does not accept filter "principalId eq and atScope()"
-        if assignee_object_id and not include_groups:
-            assignments = [i for i in assignments if worker.get_role_property(i, 'principal_id') == assignee_object_id]
+        principal_id = assignee_object_id if assignee_object_id and not include_groups else None
+        assignments = index.find(scope, include_inherited, role_id, principal_id)
 
     return assignments
 
 
+class _RoleAssignmentIndex(object):
+    """Role assignments indexed by scope, role definition and principal.
+
+    Filtering a listing of many assignments then takes a few lookups instead of a regular expression per
+    assignment. Each index is built on first use and the assignments are returned in the order they were listed.
+    """
+
+    def __init__(self, cli_ctx, assignments):
+        self.assignments = assignments
+        self._worker = MultiAPIAdaptor(cli_ctx)
+        self._indexes = {}
+
+    def _get_positions(self, property_name, value):
+        """ Return the positions of the assignments whose property equals `value`. """
+        index = self._indexes.get(property_name)
+        if index is None:
+            values = [self._worker.get_role_property(a, property_name) for a in self.assignments]
+            if property_name == 'scope':
+                values = [v.lower() for v in values]
+            # the first position of every value, each position links to the next one with the same value. Unlike a
+            # list per value, this creates no object per assignment.
+            first, following = {}, [-1] * len(values)
+            for position in range(len(values) - 1, -1, -1):
+                following[position] = first.get(values[position], -1)
+                first[values[position]] = position
+            index = self._indexes[property_name] = (first, following)
+
+        first, following = index
+        positions = []
+        position = first.get(value, -1)
+        while position != -1:
+            positions.append(position)
+            position = following[position]
+        return positions
+
+    def find(self, scope=None, include_inherited=False, role_id=None, principal_id=None):
+        """ Return the assignments at `scope`, or also at the scopes that contain it if `include_inherited`, of
+        the role definition `role_id` and the principal `principal_id`. None matches everything. """
+        matches = None
+        if scope:
+            scope = scope.lower()
+            if include_inherited:
+                # the scopes containing a scope are its prefixes, like the subscription of a resource group
+                matches = {p for end in range(1, len(scope) + 1) for p in self._get_positions('scope', scope[:end])}
+            else:
+                matches = set(self._get_positions('scope', scope))
+        for property_name, value in (('role_definition_id', role_id), ('principal_id', principal_id)):
+            if value is not None:
+                positions = set(self._get_positions(property_name, value))
+                matches = positions if matches is None else matches & positions
+        if matches is None:
+            return list(self.assignments)
+        return [self.assignments[p] for p in sorted(matches)]
+
+
+class _LocalCache(object):
+    """Values kept in a JSON file of the config directory for `ttl` seconds. A `ttl` of 0 disables the cache."""
+
+    def __init__(self, cli_ctx, file_name, ttl):
+        self.path = os.path.join(cli_ctx.config.config_dir, file_name)
+        self.ttl = ttl
+        self._entries = None
+
+    def _load(self):
+        self._entries = {}
+        try:
+            with open(self.path, 'r') as f:
+                self._entries = json.load(f)
+        except (OSError, IOError, ValueError):
+            pass
+
+    def get(self, key):
+        import time
+        if self._entries is None:
+            self._load()
+        entry = self._entries.get(key)
+        if isinstance(entry, dict) and 0 <= time.time() - entry.get('time', 0) < self.ttl:
+            return entry.get('value')
+        return None
+
+    def update(self, values):
+        import time
+        if self.ttl <= 0 or not values:
+            return
+        if self._entries is None:
+            self._load()
+        now = time.time()
+        self._entries = {k: v for k, v in self._entries.items()
+                         if isinstance(v, dict) and 0 <= now - v.get('time', 0) < self.ttl}
+        self._entries.update((key, {'time': now, 'value': value}) for key, value in values.items())
+        try:
+            # readable by the user only, the entries can hold user names
+            tmp_path = '{}.{}.tmp'.format(self.path, os.getpid())
+            with os.fdopen(os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except (OSError, IOError) as ex:
+            logger.debug("Failed to save %s: %s", self.path, ex)
+
+    def clear(self):
+        self._entries = {}
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class _RoleDefinitionCache(_LocalCache):
+    """The ids and names of the role definitions of a scope, kept in the config directory for a short time.
+
+    Listing the assignments of a scope again, or filtering them by role name, then needs no request for the role
+    definitions. Creating, updating or deleting a role definition clears the cache. Changes made elsewhere are
+    caught by `refresh`, when the cached role definitions don't match the assignments.
+    """
+
+    def __init__(self, cli_ctx):
+        super(_RoleDefinitionCache, self).__init__(
+            cli_ctx, ROLE_DEFINITION_CACHE_FILE,
+            cli_ctx.config.getint('role', 'definition_cache_ttl', fallback=ROLE_DEFINITION_CACHE_TTL))
+        self.cli_ctx = cli_ctx
+        # scopes whose role definitions were read from the cache file, or listed by this command
+        self._cached_keys = set()
+        self._listed_keys = set()
+
+    def _get_key(self, scope):
+        return '{} {}'.format(self.cli_ctx.cloud.name, scope.lower())
+
+    def _to_entries(self, role_definitions):
+        worker = MultiAPIAdaptor(self.cli_ctx)
+        return [[r.id, worker.get_role_property(r, 'role_name')] for r in role_definitions]
+
+    def get(self, definitions_client, scope):  # pylint: disable=arguments-differ
+        """ Return the [id, role name] of the role definitions of `scope`. """
+        key = self._get_key(scope)
+        roles = super(_RoleDefinitionCache, self).get(key)
+        if roles is None:
+            return self._list(definitions_client, scope, key)
+        self._cached_keys.add(key)
+        return roles
+
+    def refresh(self, definitions_client, scope):
+        """ List the role definitions of `scope` again if they were read from the cache file, as roles may have
+        been created, renamed or deleted elsewhere since. Return them, or None if they are already current. """
+        key = self._get_key(scope)
+        if key not in self._cached_keys or key in self._listed_keys:
+            return None
+        return self._list(definitions_client, scope, key)
+
+    def _list(self, definitions_client, scope, key):
+        roles = self._to_entries(definitions_client.list(scope=scope))
+        self._listed_keys.add(key)
+        self.update({key: roles})
+        return roles
+
+    def add(self, scope, role_definitions):
+        """ Add role definitions created since the role definitions of `scope` were cached. """
+        key = self._get_key(scope)
+        roles = super(_RoleDefinitionCache, self).get(key)
+        if roles is None:
+            return
+        ids = {i.lower() for i, _ in roles}
+        added = [entry for entry in self._to_entries(role_definitions) if entry[0].lower() not in ids]
+        if added:
+            self.update({key: roles + added})
+
+
+class _GraphObjectCache(_LocalCache):
+    """The names and types of the Graph objects resolved by their object ids, kept in the config directory for a
+    short time, so that role and ad commands showing the same principals don't request them again.
+    """
+
+    # the properties shown for a principal, see _get_displayable_name
+    _PROPERTIES = ('objectId', 'objectType', 'displayName', 'userPrincipalName', 'servicePrincipalNames')
+    _TYPES = ('User', 'Group', 'ServicePrincipal', 'Application')
+
+    def __init__(self, cli_ctx):
+        super(_GraphObjectCache, self).__init__(
+            cli_ctx, GRAPH_OBJECT_CACHE_FILE,
+            cli_ctx.config.getint('role', 'graph_object_cache_ttl', fallback=GRAPH_OBJECT_CACHE_TTL))
+        self.cloud_name = cli_ctx.cloud.name
+
+    def get_objects(self, object_ids):
+        """ Return {lower case object id: Graph object} of the cached objects. The objects only have the cached
+        properties. """
+        from azure.graphrbac.models import DirectoryObject
+        objects = {}
+        for object_id in object_ids:
+            value = self.get('{} {}'.format(self.cloud_name, object_id.lower()))
+            if value:
+                objects[object_id.lower()] = DirectoryObject.deserialize(value)
+        return objects
+
+    def add_objects(self, objects):
+        values = {}
+        for obj in objects:
+            if getattr(obj, 'object_type', None) in self._TYPES and obj.object_id:
+                value = obj.serialize(keep_readonly=True)
+                values['{} {}'.format(self.cloud_name, obj.object_id.lower())] = {
+                    k: value[k] for k in self._PROPERTIES if value.get(k) is not None}
+        self.update(values)
+
+
 def _build_role_scope(resource_group_name, scope, subscription_id):
     subscription_scope = '/subscriptions/' + subscription_id
     if scope:
@@ -565,7 +783,7 @@ def _build_role_scope(resource_group_name, scope, subscription_id):
     return scope
 
 
-def _resolve_role_id(role, scope, definitions_client):
+def _resolve_role_id(role, scope, definitions_client, role_definition_cache=None):
     role_id = None
     if re.match(r'/subscriptions/.+/providers/Microsoft.Authorization/roleDefinitions/',
                 role, re.I):
@@ -575,14 +793,22 @@ def _resolve_role_id(role, scope, definitions_client):
             role_id = '/subscriptions/{}/providers/Microsoft.Authorization/roleDefinitions/{}'.format(
                 definitions_client.config.subscription_id, role)
         if not role_id:  # retrieve role id
-            role_defs = list(definitions_client.list(scope, "roleName eq '{}'".format(role)))
-            if not role_defs:
+            ids = None
+            if role_definition_cache and scope:
+                ids = [i for i, name in role_definition_cache.get(definitions_client, scope)
+                       if name and name.lower() == role.lower()]
+            if not ids:
+                # the role may have been created since the role definitions were cached
+                role_definitions = list(definitions_client.list(scope, "roleName eq '{}'".format(role)))
+                ids = [r.id for r in role_definitions]
+                if role_definition_cache and scope:
+                    role_definition_cache.add(scope, role_definitions)
+            if not ids:
                 raise CLIError("Role '{}' doesn't exist.".format(role))
-            if len(role_defs) > 1:
-                ids = [r.id for r in role_defs]
+            if len(ids) > 1:
                 err = "More than one role matches the given name '{}'. Please pick a value from '{}'"
                 raise CLIError(err.format(role, ids))
-            role_id = role_defs[0].id
+            role_id = ids[0]
     return role_id
 
 
@@ -710,7 +936,7 @@ def get_user_member_groups(cmd, upn_or_object_id, security_enabled_only=False):
     results = list(graph_client.users.get_member_groups(
         upn_or_object_id, security_enabled_only=security_enabled_only))
     try:
-        stubs = _get_object_stubs(graph_client, results)
+        stubs = _get_object_stubs(graph_client, results, cmd.cli_ctx)
     except GraphErrorException:
         stubs = []
     stubs = {s.object_id: s.display_name for s in stubs}
@@ -1790,6 +2016,7 @@ def _resolve_object_id(cli_ctx, assignee, fallback_to_object_id=False):
             result = list(client.service_principals.list(
                 filter="servicePrincipalNames/any(c:c eq '{}')".format(assignee)))
         if not result and is_guid(assignee):  # assume an object id, let us verify it
+            # not through the Graph object cache, which would still find a principal deleted since it was cached
             result = _get_object_stubs(client, [assignee])
 
         # 2+ matches should never happen, so we only check 'no match' here
@@ -1805,14 +2032,44 @@ def _resolve_object_id(cli_ctx, assignee, fallback_to_object_id=False):
         raise
 
 
-def _get_object_stubs(graph_client, assignees):
+def _get_object_stubs(graph_client, assignees, cli_ctx=None):
+    """ Return the Graph objects of the object ids in `assignees`, in their order and without duplicates.
+
+    The ids are requested in chunks sent concurrently. With `cli_ctx`, the objects resolved recently are read from
+    the Graph object cache and only have the properties needed to display them.
+    """
+    from concurrent.futures import ThreadPoolExecutor
     from azure.graphrbac.models import GetObjectsParameters
-    result = []
-    assignees = list(assignees)  # callers could pass in a set
-    for i in range(0, len(assignees), 1000):
-        params = GetObjectsParameters(include_directory_object_references=True, object_ids=assignees[i:i + 1000])
-        result += list(graph_client.objects.get_objects_by_object_ids(params))
-    return result
+
+    # callers could pass in a set or duplicates, object ids are compared ignoring case
+    unique_assignees = {}
+    for object_id in assignees:
+        unique_assignees.setdefault(object_id.lower(), object_id)
+    assignees = list(unique_assignees.values())
+    cache = _GraphObjectCache(cli_ctx) if cli_ctx else None
+    cached = cache.get_objects(assignees) if cache else {}
+    object_ids = [i for i in assignees if i.lower() not in cached]
+
+    def _get_objects(chunk):
+        params = GetObjectsParameters(include_directory_object_references=True, object_ids=chunk)
+        return list(graph_client.objects.get_objects_by_object_ids(params))
+
+    chunks = [object_ids[i:i + GRAPH_OBJECT_IDS_PER_REQUEST]
+              for i in range(0, len(object_ids), GRAPH_OBJECT_IDS_PER_REQUEST)]
+    if len(chunks) > 1:
+        with ThreadPoolExecutor(max_workers=min(len(chunks), GRAPH_OBJECT_MAX_REQUESTS)) as executor:
+            results = list(executor.map(_get_objects, chunks))
+    else:
+        results = [_get_objects(chunk) for chunk in chunks]
+
+    resolved = {}
+    for obj in itertools.chain.from_iterable(results):
+        resolved.setdefault(obj.object_id.lower(), obj)
+    if cache:
+        cache.add_objects(resolved.values())
+    resolved.update(cached)
+    # the objects of the ids that don't exist are not returned
+    return [resolved[i.lower()] for i in assignees if i.lower() in resolved]
 
 
 def _get_owner_url(cli_ctx, owner_object_id):
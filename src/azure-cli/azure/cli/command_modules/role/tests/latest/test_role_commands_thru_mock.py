@@ -4,6 +4,8 @@
 # --------------------------------------------------------------------------------------------
 import json
 import os
+import shutil
+import stat
 import tempfile
 import unittest
 import uuid
@@ -22,7 +24,8 @@ from azure.cli.command_modules.role.custom import (create_role_definition,
                                                    delete_service_principal_credential,
                                                    list_service_principal_credentials,
                                                    update_application,
-                                                   _get_object_stubs,
+                                                   _get_object_stubs, _resolve_object_id,
+                                                   GRAPH_OBJECT_CACHE_FILE,
                                                    list_service_principal_owners,
                                                    list_application_owners,
                                                    delete_role_assignments)
@@ -390,22 +393,111 @@ class TestRoleMocked(unittest.TestCase):
 
     def test_get_object_stubs(self):
         graph_client = mock.MagicMock()
-        assignees = [i for i in range(2001)]
+        assignees = [str(i) for i in range(2001)]
         graph_client.objects.get_objects_by_object_ids.return_value = []
 
         # action
         _get_object_stubs(graph_client, assignees)
 
         # assert
-        # we get called with right args
+        # we get called with right args, the chunks are requested concurrently
         self.assertEqual(graph_client.objects.get_objects_by_object_ids.call_count, 3)
         object_groups = []
         for i in range(0, 2001, 1000):
-            object_groups.append([i for i in range(i, min(i + 1000, 2001))])
-
-        for call, group in zip(graph_client.objects.get_objects_by_object_ids.call_args_list, object_groups):
-            args, _ = call
-            self.assertEqual(args[0].object_ids, group)
+            object_groups.append([str(i) for i in range(i, min(i + 1000, 2001))])
+
+        requested_groups = [args[0].object_ids for args, _ in graph_client.objects.get_objects_by_object_ids.call_args_list]
+        self.assertEqual(sorted(requested_groups), sorted(object_groups))
+
+    def test_get_object_stubs_thru_graph_stub(self):
+        from azure.graphrbac import GraphRbacManagementClient
+        from msrest.authentication import BasicTokenAuthentication
+
+        users = {'{:08d}-0000-0000-0000-000000000000'.format(i): 'user{}@contoso.com'.format(i) for i in range(2500)}
+        server = _GraphStubServer(users)
+        self.addCleanup(server.stop)
+        graph_client = GraphRbacManagementClient(BasicTokenAuthentication({'access_token': 'token'}), 'tenant',
+                                                 base_url=server.url)
+
+        # duplicates, upper case ids and an id that doesn't exist
+        object_ids = list(users)
+        assignees = object_ids[::-1] + [object_ids[5].upper(), object_ids[7], '99999999-0000-0000-0000-000000000000']
+        cli_ctx = DummyCli()
+        cli_ctx.config.config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cli_ctx.config.config_dir)
+
+        result = _get_object_stubs(graph_client, assignees, cli_ctx)
+        self.assertEqual([o.object_id for o in result], object_ids[::-1])
+        self.assertEqual(result[0].user_principal_name, 'user2499@contoso.com')
+        # the chunks were requested concurrently, each id once
+        self.assertEqual(sorted(len(r) for r in server.requests), [501, 1000, 1000])
+        self.assertEqual(sorted(i for r in server.requests for i in r), sorted(users) + ['99999999-0000-0000-0000-000000000000'])
+        self.assertGreater(server.max_concurrent_requests, 1)
+
+        # later commands read the objects from the cache
+        server.requests = []
+        result = _get_object_stubs(graph_client, [object_ids[3], object_ids[1]], cli_ctx)
+        self.assertEqual([(o.object_id, o.user_principal_name) for o in result],
+                         [(object_ids[3], 'user3@contoso.com'), (object_ids[1], 'user1@contoso.com')])
+        self.assertEqual(server.requests, [])
+        if os.name == 'posix':
+            cache_path = os.path.join(cli_ctx.config.config_dir, GRAPH_OBJECT_CACHE_FILE)
+            self.assertEqual(stat.S_IMODE(os.stat(cache_path).st_mode), 0o600)
+
+        # an assignee given by object id is always checked on the server
+        del users[object_ids[3]]
+        resolve_client = mock.Mock(objects=graph_client.objects)
+        resolve_client.service_principals.list.return_value = []
+        with mock.patch('azure.cli.command_modules.role.custom._graph_client_factory', return_value=resolve_client):
+            with self.assertRaisesRegex(CLIError, 'Cannot find user or service principal'):
+                _resolve_object_id(cli_ctx, object_ids[3])
+
+
+class _GraphStubServer(object):
+    """A local Graph endpoint serving getObjectsByObjectIds, which answers in a different order than asked."""
+
+    def __init__(self, users):
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.users = users
+        self.requests = []
+        self.max_concurrent_requests = 0
+        self._concurrent_requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self):  # pylint: disable=invalid-name
+                import time
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                with stub._lock:
+                    stub.requests.append(body['objectIds'])
+                    stub._concurrent_requests += 1
+                    stub.max_concurrent_requests = max(stub.max_concurrent_requests, stub._concurrent_requests)
+                time.sleep(0.2)
+                value = [{'objectId': i, 'objectType': 'User', 'userPrincipalName': stub.users[i], 'displayName': i}
+                         for i in sorted(body['objectIds']) if i in stub.users]
+                data = json.dumps({'value': value}).encode()
+                with stub._lock:
+                    stub._concurrent_requests -= 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self._server.server_address[1])
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
 
 
 class FakedError(object):  # pylint: disable=too-few-public-methods
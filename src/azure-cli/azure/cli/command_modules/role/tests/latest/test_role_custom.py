@@ -2,10 +2,16 @@
 # Copyright (c) Microsoft Corporation. All rights reserved.
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
+import os
+import re
+import shutil
+import tempfile
 import unittest
 import mock
 
-from azure.cli.command_modules.role.custom import _resolve_role_id
+from azure.cli.core.mock import DummyCli
+from azure.cli.command_modules.role.custom import (_resolve_role_id, _search_role_assignments,
+                                                   _RoleDefinitionCache)
 
 # pylint: disable=line-too-long
 
@@ -26,3 +32,131 @@ class TestRoleCustomCommands(unittest.TestCase):
         # action (using a full id)
         test_full_id = '/subscriptions/0b1f6471-1bf0-4dda-aec3-cb9272123456/providers/microsoft.authorization/roleDefinitions/5370bbf4-6b73-4417-969b-8f2e6e123456'
         self.assertEqual(test_full_id, _resolve_role_id(test_full_id, 'foobar', mock_client))
+
+    def test_search_role_assignments(self):
+        sub = '/subscriptions/00000000-0000-0000-0000-000000000000'
+        reader = sub + '/providers/Microsoft.Authorization/roleDefinitions/acdd72a7'
+        owner = sub + '/providers/Microsoft.Authorization/roleDefinitions/8e3af657'
+        assignments = [mock.Mock(spec=['scope', 'role_definition_id', 'principal_id'], scope=scope,
+                                 role_definition_id=role, principal_id=principal)
+                       for scope, role, principal in [
+                           ('/', reader, 'p1'),
+                           (sub, owner, 'p1'),
+                           (sub + '/resourceGroups/rg1', reader, 'p2'),
+                           (sub + '/resourceGroups/RG1/providers/Microsoft.Web/sites/app1', owner, 'p2'),
+                           (sub + '/resourceGroups/rg10', reader, 'p1'),
+                           (sub + '/resourceGroups/rg2', owner, 'p3')]]
+        client = mock.Mock()
+        client.list_for_scope.return_value = assignments
+        client.list.return_value = assignments
+
+        def _legacy_search(scope, include_inherited, role_id=None, principal_id=None):
+            return [a for a in assignments if (
+                (not scope or include_inherited and re.match(a.scope, scope, re.I) or a.scope.lower() == scope.lower()) and
+                (not role_id or a.role_definition_id == role_id) and (not principal_id or a.principal_id == principal_id))]
+
+        def _search(scope, include_inherited, role=None, assignee=None):
+            with mock.patch('azure.cli.command_modules.role.custom._resolve_object_id', side_effect=lambda _, a, **kw: a):
+                return _search_role_assignments(DummyCli(), client, mock.Mock(), scope, assignee, role,
+                                                include_inherited, include_groups=False)
+
+        for scope in [None, sub, sub + '/resourceGroups/rg1', sub + '/resourceGroups/RG1/providers/Microsoft.Web/sites/app1',
+                      sub + '/resourceGroups/rg3']:
+            for include_inherited in [False, True]:
+                self.assertEqual(_search(scope, include_inherited), _legacy_search(scope, include_inherited))
+                self.assertEqual(_search(scope, include_inherited, role=owner),
+                                 _legacy_search(scope, include_inherited, role_id=owner))
+                self.assertEqual(_search(scope, include_inherited, role=reader, assignee='p1'),
+                                 _legacy_search(scope, include_inherited, role_id=reader, principal_id='p1'))
+
+        self.assertEqual(_search(sub + '/resourceGroups/rg1/providers/Microsoft.Web/sites/app1', True),
+                         assignments[:4])
+        self.assertEqual(_search(None, False, assignee='p2'), assignments[2:4])
+
+    def test_role_definition_cache(self):
+        config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, config_dir)
+        cli_ctx = DummyCli()
+        cli_ctx.config.config_dir = config_dir
+        role_definition = mock.Mock(spec=['id', 'role_name'], id='/providers/Microsoft.Authorization/roleDefinitions/r1')
+        role_definition.role_name = 'Reader'
+        role_definitions = [role_definition]
+        definitions_client = mock.Mock()
+        definitions_client.list.side_effect = lambda scope, role_filter=None: [
+            r for r in role_definitions if not role_filter or role_filter == "roleName eq '{}'".format(r.role_name)]
+        definitions_client.config.subscription_id = '123'
+
+        self.assertEqual(_RoleDefinitionCache(cli_ctx).get(definitions_client, '/subscriptions/123'),
+                         [[role_definition.id, 'Reader']])
+        # a later command reads the role definitions from the cache
+        cache = _RoleDefinitionCache(cli_ctx)
+        self.assertEqual(_resolve_role_id('reader', '/subscriptions/123', definitions_client, cache), role_definition.id)
+        definitions_client.list.assert_called_once_with(scope='/subscriptions/123')
+        with self.assertRaisesRegex(Exception, "Role 'Owner' doesn't exist"):
+            _resolve_role_id('Owner', '/subscriptions/123', definitions_client, cache)
+        definitions_client.list.assert_called_with('/subscriptions/123', "roleName eq 'Owner'")
+
+        # a role created elsewhere after the role definitions were cached is found on the server and cached
+        custom_role = mock.Mock(spec=['id', 'role_name'], id='/providers/Microsoft.Authorization/roleDefinitions/r2')
+        custom_role.role_name = 'Custom Role'
+        role_definitions.append(custom_role)
+        self.assertEqual(_resolve_role_id('Custom Role', '/subscriptions/123', definitions_client, cache),
+                         custom_role.id)
+        self.assertEqual(_RoleDefinitionCache(cli_ctx).get(definitions_client, '/subscriptions/123'),
+                         [[role_definition.id, 'Reader'], [custom_role.id, 'Custom Role']])
+        self.assertEqual(definitions_client.list.call_count, 3)
+
+        cache.clear()
+        _RoleDefinitionCache(cli_ctx).get(definitions_client, '/subscriptions/123')
+        self.assertEqual(definitions_client.list.call_count, 4)
+
+        with mock.patch.dict(os.environ, {'AZURE_ROLE_DEFINITION_CACHE_TTL': '0'}):
+            cache = _RoleDefinitionCache(cli_ctx)
+            cache.get(definitions_client, '/subscriptions/123')
+            cache.get(definitions_client, '/subscriptions/123')
+        self.assertEqual(definitions_client.list.call_count, 6)
+
+    def test_role_definition_cache_refresh(self):
+        config_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, config_dir)
+        cli_ctx = DummyCli()
+        cli_ctx.config.config_dir = config_dir
+        sub = '/subscriptions/123'
+        role_definition = mock.Mock(spec=['id', 'role_name'], id=sub + '/providers/Microsoft.Authorization/roleDefinitions/r1')
+        role_definition.role_name = 'Custom Role'
+        role_definitions = [role_definition]
+        definitions_client = mock.Mock()
+        definitions_client.list.side_effect = lambda scope, role_filter=None: [
+            r for r in role_definitions if not role_filter or role_filter == "roleName eq '{}'".format(r.role_name)]
+        definitions_client.config.subscription_id = '123'
+        assignment = mock.Mock(spec=['scope', 'role_definition_id', 'principal_id'], scope=sub,
+                               role_definition_id=role_definition.id, principal_id='p1')
+        assignments_client = mock.Mock()
+        assignments_client.list_for_scope.return_value = [assignment]
+
+        def _search(role):
+            return _search_role_assignments(cli_ctx, assignments_client, definitions_client, sub, None, role,
+                                            False, False, role_definition_cache=_RoleDefinitionCache(cli_ctx))
+
+        self.assertEqual(_search('Custom Role'), [assignment])
+        self.assertEqual(definitions_client.list.call_count, 1)
+        # a matching cached role needs no refresh
+        self.assertEqual(_search('Custom Role'), [assignment])
+        self.assertEqual(definitions_client.list.call_count, 1)
+
+        # the role was deleted elsewhere while it was cached, and its assignments with it
+        role_definitions.remove(role_definition)
+        assignments_client.list_for_scope.return_value = [
+            mock.Mock(spec=['scope', 'role_definition_id', 'principal_id'], scope=sub, role_definition_id='other',
+                      principal_id='p1')]
+        with self.assertRaisesRegex(Exception, "Role 'Custom Role' doesn't exist"):
+            _search('Custom Role')
+        self.assertEqual(_RoleDefinitionCache(cli_ctx).get(definitions_client, sub), [])
+
+        # a refresh happens once per scope and command
+        cache = _RoleDefinitionCache(cli_ctx)
+        self.assertIsNone(cache.refresh(definitions_client, sub))
+        cache.get(definitions_client, sub)
+        role_definitions.append(role_definition)
+        self.assertEqual(cache.refresh(definitions_client, sub), [[role_definition.id, 'Custom Role']])
+        self.assertIsNone(cache.refresh(definitions_client, sub))
@@ -15,6 +15,9 @@ from ._client_factory import _compute_client_factory
 
 logger = get_logger(__name__)
 
+# minutes a downloaded image alias doc is reused, overridable through `az config set vm.image_alias_doc_ttl=<minutes>`
+ALIAS_DOC_TTL = 1440
+
 
 def _resource_not_exists(cli_ctx, resource_type):
     def _handle_resource_not_exists(namespace):
@@ -28,61 +31,29 @@ def _resource_not_exists(cli_ctx, resource_type):
     return _handle_resource_not_exists
 
 
-def _get_thread_count():
-    return 5  # don't increase too much till https://github.com/Azure/msrestazure-for-python/issues/6 is fixed
+def _get_thread_count(cli_ctx=None):
+    # don't increase the default too much till https://github.com/Azure/msrestazure-for-python/issues/6 is fixed
+    if cli_ctx is None:
+        return 5
+    return max(1, cli_ctx.config.getint('vm', 'image_list_workers', fallback=5))
 
 
 def load_images_thru_services(cli_ctx, publisher, offer, sku, location):
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    all_images = []
-    client = _compute_client_factory(cli_ctx)
+    from ._image_catalog import ImageCatalog
     if location is None:
         location = get_one_of_subscription_locations(cli_ctx)
+    catalog = ImageCatalog(cli_ctx, location, max_workers=_get_thread_count(cli_ctx))
+    return catalog.list_images(publisher, offer, sku)
 
-    def _load_images_from_publisher(publisher):
-        from msrestazure.azure_exceptions import CloudError
-        try:
-            offers = client.virtual_machine_images.list_offers(location, publisher)
-        except CloudError as e:
-            logger.warning(str(e))
-            return
-        if offer:
-            offers = [o for o in offers if _matched(offer, o.name)]
-        for o in offers:
-            try:
-                skus = client.virtual_machine_images.list_skus(location, publisher, o.name)
-            except CloudError as e:
-                logger.warning(str(e))
-                continue
-            if sku:
-                skus = [s for s in skus if _matched(sku, s.name)]
-            for s in skus:
-                try:
-                    images = client.virtual_machine_images.list(location, publisher, o.name, s.name)
-                except CloudError as e:
-                    logger.warning(str(e))
-                    continue
-                for i in images:
-                    all_images.append({
-                        'publisher': publisher,
-                        'offer': o.name,
-                        'sku': s.name,
-                        'version': i.name})
 
-    publishers = client.virtual_machine_images.list_publishers(location)
-    if publisher:
-        publishers = [p for p in publishers if _matched(publisher, p.name)]
-
-    publisher_num = len(publishers)
-    if publisher_num > 1:
-        with ThreadPoolExecutor(max_workers=_get_thread_count()) as executor:
-            tasks = [executor.submit(_load_images_from_publisher, p.name) for p in publishers]
-            for t in as_completed(tasks):
-                t.result()  # don't use the result but expose exceptions from the threads
-    elif publisher_num == 1:
-        _load_images_from_publisher(publishers[0].name)
-
-    return all_images
+def _load_alias_doc_cache(cli_ctx):
+    import os
+    from azure.cli.core._session import Session
+    alias_doc_cache = Session()
+    ttl = cli_ctx.config.getint('vm', 'image_alias_doc_ttl', fallback=ALIAS_DOC_TTL)
+    if ttl > 0:
+        alias_doc_cache.load(os.path.join(cli_ctx.config.config_dir, 'vmImageAliasDoc.json'), max_age=ttl * 60)
+    return alias_doc_cache
 
 
 def load_images_from_aliases_doc(cli_ctx, publisher=None, offer=None, sku=None):
@@ -97,11 +68,16 @@ def load_images_from_aliases_doc(cli_ctx, publisher=None, offer=None, sku=None):
                        "it or use '--all' to retrieve images from server. Use local copy instead.")
         dic = json.loads(alias_json)
     else:
+        alias_doc_cache = _load_alias_doc_cache(cli_ctx)
+        dic = alias_doc_cache.get('doc') if alias_doc_cache.get('url') == target_url else None
+    if dic is None:
         # under hack mode(say through proxies with unsigned cert), opt out the cert verification
         try:
             response = requests.get(target_url, verify=(not should_disable_connection_verify()))
             if response.status_code == 200:
                 dic = json.loads(response.content.decode())
+                alias_doc_cache.data.update({'url': target_url, 'doc': dic})
+                alias_doc_cache.save_with_retry()
             else:
                 logger.warning("Failed to retrieve image alias doc '%s'. Error: '%s'. Use local copy instead.",
                                target_url, response)
@@ -178,7 +154,7 @@ def load_extension_images_thru_services(cli_ctx, publisher, name, version, locat
 
     publisher_num = len(publishers)
     if publisher_num > 1:
-        with ThreadPoolExecutor(max_workers=_get_thread_count()) as executor:
+        with ThreadPoolExecutor(max_workers=_get_thread_count(cli_ctx)) as executor:
             tasks = [executor.submit(_load_extension_images_from_publisher,
                                      p.name) for p in publishers]
             for t in as_completed(tasks):
@@ -1579,6 +1579,10 @@ short-summary: List the VM/VMSS images available in the Azure Marketplace.
 parameters:
   - name: --all
     short-summary: Retrieve image list from live Azure service rather using an offline image list
+    long-summary: >
+        Listed images are kept in a local catalog per location and refreshed incrementally after
+        `vm.image_catalog_ttl` minutes (default 1440, 0 disables the catalog). `vm.image_list_workers`
+        sets how many requests run concurrently (default 5).
   - name: --offer -f
     short-summary: Image offer name, partial name is accepted
   - name: --publisher -p
@@ -1714,7 +1718,10 @@ examples:
 helps['vm list-skus'] = """
 type: command
 short-summary: Get details for compute-related resource SKUs.
-long-summary: This command incorporates subscription level restriction, offering the most accurate information.
+long-summary: >
+    This command incorporates subscription level restriction, offering the most accurate information.
+    SKUs are kept in a local catalog for `vm.sku_catalog_ttl` minutes (default 10) after they are first listed, so
+    the result can be that many minutes old. Use `az config set vm.sku_catalog_ttl=0` to always query Azure.
 examples:
   - name: List all SKUs in the West US region.
     text: az vm list-skus -l westus
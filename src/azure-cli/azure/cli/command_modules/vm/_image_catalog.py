@@ -0,0 +1,158 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import json
+import os
+import time
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# minutes a listed publisher (and its offers) stays valid, overridable through
+# `az config set vm.image_catalog_ttl=<minutes>`. A value of 0 disables the local catalog.
+DEFAULT_IMAGE_CATALOG_TTL = 1440
+
+
+class ImageCatalog(object):
+    """A local catalog of the marketplace VM images of a location, used by `az vm image list --all`.
+
+    The catalog mirrors the publisher -> offer -> sku -> versions tree of the service. Refreshes are incremental:
+    every level is re-listed once its entry is older than `vm.image_catalog_ttl`, and only for the publishers and
+    offers that match the query, so newly published versions show up after at most one TTL.
+    Offers, skus and versions are listed concurrently with `max_workers` threads.
+    """
+
+    def __init__(self, cli_ctx, location, max_workers=5, subscription_id=None):
+        from azure.cli.core.commands.client_factory import get_subscription_id
+        self.cli_ctx = cli_ctx
+        self.location = location
+        self.max_workers = max_workers
+        self.ttl = cli_ctx.config.getint('vm', 'image_catalog_ttl', fallback=DEFAULT_IMAGE_CATALOG_TTL) * 60
+        self.path = os.path.join(cli_ctx.config.config_dir, 'object_cache', cli_ctx.cloud.name,
+                                 subscription_id or get_subscription_id(cli_ctx), 'vmImages',
+                                 '{}.json'.format(location.lower()))
+        self.data = self._load()
+        self._client = None
+        self._dirty = False
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            from ._client_factory import _compute_client_factory
+            self._client = _compute_client_factory(self.cli_ctx).virtual_machine_images
+        return self._client
+
+    def _load(self):
+        empty = {'publishers_listed': None, 'publishers': {}}
+        if not self.enabled:
+            return empty
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError):
+            return empty
+
+    def save(self):
+        from knack.util import ensure_dir
+        if not self.enabled or not self._dirty:
+            return
+        ensure_dir(os.path.dirname(self.path))
+        with open(self.path, 'w') as f:
+            json.dump(self.data, f)
+        self._dirty = False
+
+    def _is_fresh(self, timestamp):
+        return self.enabled and timestamp is not None and time.time() - timestamp <= self.ttl
+
+    def _run_concurrently(self, func, items):
+        """ Run `func` over `items` with the worker pool and return the results in input order. """
+        from concurrent.futures import ThreadPoolExecutor
+        if len(items) <= 1:
+            return [func(i) for i in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, items))
+
+    def _list_or_warn(self, operation, *args):
+        from msrestazure.azure_exceptions import CloudError
+        try:
+            return [x.name for x in operation(self.location, *args)]
+        except CloudError as e:
+            logger.warning(str(e))
+            return None
+
+    def _refresh_publishers(self):
+        names = [p.name for p in self.client.list_publishers(self.location)]
+        publishers = self.data['publishers']
+        for name in set(publishers) - set(names):
+            del publishers[name]
+        for name in names:
+            publishers.setdefault(name, {'offers_listed': None, 'offers': {}})
+        self.data['publishers_listed'] = time.time()
+        self._dirty = True
+
+    def _refresh_offers(self, publisher_names):
+        stale = [p for p in publisher_names if not self._is_fresh(self.data['publishers'][p]['offers_listed'])]
+        for publisher, names in zip(stale, self._run_concurrently(
+                lambda p: self._list_or_warn(self.client.list_offers, p), stale)):
+            if names is None:
+                continue
+            entry = self.data['publishers'][publisher]
+            offers = {n: entry['offers'].get(n, {'walked': None, 'skus': {}}) for n in names}
+            if set(offers) != set(entry['offers']):
+                logger.debug("Offers of publisher '%s' changed", publisher)
+            entry['offers'] = offers
+            entry['offers_listed'] = time.time()
+            self._dirty = True
+
+    def _walk_offers(self, targets, sku=None):
+        from ._actions import _matched
+        stale = [(p, o) for p, o in targets if not self._is_fresh(self.data['publishers'][p]['offers'][o]['walked'])]
+        if not stale:
+            return
+        logger.debug("Listing skus and versions of %d offers", len(stale))
+        sku_lists = self._run_concurrently(lambda t: self._list_or_warn(self.client.list_skus, *t), stale)
+
+        version_targets = []
+        for (p, o), skus in zip(stale, sku_lists):
+            if skus is None:
+                continue
+            # without a persisted catalog there is no need to list versions of skus the caller filtered out
+            version_targets.extend((p, o, s) for s in skus if self.enabled or _matched(sku, s))
+        version_lists = self._run_concurrently(lambda t: self._list_or_warn(self.client.list, *t), version_targets)
+
+        walked = {}
+        for (p, o, s), versions in zip(version_targets, version_lists):
+            if versions is not None:
+                walked.setdefault((p, o), {})[s] = versions
+        now = time.time()
+        for (p, o), skus in zip(stale, sku_lists):
+            if skus is None:
+                continue
+            self.data['publishers'][p]['offers'][o] = {'walked': now, 'skus': walked.get((p, o), {})}
+        self._dirty = True
+
+    def list_images(self, publisher=None, offer=None, sku=None):
+        """ Return the images matching the (partial, case-insensitive) publisher/offer/sku names. """
+        from ._actions import _matched
+        if not self._is_fresh(self.data['publishers_listed']):
+            self._refresh_publishers()
+        publishers = [p for p in self.data['publishers'] if _matched(publisher, p)]
+        self._refresh_offers(publishers)
+        targets = [(p, o) for p in publishers for o in self.data['publishers'][p]['offers'] if _matched(offer, o)]
+        self._walk_offers(targets, sku)
+        self.save()
+
+        images = []
+        for p, o in targets:
+            for s, versions in self.data['publishers'][p]['offers'][o]['skus'].items():
+                if not _matched(sku, s):
+                    continue
+                images.extend({'publisher': p, 'offer': o, 'sku': s, 'version': v} for v in versions)
+        return images
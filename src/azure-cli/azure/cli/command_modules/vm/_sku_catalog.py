@@ -0,0 +1,171 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import datetime
+import json
+import os
+
+from knack.log import get_logger
+
+logger = get_logger(__name__)
+
+# minutes a downloaded SKU catalog stays valid, overridable through `az config set vm.sku_catalog_ttl=<minutes>`.
+# A value of 0 disables the local catalog. Kept short as restrictions on a subscription can change at any time.
+DEFAULT_SKU_CATALOG_TTL = 10
+
+_CATALOG_FILE = '_catalog.json'
+_NO_LOCATION = '_nolocation'
+
+
+def _shard_name(location):
+    return (location or _NO_LOCATION).lower()
+
+
+class SkuIndex(object):
+    """In-memory index over serialized resource SKUs (as returned by the REST API).
+
+    Entries are kept as (ordinal, sku) pairs so results can be returned in the order the service listed them.
+    """
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda e: e[0])
+        self._by_name = {}
+        self._by_resource_type = {}
+        self._by_family = {}
+        self._by_capability = {}
+        for pos, (_, sku) in enumerate(self.entries):
+            self._add(self._by_name, sku.get('name'), pos)
+            self._add(self._by_resource_type, sku.get('resourceType'), pos)
+            self._add(self._by_family, sku.get('family'), pos)
+            for capability in sku.get('capabilities') or []:
+                key = '{}={}'.format(capability.get('name'), capability.get('value'))
+                self._add(self._by_capability, key, pos)
+
+    @staticmethod
+    def _add(index, key, pos):
+        if key is not None:
+            index.setdefault(str(key).lower(), []).append(pos)
+
+    def query(self, resource_type=None, name=None, family=None, capabilities=None):
+        """ Return the serialized SKUs matching all of the given (case-insensitive) criteria.
+
+        :param dict capabilities: capability name to value, e.g. {'AcceleratedNetworkingEnabled': 'True'}
+        """
+        candidates = None
+        lookups = [(self._by_resource_type, resource_type), (self._by_name, name), (self._by_family, family)]
+        lookups.extend((self._by_capability, '{}={}'.format(k, v)) for k, v in (capabilities or {}).items())
+        for index, key in lookups:
+            if key is None:
+                continue
+            positions = set(index.get(str(key).lower(), []))
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                return []
+        if candidates is None:
+            return list(self.entries)
+        return [self.entries[pos] for pos in sorted(candidates)]
+
+
+class SkuCatalog(object):
+    """A local copy of the compute resource SKUs available to a subscription.
+
+    The catalog is downloaded with a single `resource_skus.list()` call and persisted under the CLI
+    config directory, sharded by location, so that later lookups for a location only read and index
+    that location's SKUs. It is refreshed once it gets older than `vm.sku_catalog_ttl` minutes.
+    """
+
+    def __init__(self, cli_ctx, subscription_id=None):
+        from azure.cli.core.commands.client_factory import get_subscription_id
+        self.cli_ctx = cli_ctx
+        self.subscription_id = subscription_id or get_subscription_id(cli_ctx)
+        self.ttl = cli_ctx.config.getint('vm', 'sku_catalog_ttl', fallback=DEFAULT_SKU_CATALOG_TTL)
+        self.directory = os.path.join(cli_ctx.config.config_dir, 'object_cache', cli_ctx.cloud.name,
+                                      self.subscription_id, 'computeSkus', cli_ctx.cloud.profile)
+        self._shards = {}
+
+    @property
+    def enabled(self):
+        return self.ttl > 0
+
+    def _load_json(self, filename):
+        try:
+            with open(os.path.join(self.directory, filename), 'r') as f:
+                return json.load(f)
+        except (OSError, IOError, ValueError):
+            return None
+
+    def _metadata(self):
+        return self._load_json(_CATALOG_FILE)
+
+    def is_fresh(self):
+        metadata = self._metadata()
+        if not metadata:
+            return False
+        last_saved = datetime.datetime.strptime(metadata['last_saved'], '%Y-%m-%d %H:%M:%S.%f')
+        return datetime.datetime.now() - last_saved <= datetime.timedelta(minutes=self.ttl)
+
+    def refresh(self):
+        """ Download the SKU list and rewrite the local catalog. Returns the serialized SKUs. """
+        from knack.util import ensure_dir
+        from ._client_factory import _compute_client_factory
+        client = _compute_client_factory(self.cli_ctx, subscription_id=self.subscription_id)
+        skus = [s.serialize(keep_readonly=True) for s in client.resource_skus.list()]
+
+        shards = {}
+        for ordinal, sku in enumerate(skus):
+            for location in sku.get('locations') or [None]:
+                shards.setdefault(_shard_name(location), []).append([ordinal, sku])
+
+        if self.enabled:
+            ensure_dir(self.directory)
+            for existing in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, existing))
+            for name, entries in shards.items():
+                with open(os.path.join(self.directory, name + '.json'), 'w') as f:
+                    json.dump(entries, f)
+            with open(os.path.join(self.directory, _CATALOG_FILE), 'w') as f:
+                json.dump({'last_saved': str(datetime.datetime.now()), 'locations': sorted(shards)}, f)
+            logger.debug("Saved %d compute SKUs to the local catalog in '%s'", len(skus), self.directory)
+
+        self._shards = {name: SkuIndex(entries) for name, entries in shards.items()}
+        return skus
+
+    def _get_shards(self, location=None):
+        if not self._shards:
+            if not self.enabled or not self.is_fresh():
+                self.refresh()
+            else:
+                logger.debug("Loading compute SKUs from the local catalog in '%s'", self.directory)
+        if location:
+            names = [_shard_name(location)]
+        else:
+            names = (self._metadata() or {}).get('locations') or list(self._shards)
+        result = []
+        for name in names:
+            if name not in self._shards:
+                entries = self._load_json(name + '.json')
+                if entries is None:
+                    continue
+                self._shards[name] = SkuIndex(entries)
+            result.append(self._shards[name])
+        return result
+
+    def query_raw(self, location=None, resource_type=None, name=None, family=None, capabilities=None):
+        """ Return the serialized SKUs matching the given criteria, in the order the service listed them. """
+        matches = {}
+        for shard in self._get_shards(location):
+            for ordinal, sku in shard.query(resource_type=resource_type, name=name, family=family,
+                                            capabilities=capabilities):
+                matches[ordinal] = sku
+        return [matches[ordinal] for ordinal in sorted(matches)]
+
+    def query(self, location=None, resource_type=None, name=None, family=None, capabilities=None):
+        """ Return the `ResourceSku` models matching the given criteria. """
+        from azure.cli.core.profiles import ResourceType, get_sdk
+        ResourceSku = get_sdk(self.cli_ctx, ResourceType.MGMT_COMPUTE, 'ResourceSku', mod='models',
+                              operation_group='resource_skus')
+        return [ResourceSku.deserialize(sku) for sku in
+                self.query_raw(location=location, resource_type=resource_type, name=name, family=family,
+                               capabilities=capabilities)]
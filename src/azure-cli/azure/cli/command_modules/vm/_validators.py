@@ -341,8 +341,8 @@ def _validate_location(cmd, namespace, zone_info, size_info):
     if not namespace.location:
         get_default_location_from_resource_group(cmd, namespace)
         if zone_info:
-            sku_infos = list_sku_info(cmd.cli_ctx, namespace.location)
-            temp = next((x for x in sku_infos if x.name.lower() == size_info.lower()), None)
+            sku_infos = list_sku_info(cmd.cli_ctx, namespace.location, name=size_info)
+            temp = next(iter(sku_infos), None)
             # For Stack (compute - 2017-03-30), Resource_sku doesn't implement location_info property
             if not hasattr(temp, 'location_info'):
                 return
@@ -505,9 +505,12 @@ def _validate_vm_create_storage_profile(cmd, namespace, for_scale_set=False):
     if not namespace.os_type:
         namespace.os_type = 'windows' if 'windows' in namespace.os_offer.lower() else 'linux'
 
-    from ._vm_utils import normalize_disk_info
+    from ._vm_utils import normalize_disk_info, list_cached_disk_skus
     # attach_data_disks are not exposed yet for VMSS, so use 'getattr' to avoid crash
     vm_size = (getattr(namespace, 'size', None) or getattr(namespace, 'vm_sku', None))
+    available_disk_skus = None
+    if namespace.storage_sku and not getattr(namespace, 'use_unmanaged_disk', None):
+        available_disk_skus = list_cached_disk_skus(cmd.cli_ctx, getattr(namespace, 'location', None))
     namespace.disk_info = normalize_disk_info(size=vm_size,
                                               image_data_disks=image_data_disks,
                                               data_disk_sizes_gb=namespace.data_disk_sizes_gb,
@@ -515,7 +518,8 @@ def _validate_vm_create_storage_profile(cmd, namespace, for_scale_set=False):
                                               storage_sku=namespace.storage_sku,
                                               os_disk_caching=namespace.os_caching,
                                               data_disk_cachings=namespace.data_caching,
-                                              ephemeral_os_disk=getattr(namespace, 'ephemeral_os_disk', None))
+                                              ephemeral_os_disk=getattr(namespace, 'ephemeral_os_disk', None),
+                                              available_disk_skus=available_disk_skus)
 
 
 def _validate_vm_create_storage_account(cmd, namespace):
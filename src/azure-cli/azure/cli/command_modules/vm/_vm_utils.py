@@ -114,22 +114,33 @@ def get_key_vault_base_url(cli_ctx, vault_name):
     return 'https://{}{}'.format(vault_name, suffix)
 
 
-def list_sku_info(cli_ctx, location=None):
-    from ._client_factory import _compute_client_factory
+def list_sku_info(cli_ctx, location=None, **kwargs):
+    """ List compute resource SKUs, served from the local SKU catalog when it is fresh.
+
+    Additional keyword arguments (resource_type, name, family, capabilities) are passed to `SkuCatalog.query`.
+    """
+    from ._sku_catalog import SkuCatalog
+    return SkuCatalog(cli_ctx).query(location=location, **kwargs)
 
-    def _match_location(loc, locations):
-        return next((x for x in locations if x.lower() == loc.lower()), None)
 
-    client = _compute_client_factory(cli_ctx)
-    result = client.resource_skus.list()
-    if location:
-        result = [r for r in result if _match_location(location, r.locations)]
-    return result
+def list_cached_disk_skus(cli_ctx, location):
+    """ Return the disk SKU names available in a location according to the local SKU catalog.
+
+    Returns None, without downloading anything, if there is no fresh catalog to answer from.
+    """
+    from ._sku_catalog import SkuCatalog
+    if not location:
+        return None
+    catalog = SkuCatalog(cli_ctx)
+    if not catalog.enabled or not catalog.is_fresh():
+        return None
+    return [sku['name'] for sku in catalog.query_raw(location=location, resource_type='disks')]
 
 
 def normalize_disk_info(image_data_disks=None,
                         data_disk_sizes_gb=None, attach_data_disks=None, storage_sku=None,
-                        os_disk_caching=None, data_disk_cachings=None, size='', ephemeral_os_disk=False):
+                        os_disk_caching=None, data_disk_cachings=None, size='', ephemeral_os_disk=False,
+                        available_disk_skus=None):
     from msrestazure.tools import is_valid_resource_id
     is_lv_size = re.search('_L[0-9]+s', size, re.I)
     # we should return a dictionary with info like below
@@ -182,7 +193,7 @@ def normalize_disk_info(image_data_disks=None,
 
     # update storage skus for managed data disks
     if storage_sku is not None:
-        update_disk_sku_info(info, storage_sku)
+        update_disk_sku_info(info, storage_sku, available_disk_skus)
 
     # check that os storage account type is not UltraSSD_LRS
     if info['os'].get('storageAccountType', "").lower() == 'ultrassd_lrs':
@@ -324,14 +335,23 @@ def get_storage_blob_uri(cli_ctx, storage):
     return storage_uri
 
 
-def update_disk_sku_info(info_dict, skus):
+def update_disk_sku_info(info_dict, skus, available_skus=None):
     usage_msg = 'Usage:\n\t[--storage-sku SKU | --storage-sku ID=SKU ID=SKU ID=SKU...]\n' \
                 'where each ID is "os" or a 0-indexed lun.'
+    # sku names known to be available, e.g. from the local SKU catalog. Used to normalize casing, and to warn about
+    # skus that are not listed, as the catalog may be out of date.
+    available = {x.lower(): x for x in available_skus} if available_skus else None
 
     def _update(info, lun, value):
         luns = info.keys()
         if lun not in luns:
             raise CLIError("Data disk with lun of '{}' doesn't exist. Existing luns: {}.".format(lun, luns))
+        if available is not None:
+            if value.lower() in available:
+                value = available[value.lower()]
+            else:
+                logger.warning("Disk sku '%s' is not in the skus last listed for this location: %s.",
+                               value, ', '.join(sorted(set(available.values()))))
         if lun == 'os':
             info[lun]['storageAccountType'] = value
         else:
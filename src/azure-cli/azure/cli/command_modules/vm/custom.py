@@ -1052,12 +1052,10 @@ def get_vm_details(cmd, resource_group_name, vm_name):
 
 def list_skus(cmd, location=None, size=None, zone=None, show_all=None, resource_type=None):
     from ._vm_utils import list_sku_info
-    result = list_sku_info(cmd.cli_ctx, location)
+    result = list_sku_info(cmd.cli_ctx, location, resource_type=resource_type)
     if not show_all:
         result = [x for x in result if not [y for y in (x.restrictions or [])
                                             if y.reason_code == 'NotAvailableForSubscription']]
-    if resource_type:
-        result = [x for x in result if x.resource_type.lower() == resource_type.lower()]
     if size:
         result = [x for x in result if x.resource_type == 'virtualMachines' and size.lower() in x.name.lower()]
     if zone:
@@ -0,0 +1,121 @@
+# --------------------------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------------------------
+
+import shutil
+import tempfile
+import unittest
+import mock
+
+from azure.cli.command_modules.vm._sku_catalog import SkuCatalog, SkuIndex
+from azure.cli.command_modules.vm._vm_utils import update_disk_sku_info
+from azure.cli.core.mock import DummyCli
+from azure.cli.core.profiles import get_sdk, ResourceType
+
+ResourceSku = get_sdk(DummyCli(), ResourceType.MGMT_COMPUTE, 'ResourceSku', mod='models',
+                      operation_group='resource_skus')
+
+
+def _sku(resource_type, name, location, family=None, capabilities=None):
+    return {
+        'resourceType': resource_type,
+        'name': name,
+        'family': family,
+        'locations': [location],
+        'capabilities': [{'name': k, 'value': v} for k, v in (capabilities or {}).items()]
+    }
+
+
+SKUS = [
+    _sku('virtualMachines', 'Standard_DS2_v2', 'westus', 'standardDSv2Family',
+         {'AcceleratedNetworkingEnabled': 'True'}),
+    _sku('virtualMachines', 'Standard_A0', 'westus', 'standardA0_A7Family',
+         {'AcceleratedNetworkingEnabled': 'False'}),
+    _sku('disks', 'Premium_LRS', 'westus'),
+    _sku('virtualMachines', 'Standard_DS2_v2', 'eastus', 'standardDSv2Family',
+         {'AcceleratedNetworkingEnabled': 'True'}),
+    _sku('disks', 'Standard_LRS', 'eastus'),
+]
+
+
+class TestSkuCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.config_dir = tempfile.mkdtemp()
+        self.cli_ctx = mock.MagicMock()
+        self.cli_ctx.config.config_dir = self.config_dir
+        self.cli_ctx.config.getint.return_value = 60
+        self.cli_ctx.cloud.name = 'AzureCloud'
+        self.cli_ctx.cloud.profile = 'latest'
+        self.client = mock.MagicMock()
+        self.client.resource_skus.list.side_effect = lambda: [ResourceSku.deserialize(s) for s in SKUS]
+
+    def tearDown(self):
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    def _catalog(self):
+        return SkuCatalog(self.cli_ctx, subscription_id='00000000-0000-0000-0000-000000000000')
+
+    def test_sku_index_query(self):
+        index = SkuIndex(list(enumerate(SKUS)))
+        self.assertEqual(len(index.query()), 5)
+        self.assertEqual([o for o, _ in index.query(resource_type='VIRTUALMACHINES')], [0, 1, 3])
+        self.assertEqual([o for o, _ in index.query(family='standardDSv2Family')], [0, 3])
+        self.assertEqual([o for o, _ in index.query(resource_type='virtualMachines',
+                                                    capabilities={'AcceleratedNetworkingEnabled': 'true'})], [0, 3])
+        self.assertEqual(index.query(name='Standard_A0', resource_type='disks'), [])
+
+    @mock.patch('azure.cli.command_modules.vm._client_factory._compute_client_factory', autospec=True)
+    def test_sku_catalog_served_locally_once_downloaded(self, client_factory_mock):
+        client_factory_mock.return_value = self.client
+
+        result = self._catalog().query(location='westus')
+        self.assertEqual([s.name for s in result], ['Standard_DS2_v2', 'Standard_A0', 'Premium_LRS'])
+        self.assertEqual(self.client.resource_skus.list.call_count, 1)
+
+        # a new catalog instance, as in a later command invocation, reads the persisted shards
+        catalog = self._catalog()
+        self.assertTrue(catalog.is_fresh())
+        result = catalog.query(location='EastUS', resource_type='disks')
+        self.assertEqual([s.name for s in result], ['Standard_LRS'])
+        result = catalog.query(name='standard_ds2_v2')
+        self.assertEqual([s.locations for s in result], [['westus'], ['eastus']])
+        self.assertEqual(self.client.resource_skus.list.call_count, 1)
+
+    @mock.patch('azure.cli.command_modules.vm._client_factory._compute_client_factory', autospec=True)
+    def test_sku_catalog_refreshes_after_ttl(self, client_factory_mock):
+        client_factory_mock.return_value = self.client
+        self._catalog().query(location='westus')
+
+        with mock.patch('azure.cli.command_modules.vm._sku_catalog.datetime') as datetime_mock:
+            import datetime
+            datetime_mock.datetime.now.return_value = datetime.datetime.now() + datetime.timedelta(minutes=61)
+            datetime_mock.datetime.strptime = datetime.datetime.strptime
+            datetime_mock.timedelta = datetime.timedelta
+            self.assertFalse(self._catalog().is_fresh())
+            self._catalog().query(location='westus')
+        self.assertEqual(self.client.resource_skus.list.call_count, 2)
+
+    @mock.patch('azure.cli.command_modules.vm._client_factory._compute_client_factory', autospec=True)
+    def test_sku_catalog_disabled(self, client_factory_mock):
+        client_factory_mock.return_value = self.client
+        self.cli_ctx.config.getint.return_value = 0
+        self._catalog().query(location='westus')
+        self._catalog().query(location='westus')
+        self.assertEqual(self.client.resource_skus.list.call_count, 2)
+
+    def test_update_disk_sku_info_with_available_skus(self):
+        info = {'os': {}, 0: {'managedDisk': {}}}
+        update_disk_sku_info(info, ['premium_lrs'], available_skus=['Premium_LRS', 'Standard_LRS'])
+        self.assertEqual(info['os']['storageAccountType'], 'Premium_LRS')
+        self.assertEqual(info[0]['managedDisk']['storageAccountType'], 'Premium_LRS')
+        # the catalog may be out of date, a sku it doesn't list is only warned about
+        with mock.patch('azure.cli.command_modules.vm._vm_utils.logger') as logger_mock:
+            update_disk_sku_info(info, ['os=UltraSSD_LRS'], available_skus=['Premium_LRS', 'Standard_LRS'])
+        self.assertEqual(info['os']['storageAccountType'], 'UltraSSD_LRS')
+        self.assertIn('not in the skus last listed', logger_mock.warning.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
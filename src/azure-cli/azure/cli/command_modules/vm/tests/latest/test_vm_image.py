@@ -71,5 +71,99 @@ class TestVMImage(unittest.TestCase):
                                      'offer': 'CentOS', 'sku': '7.5', 'version': 'latest'})
 
 
+class _FakeImageClient(object):
+    def __init__(self, tree):
+        self.tree = tree
+        self.calls = []
+
+    @staticmethod
+    def _named(names):
+        result = []
+        for n in names:
+            m = mock.MagicMock()
+            m.name = n
+            result.append(m)
+        return result
+
+    def list_publishers(self, location):
+        self.calls.append(('publishers',))
+        return self._named(self.tree)
+
+    def list_offers(self, location, publisher):
+        self.calls.append(('offers', publisher))
+        return self._named(self.tree[publisher])
+
+    def list_skus(self, location, publisher, offer):
+        self.calls.append(('skus', publisher, offer))
+        return self._named(self.tree[publisher][offer])
+
+    def list(self, location, publisher, offer, sku):
+        self.calls.append(('versions', publisher, offer, sku))
+        return self._named(self.tree[publisher][offer][sku])
+
+
+class TestVMImageCatalog(unittest.TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.config_dir = tempfile.mkdtemp()
+        self.cli_ctx = mock.MagicMock()
+        self.cli_ctx.config.config_dir = self.config_dir
+        self.cli_ctx.config.getint.side_effect = lambda section, option, fallback=None: fallback
+        self.cli_ctx.cloud.name = 'AzureCloud'
+        self.client = _FakeImageClient({
+            'Canonical': {'UbuntuServer': {'16.04-LTS': ['16.04.201901', '16.04.201902'], '18.04-LTS': ['18.04.1']}},
+            'OpenLogic': {'CentOS': {'7.5': ['7.5.1']}}
+        })
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.config_dir, ignore_errors=True)
+
+    def _list(self, publisher=None, offer=None, sku=None):
+        from azure.cli.command_modules.vm._image_catalog import ImageCatalog
+        catalog = ImageCatalog(self.cli_ctx, 'westus', subscription_id='00000000-0000-0000-0000-000000000000')
+        catalog._client = self.client  # pylint: disable=protected-access
+        return catalog.list_images(publisher, offer, sku)
+
+    def test_image_catalog_served_locally_after_warm_up(self):
+        images = self._list()
+        self.assertEqual(len(images), 4)
+        self.assertIn({'publisher': 'OpenLogic', 'offer': 'CentOS', 'sku': '7.5', 'version': '7.5.1'}, images)
+        calls = len(self.client.calls)
+
+        images = self._list(publisher='canon', sku='18.04')
+        self.assertEqual(images, [{'publisher': 'Canonical', 'offer': 'UbuntuServer', 'sku': '18.04-LTS',
+                                   'version': '18.04.1'}])
+        self.assertEqual(len(self.client.calls), calls)
+
+    def test_image_catalog_incremental_refresh(self):
+        import time
+        self._list()
+        self.client.tree['Canonical']['UbuntuServer']['18.04-LTS'].append('18.04.2')
+        self.client.tree['Canonical']['UbuntuServer-Pro'] = {'20.04': ['20.04.1']}
+        self.client.calls = []
+
+        with mock.patch('azure.cli.command_modules.vm._image_catalog.time') as time_mock:
+            time_mock.time.return_value = time.time() + 3600 * 25
+            images = self._list(publisher='Canonical')
+
+        # the stale publisher and its offers are listed again, the publishers that were not queried are not
+        self.assertIn(('offers', 'Canonical'), self.client.calls)
+        self.assertIn(('skus', 'Canonical', 'UbuntuServer-Pro'), self.client.calls)
+        self.assertIn(('versions', 'Canonical', 'UbuntuServer', '18.04-LTS'), self.client.calls)
+        self.assertNotIn(('offers', 'OpenLogic'), self.client.calls)
+        self.assertEqual(len(images), 5)
+        self.assertIn({'publisher': 'Canonical', 'offer': 'UbuntuServer', 'sku': '18.04-LTS', 'version': '18.04.2'},
+                      images)
+
+    def test_image_catalog_disabled(self):
+        self.cli_ctx.config.getint.side_effect = lambda section, option, fallback=None: 0
+        self._list(offer='CentOS')
+        self._list(offer='CentOS')
+        self.assertEqual(self.client.calls.count(('skus', 'OpenLogic', 'CentOS')), 2)
+        self.assertNotIn(('skus', 'Canonical', 'UbuntuServer'), self.client.calls)
+
+
 if __name__ == '__main__':
     unittest.main()